@@ -1,4 +1,5 @@
 #include <Wire.h>
+#include <EEPROM.h>
 #include <Adafruit_PWMServoDriver.h>
 
 Adafruit_PWMServoDriver pwm = Adafruit_PWMServoDriver();
@@ -8,14 +9,157 @@ Adafruit_PWMServoDriver pwm = Adafruit_PWMServoDriver();
 
 int currentAngles[6] = {0, 0, 0, 0, 0, 0}; // Store current angles in GUI range (-45 to 45)
 
+// The last pose is kept in EEPROM so READ_POS is still right after the reset
+// that opening the serial port causes. It is only saved when the host asks
+// with SAVE_POS (after homing and before it closes the port): saving after
+// every pause in motion would wear the EEPROM out within weeks of production
+// cycles. EEPROM.update also skips unchanged bytes.
+#define POSE_MAGIC 0xA5          // EEPROM[0]; angles follow as signed bytes
+bool poseDirty = false;
+
+void loadPose() {
+  if (EEPROM.read(0) != POSE_MAGIC) return;
+  for (int i = 0; i < 6; i++) {
+    currentAngles[i] = (int8_t)EEPROM.read(1 + i);
+  }
+}
+
+void savePose() {
+  if (!poseDirty) return;
+  for (int i = 0; i < 6; i++) {
+    EEPROM.update(1 + i, (uint8_t)(int8_t)currentAngles[i]);
+  }
+  EEPROM.update(0, POSE_MAGIC);
+  poseDirty = false;
+}
+
+// Per-joint calibration is compiled by servo_calibration.py into a table of
+// pulse lengths, one uint16 per joint and whole GUI degree, and stored in
+// EEPROM after the pose. Converting an angle is then a single table read; it
+// is read straight from EEPROM so the table costs no SRAM.
+#define CAL_MAGIC 0x5C
+#define CAL_MAGIC_ADDR 8
+#define CAL_TABLE_ADDR 16
+#define CAL_MIN_ANGLE -30
+#define CAL_STEPS 61             // CAL_MIN_ANGLE .. -CAL_MIN_ANGLE
+bool calibrated = false;
+
+int pulseFor(int joint, int angle) {
+  if (!calibrated) {
+    // Map GUI range (-45 to 45) to servo range (0 to 180)
+    int servoAngle = map(angle, -45, 45, 0, 180);
+    return map(servoAngle, 0, 180, SERVOMIN, SERVOMAX);
+  }
+  int index = constrain(angle - CAL_MIN_ANGLE, 0, CAL_STEPS - 1);
+  uint16_t pulse;
+  EEPROM.get(CAL_TABLE_ADDR + (joint * CAL_STEPS + index) * 2, pulse);
+  return pulse;
+}
+
+// CAL,<joint>,<start>,<pulse>,...  writes part of the table
+// CAL,END                          activates the table
+// CAL,CLEAR                        returns to the SERVOMIN/SERVOMAX mapping
+void handleCalibration(String args) {
+  if (args == "END") {
+    EEPROM.update(CAL_MAGIC_ADDR, CAL_MAGIC);
+    calibrated = true;
+  } else if (args == "CLEAR") {
+    EEPROM.update(CAL_MAGIC_ADDR, 0);
+    calibrated = false;
+  } else {
+    // Never drive servos from a half-written table
+    EEPROM.update(CAL_MAGIC_ADDR, 0);
+    calibrated = false;
+    int comma = args.indexOf(',');
+    int joint = args.substring(0, comma).toInt();
+    args = args.substring(comma + 1);
+    comma = args.indexOf(',');
+    int index = args.substring(0, comma).toInt();
+    if (comma == -1 || joint < 0 || joint > 5) {
+      Serial.println("CAL ERR");
+      return;
+    }
+    while (comma != -1) {
+      args = args.substring(comma + 1);
+      comma = args.indexOf(',');
+      if (index < 0 || index >= CAL_STEPS) {
+        Serial.println("CAL ERR");
+        return;
+      }
+      uint16_t pulse = (comma == -1 ? args : args.substring(0, comma)).toInt();
+      EEPROM.put(CAL_TABLE_ADDR + (joint * CAL_STEPS + index++) * 2, pulse);
+    }
+  }
+  Serial.println("CAL OK");
+}
+
+// All six channels are written in one auto-increment I2C burst (register
+// byte + 24 data bytes, within the 32-byte Wire buffer) so they latch together
+// on a single STOP. Frames are written at most once per PWM period; a frame
+// that arrives sooner replaces the pending one, since the servos would never
+// see it. RATE reports "RATE:<servo frames/s>,<written>,<superseded>".
+#define PWM_FREQ 60
+#define FRAME_US (1000000UL / PWM_FREQ)
+#define PCA9685_ADDR 0x40
+#define PCA9685_MODE1 0x00
+#define PCA9685_LED0_ON_L 0x06
+#define MODE1_AI 0x20
+int pendingAngles[6];
+bool framePending = false;
+unsigned long lastWriteUs = 0;
+unsigned long framesWritten = 0;
+unsigned long framesSuperseded = 0;
+
+void enableAutoIncrement() {
+  Wire.beginTransmission(PCA9685_ADDR);
+  Wire.write(PCA9685_MODE1);
+  Wire.endTransmission();
+  Wire.requestFrom(PCA9685_ADDR, 1);
+  uint8_t mode = Wire.read();
+  Wire.beginTransmission(PCA9685_ADDR);
+  Wire.write(PCA9685_MODE1);
+  Wire.write(mode | MODE1_AI);
+  Wire.endTransmission();
+}
+
+void writeFrame() {
+  Wire.beginTransmission(PCA9685_ADDR);
+  Wire.write(PCA9685_LED0_ON_L);
+  for (int i = 0; i < 6; i++) {
+    uint16_t pulse = pulseFor(i, pendingAngles[i]);
+    Wire.write(0);             // ON_L
+    Wire.write(0);             // ON_H
+    Wire.write(pulse & 0xFF);  // OFF_L
+    Wire.write(pulse >> 8);    // OFF_H
+    currentAngles[i] = pendingAngles[i]; // Store the GUI angle (-45 to 45)
+  }
+  Wire.endTransmission();
+  framePending = false;
+  framesWritten++;
+  poseDirty = true;
+}
+
+void serviceFrame() {
+  if (!framePending) return;
+  unsigned long now = micros();
+  if (now - lastWriteUs < FRAME_US) return;
+  // Stay on the frame grid unless we fell a whole frame behind
+  lastWriteUs = (now - lastWriteUs < 2 * FRAME_US) ? lastWriteUs + FRAME_US : now;
+  writeFrame();
+}
+
 void setup() {
   Serial.begin(9600);
   pwm.begin();
-  pwm.setPWMFreq(60);
+  pwm.setPWMFreq(PWM_FREQ);
+  enableAutoIncrement();
   // Do not set any initial positions; servos remain at their current physical positions
+  loadPose();
+  calibrated = EEPROM.read(CAL_MAGIC_ADDR) == CAL_MAGIC;
 }
 
 void loop() {
+  serviceFrame();
   if (Serial.available()) {
     String input = Serial.readStringUntil('\n');
     input.trim();
@@ -29,6 +173,18 @@ void loop() {
       }
       posString += "\n";
       Serial.print(posString);
+    } else if (input == "SAVE_POS") {
+      if (framePending) writeFrame(); // Save the pose the host last sent
+      savePose();
+    } else if (input == "RATE") {
+      Serial.print("RATE:");
+      Serial.print(PWM_FREQ);
+      Serial.print(",");
+      Serial.print(framesWritten);
+      Serial.print(",");
+      Serial.println(framesSuperseded);
+    } else if (input.startsWith("CAL,")) {
+      handleCalibration(input.substring(4));
     } else {
       // Parse incoming angles (e.g., "-10,20,30,40,50,60")
       int angles[6];
@@ -42,14 +198,13 @@ void loop() {
       }
 
       if (index == 6) {
-        // Update servos and store current angles
+        // Latched by serviceFrame() at the next PWM frame boundary
+        if (framePending) framesSuperseded++;
         for (int i = 0; i < 6; i++) {
-          // Map GUI range (-45 to 45) to servo range (0 to 180)
-          int servoAngle = map(angles[i], -45, 45, 0, 180);
-          int pulse = map(servoAngle, 0, 180, SERVOMIN, SERVOMAX);
-          pwm.setPWM(i, 0, pulse);
-          currentAngles[i] = angles[i]; // Store the GUI angle (-45 to 45)
+          pendingAngles[i] = angles[i];
         }
+        framePending = true;
+        serviceFrame();
       }
     }
   }
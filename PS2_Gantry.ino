@@ -18,8 +18,71 @@ AccelStepper stepperX(1, X_STEP_PIN, X_DIR_PIN);
 AccelStepper stepperY(1, Y_STEP_PIN, Y_DIR_PIN);
 AccelStepper stepperZ(1, Z_STEP_PIN, Z_DIR_PIN);
 
-float currentXPos = 0.0; // Current X/Z position in mm
-float currentYPos = 0.0; // Current Y position in mm
+// The GUI works in its own step units: 0-8200 across the full travel
+const float HOST_STEPS_PER_MM = 8200.0 / MAX_POSITION_MM;
+const long MAX_STEPS = (long)(MAX_POSITION_MM * STEPS_PER_MM);
+
+// Motion limits (also used to restore the steppers after a jog)
+const float MAX_SPEED = 1000.0;   // Steps per second
+const float ACCELERATION = 500.0; // Steps per second^2
+
+// Feed override from the host: "FEED,<percent>" (10-200) scales MAX_SPEED for
+// the move in progress and every move after it. Acceleration is not scaled.
+float feedScale = 1.0;
+
+// Hold-to-jog: the host streams "JOG,<axis>,<steps/s>" while a button is held
+const unsigned long JOG_TIMEOUT_MS = 300; // Stop if no keepalive arrives within this time
+bool jogging = false;
+char jogAxis = 0;
+unsigned long lastJogMs = 0;
+
+// Pending targets in firmware steps; NO_TARGET leaves that axis where it is.
+// A dwell (G4) is an entry with no targets and a non-zero queueDwell.
+const long NO_TARGET = -1;
+const byte QUEUE_SIZE = 8;
+long queueX[QUEUE_SIZE];
+long queueY[QUEUE_SIZE];
+unsigned long queueDwell[QUEUE_SIZE];
+byte queueHead = 0;
+byte queueCount = 0;
+
+// Target currently being executed
+bool moving = false;
+long currentX = NO_TARGET;
+long currentY = NO_TARGET;
+bool dwelling = false;
+unsigned long dwellStartMs = 0;
+unsigned long dwellMs = 0;
+
+// Soft limits set by the GUI (CONX/CONY), in firmware steps
+long minX = 0, maxX = MAX_STEPS;
+long minY = 0, maxY = MAX_STEPS;
+
+// Serial input is pumped into rxRing without blocking so the steppers keep
+// running. Motion lines are only taken out while the motion queue has room
+// (other lines are handled at once), so a streaming host can count characters
+// against RX_SIZE (grbl-style) and keep the buffer full without overflowing it.
+// '!' is a realtime halt that is acted on as soon as it arrives, even when the
+// queue is full. '#' and '~' are the realtime feed hold and resume, and '?'
+// is a realtime position report (a streaming host's liveness probe).
+// The ring has RX_SLACK bytes beyond RX_SIZE, room for a full hardware buffer
+// from a host that doesn't count, so the realtime bytes behind those are
+// still read. Only when the slack is used up too are ordinary bytes left in
+// the hardware buffer; realtime bytes are read and acted on even then.
+const byte RX_SIZE = 128; // Must match RX_BUFFER_SIZE in gcode_stream.py
+const byte RX_SLACK = 64; // SERIAL_RX_BUFFER_SIZE on the Uno and Mega
+const byte RX_RING_SIZE = RX_SIZE + RX_SLACK;
+char rxRing[RX_RING_SIZE];
+byte rxHead = 0;
+byte rxCount = 0;
+char lineBuf[64];
+byte lineLen = 0;
+bool streaming = false; // "STREAM,1": acknowledge every processed line with "ok"
+
+// Feed hold: the axes decelerate to rest but the current target, a running
+// dwell and the queue are kept, so resuming continues the interrupted move
+bool held = false;
+unsigned long holdStartMs = 0;
 
 void setup() {
   Serial.begin(9600);
@@ -29,12 +92,12 @@ void setup() {
   digitalWrite(ENABLE_PIN, LOW);
   
   // Configure steppers
-  stepperX.setMaxSpeed(1000); // Steps per second
-  stepperX.setAcceleration(500); // Steps per second^2
-  stepperY.setMaxSpeed(1000);
-  stepperY.setAcceleration(500);
-  stepperZ.setMaxSpeed(1000);
-  stepperZ.setAcceleration(500);
+  stepperX.setMaxSpeed(MAX_SPEED);
+  stepperX.setAcceleration(ACCELERATION);
+  stepperY.setMaxSpeed(MAX_SPEED);
+  stepperY.setAcceleration(ACCELERATION);
+  stepperZ.setMaxSpeed(MAX_SPEED);
+  stepperZ.setAcceleration(ACCELERATION);
   
   // Initial positions (0 mm)
   stepperX.setCurrentPosition(0);
@@ -44,53 +107,358 @@ void setup() {
   Serial.println("CNC Gantry Initialized");
 }
 
+long hostToSteps(float hostSteps) {
+  return (long)(hostSteps / HOST_STEPS_PER_MM * STEPS_PER_MM);
+}
+
+long stepsToHost(long steps) {
+  return lround(steps / STEPS_PER_MM * HOST_STEPS_PER_MM);
+}
+
+// Position report in GUI units, e.g. "X:4100,Y:2050"
+void printPosition() {
+  Serial.print("X:");
+  Serial.print(stepsToHost(stepperX.currentPosition()));
+  Serial.print(",Y:");
+  Serial.println(stepsToHost(stepperY.currentPosition()));
+}
+
+void pumpSerial() {
+  while (Serial.available()) {
+    char c = Serial.peek();
+    if (c != '!' && c != '#' && c != '~' && c != '?' && rxCount >= RX_RING_SIZE) {
+      break; // No room: leave ordinary bytes in the hardware buffer
+    }
+    Serial.read();
+    if (c == '!') {
+      haltAll();
+      rxHead = 0;
+      rxCount = 0;
+      lineLen = 0;
+      Serial.println("Stopped");
+      continue;
+    }
+    if (c == '#') {
+      startHold();
+      continue;
+    }
+    if (c == '~') {
+      endHold();
+      continue;
+    }
+    if (c == '?') {
+      printPosition();
+      continue;
+    }
+    rxRing[(rxHead + rxCount) % RX_RING_SIZE] = c;
+    rxCount++;
+  }
+}
+
+// Returns true once a complete line is in lineBuf
+bool readLine() {
+  while (rxCount > 0) {
+    char c = rxRing[rxHead];
+    rxHead = (rxHead + 1) % RX_RING_SIZE;
+    rxCount--;
+    if (c == '\n') {
+      lineBuf[lineLen] = '\0';
+      lineLen = 0;
+      return true;
+    }
+    if (c != '\r' && lineLen < sizeof(lineBuf) - 1) {
+      lineBuf[lineLen++] = c;
+    }
+  }
+  return false;
+}
+
+bool allStopped() {
+  return stepperX.distanceToGo() == 0 && stepperY.distanceToGo() == 0 && stepperZ.distanceToGo() == 0;
+}
+
+void startDwell(unsigned long ms) {
+  currentX = NO_TARGET;
+  currentY = NO_TARGET;
+  dwelling = true;
+  dwellStartMs = millis();
+  dwellMs = ms;
+  moving = true;
+}
+
+void startMove(long x, long y) {
+  currentX = x;
+  currentY = y;
+  if (x != NO_TARGET) {
+    stepperX.moveTo(constrain(x, minX, maxX));
+    stepperZ.moveTo(constrain(x, minX, maxX)); // Synchronize Z with X
+  }
+  if (y != NO_TARGET) {
+    stepperY.moveTo(constrain(y, minY, maxY));
+  }
+  moving = true;
+}
+
+bool enqueue(long x, long y, unsigned long dwell = 0) {
+  if (queueCount == QUEUE_SIZE) {
+    Serial.println("Queue full");
+    return false;
+  }
+  byte tail = (queueHead + queueCount) % QUEUE_SIZE;
+  queueX[tail] = x;
+  queueY[tail] = y;
+  queueDwell[tail] = dwell;
+  queueCount++;
+  return true;
+}
+
+void clearQueue() {
+  queueHead = 0;
+  queueCount = 0;
+}
+
+// Single-axis target from the GUI. The GUI sends X then Y for one position, so
+// an axis that the newest target leaves untouched is merged into it instead of
+// queuing a second move.
+void queueAxis(char axis, long steps) {
+  if (queueCount > 0) {
+    byte tail = (queueHead + queueCount - 1) % QUEUE_SIZE;
+    long &slot = axis == 'X' ? queueX[tail] : queueY[tail];
+    if (slot == NO_TARGET && queueDwell[tail] == 0) {
+      slot = steps;
+      return;
+    }
+  } else if (moving && !dwelling && !held && (axis == 'X' ? currentX : currentY) == NO_TARGET) {
+    startMove(axis == 'X' ? steps : currentX, axis == 'Y' ? steps : currentY);
+    return;
+  } else if (!moving) {
+    startMove(axis == 'X' ? steps : NO_TARGET, axis == 'Y' ? steps : NO_TARGET);
+    return;
+  }
+  enqueue(axis == 'X' ? steps : NO_TARGET, axis == 'Y' ? steps : NO_TARGET);
+}
+
+// Runs between serial reads: steps the motors, confirms finished targets and
+// starts the next queued one.
+void serviceMotion() {
+  stepperX.run();
+  stepperY.run();
+  stepperZ.run();
+  if (held) {
+    return; // Decelerating or at rest; nothing finishes or starts until resumed
+  }
+  if (dwelling) {
+    if (millis() - dwellStartMs >= dwellMs) {
+      dwelling = false;
+      moving = false;
+    }
+  } else if (moving && allStopped()) {
+    moving = false;
+    printPosition(); // Confirmation for the target just reached
+  }
+  if (!moving && queueCount > 0) {
+    long x = queueX[queueHead];
+    long y = queueY[queueHead];
+    unsigned long dwell = queueDwell[queueHead];
+    queueHead = (queueHead + 1) % QUEUE_SIZE;
+    queueCount--;
+    if (dwell > 0) {
+      startDwell(dwell);
+    } else {
+      startMove(x, y);
+    }
+  }
+}
+
+void applyFeed() {
+  stepperX.setMaxSpeed(MAX_SPEED * feedScale);
+  stepperY.setMaxSpeed(MAX_SPEED * feedScale);
+  stepperZ.setMaxSpeed(MAX_SPEED * feedScale);
+}
+
+void haltAll() {
+  // setCurrentPosition() zeroes the speed, so the motors stop on this step
+  stepperX.setCurrentPosition(stepperX.currentPosition());
+  stepperY.setCurrentPosition(stepperY.currentPosition());
+  stepperZ.setCurrentPosition(stepperZ.currentPosition());
+  clearQueue();
+  moving = false;
+  dwelling = false;
+  held = false;
+  jogging = false;
+  jogAxis = 0;
+  applyFeed();
+}
+
+void startHold() {
+  if (held || jogging) return;
+  held = true;
+  holdStartMs = millis();
+  // AccelStepper::stop() decelerates to rest at the programmed acceleration
+  stepperX.stop();
+  stepperY.stop();
+  stepperZ.stop();
+  Serial.println("Held");
+}
+
+void endHold() {
+  if (!held) return;
+  held = false;
+  if (dwelling) {
+    dwellStartMs += millis() - holdStartMs; // A dwell doesn't run down while held
+  } else if (moving) {
+    startMove(currentX, currentY); // Continue to the interrupted target from where the axes stopped
+  }
+  Serial.println("Resumed");
+}
+
+void startJog(char axis, float speed) {
+  long limit = speed > 0 ? (axis == 'X' ? maxX : maxY) : (axis == 'X' ? minX : minY);
+  speed = constrain(fabs(speed), 1, MAX_SPEED);
+  if (axis == 'X') {
+    stepperX.setMaxSpeed(speed);
+    stepperZ.setMaxSpeed(speed);
+    stepperX.moveTo(limit);
+    stepperZ.moveTo(limit);
+  } else {
+    stepperY.setMaxSpeed(speed);
+    stepperY.moveTo(limit);
+  }
+  jogAxis = axis;
+  jogging = true;
+  lastJogMs = millis();
+}
+
+void stopJog() {
+  // AccelStepper::stop() decelerates to rest at the programmed acceleration
+  stepperX.stop();
+  stepperY.stop();
+  stepperZ.stop();
+  jogAxis = 0;
+  lastJogMs = millis();
+}
+
+void serviceJog() {
+  if (jogAxis && millis() - lastJogMs > JOG_TIMEOUT_MS) {
+    stopJog(); // Keepalive lost: host stopped streaming
+  }
+  stepperX.run();
+  stepperY.run();
+  stepperZ.run();
+  if (!jogAxis && allStopped()) {
+    applyFeed();
+    jogging = false;
+    printPosition();
+  }
+}
+
+// Only lines that can add to the motion queue (X:, Y:, "X,...", DWELL) have
+// to wait for room in it. Any other line at the front of the input (POS,
+// STOP, JOG, ...) is handled on this pass even while the queue is full.
+bool nextLineFits() {
+  if (queueCount < QUEUE_SIZE) return true;
+  char first = lineLen > 0 ? lineBuf[0] : (rxCount > 0 ? rxRing[rxHead] : 0);
+  return first != 'X' && first != 'Y' && first != 'D';
+}
+
 void loop() {
-  if (Serial.available()) {
-    String input = Serial.readStringUntil('\n');
+  pumpSerial();
+  if (nextLineFits() && readLine()) {
+    String input = String(lineBuf);
     input.trim();
-    
-    if (input.startsWith("X,")) {
-      // Parse X and Y positions (e.g., "X,200,Y,150")
-      int xIndex = input.indexOf("X,") + 2;
-      int yIndex = input.indexOf(",Y,");
-      if (yIndex == -1) return; // Invalid format
-      
-      String xPosStr = input.substring(xIndex, yIndex);
-      String yPosStr = input.substring(yIndex + 3);
-      
-      float targetXPos = xPosStr.toFloat();
-      float targetYPos = yPosStr.toFloat();
-      
-      // Constrain positions to 0-400 mm
-      targetXPos = constrain(targetXPos, 0, MAX_POSITION_MM);
-      targetYPos = constrain(targetYPos, 0, MAX_POSITION_MM);
-      
-      // Convert positions to steps
-      long xSteps = targetXPos * STEPS_PER_MM;
-      long ySteps = targetYPos * STEPS_PER_MM;
-      
-      // Move X and Z together, Y independently
-      stepperX.moveTo(xSteps);
-      stepperZ.moveTo(xSteps); // Synchronize Z with X
-      stepperY.moveTo(ySteps);
-      
-      // Update current positions
-      currentXPos = targetXPos;
-      currentYPos = targetYPos;
-      
-      // Run until all steppers reach their targets
-      while (stepperX.distanceToGo() != 0 || stepperY.distanceToGo() != 0 || stepperZ.distanceToGo() != 0) {
-        stepperX.run();
-        stepperY.run();
-        stepperZ.run();
-      }
-      
-      // Send confirmation back to GUI
-      Serial.print("POS,X,");
-      Serial.print(currentXPos);
-      Serial.print(",Y,");
-      Serial.print(currentYPos);
-      Serial.println();
+    handleCommand(input);
+    if (streaming) {
+      Serial.println("ok");
     }
   }
-}
\ No newline at end of file
+  if (jogging) {
+    serviceJog();
+  } else {
+    serviceMotion();
+  }
+}
+
+void handleCommand(String input) {
+  if (input == "STOP") {
+    haltAll();
+    Serial.println("Stopped");
+  } else if (input == "POS") {
+    printPosition();
+  } else if (input == "STATE") {
+    // "Idle" once every queued target and dwell is done
+    Serial.println(moving || queueCount > 0 || jogging || held ? "Busy" : "Idle");
+  } else if (input.startsWith("STREAM,")) {
+    streaming = input.charAt(7) == '1';
+  } else if (input.startsWith("FEED,")) {
+    feedScale = constrain(input.substring(5).toFloat(), 10, 200) / 100.0;
+    if (!jogging) applyFeed(); // A jog keeps its own speed; serviceJog() applies it after
+  } else if (input.startsWith("JOG,")) {
+    // Jog velocity (e.g. "JOG,X,-800"); 0 stops with deceleration
+    char axis = input.charAt(4);
+    float speed = input.substring(6).toFloat();
+    if (axis != 'X' && axis != 'Y') return;
+    if (speed == 0) {
+      if (jogging) stopJog();
+    } else if (jogging && jogAxis == axis) {
+      lastJogMs = millis(); // Keepalive
+    } else if (!jogging && !moving) {
+      startJog(axis, speed);
+    }
+  } else if (jogging) {
+    return; // Ignore moves until the jog has decelerated
+  } else if (input == "HOME") {
+    clearQueue();
+    dwelling = false;
+    held = false;
+    startMove(0, 0);
+  } else if (input.startsWith("DWELL,")) {
+    // Queued pause in ms (G-code G4)
+    long ms = input.substring(6).toInt();
+    if (ms > 0) enqueue(NO_TARGET, NO_TARGET, ms);
+  } else if (input.startsWith("SETX:") || input.startsWith("SETY:")) {
+    // Redefine the current position (GUI units) without moving
+    long steps = hostToSteps(input.substring(5).toFloat());
+    if (input.charAt(3) == 'X') {
+      stepperX.setCurrentPosition(steps);
+      stepperZ.setCurrentPosition(steps);
+    } else {
+      stepperY.setCurrentPosition(steps);
+    }
+  } else if (input.startsWith("CONX:") || input.startsWith("CONY:")) {
+    // Soft limits in GUI units, e.g. "CONX:100,8000"
+    int comma = input.indexOf(',');
+    if (comma == -1) return;
+    long low = hostToSteps(input.substring(5, comma).toFloat());
+    long high = hostToSteps(input.substring(comma + 1).toFloat());
+    if (input.charAt(3) == 'X') {
+      minX = low;
+      maxX = high;
+    } else {
+      minY = low;
+      maxY = high;
+    }
+  } else if ((input.startsWith("X:") || input.startsWith("Y:"))) {
+    // Absolute single-axis target in GUI units, e.g. "X:4100,500" (speed field unused)
+    int comma = input.indexOf(',');
+    String value = comma == -1 ? input.substring(2) : input.substring(2, comma);
+    queueAxis(input.charAt(0), hostToSteps(value.toFloat()));
+  } else if (input.startsWith("X,")) {
+    // Parse X and Y positions (e.g., "X,200,Y,150")
+    int xIndex = input.indexOf("X,") + 2;
+    int yIndex = input.indexOf(",Y,");
+    if (yIndex == -1) return; // Invalid format
+    
+    String xPosStr = input.substring(xIndex, yIndex);
+    String yPosStr = input.substring(yIndex + 3);
+    
+    float targetXPos = xPosStr.toFloat();
+    float targetYPos = yPosStr.toFloat();
+    
+    // Constrain positions to 0-400 mm
+    targetXPos = constrain(targetXPos, 0, MAX_POSITION_MM);
+    targetYPos = constrain(targetYPos, 0, MAX_POSITION_MM);
+    
+    // Queue the target; serviceMotion() starts it once the previous one is done
+    enqueue(targetXPos * STEPS_PER_MM, targetYPos * STEPS_PER_MM);
+  }
+}
@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog, Toplevel, Label, Entry, Button
+from tkinter import ttk, messagebox, simpledialog, filedialog, Toplevel, Label, Entry, Button
 import serial
 import time
 import json
@@ -7,6 +7,42 @@ import os
 import re
 import threading
 
+import numpy as np
+
+from arm_kinematics import ArmIKSolver, tool_position
+from arm_motion import arc_path, interpolate_arm_frames, line_path, schedule_frames, task_space_frames
+from automation import (ARM_FRAME_RATE, RUN_JOURNAL_FILE, ScriptRunner, read_arm_angles, read_arm_frame_rate,
+                        read_journal, save_arm_pose, simulate_script)
+from clock import RealClock
+from cycle_time import estimate_script
+from feed_override import FeedOverride, TrajectoryClock
+from gcode_stream import GcodeStreamer
+from job_queue import JobQueue, JobScheduler
+from kinematic_chain import GantryArmChain
+from motion_process import MotionProcess, frame_schedule
+from recorder import Recorder, load_recording
+from render import DisplayRenderer
+from route_optimizer import optimize_script
+from shared_state import STATUS_ERROR, STATUS_IDLE, STATUS_MOVING, STATUS_NAMES, SharedState
+from servo_calibration import (CALIBRATION_FILE, clear_table, compile_table, default_profile, load_profiles,
+                               save_profiles, upload_table)
+from simplify import ARM_SIMPLIFY_TOLERANCE, GANTRY_SIMPLIFY_TOLERANCE, rdp_mask, recording_steps
+from telemetry import TelemetryBuffer, decimate_minmax, minmax_polyline
+from trajectory_cache import TRAJECTORY_CACHE_DIR, TrajectoryCache, table_key
+
+JOG_HOLD_MS = 250         # press longer than this to jog instead of step
+JOG_KEEPALIVE_MS = 100    # resend interval while jogging (firmware times out after 300 ms)
+JOG_KEY_RELEASE_MS = 60   # grace period that absorbs key autorepeat
+GANTRY_POLL_S = 0.1       # POS polling interval while no run owns the port, also the gantry telemetry rate
+GANTRY_CLAIM_TIMEOUT = 2.0  # longest wait for the poller to finish a POS exchange (its readline times out after 1 s)
+TELEMETRY_REDRAW_MS = 100
+ARM_IDLE_CHECK_MS = 5000  # READ_POS interval while "Verify Pose When Idle" is on
+ARM_IDLE_AFTER_S = 2.0    # no frame sent for this long counts as idle
+ARM_MOTION_PROCESS = True   # stream arm moves from motion_process.py instead of the Tk thread
+ARM_MOTION_REALTIME = True  # ask for SCHED_FIFO for that process (Linux; ignored if not permitted)
+LIVE_STATE_MS = 50          # how often the display reads the shared live state
+TELEMETRY_COLORS = ["#e53935", "#1e88e5", "#43a047", "#fb8c00", "#8e24aa", "#00897b"]
+
 class UnifiedGantryArmGUI:
     def __init__(self, root):
         self.root = root
@@ -14,14 +50,35 @@ class UnifiedGantryArmGUI:
         self.root.geometry("900x900")
         self.root.configure(bg="#f0f0f0")
 
+        # Time source for motion pacing (swap for clock.VirtualClock in simulations)
+        self.clock = RealClock()
+
+        # Live device state shared with other processes (python shared_state.py to watch it)
+        try:
+            self.state = SharedState(create=True)
+        except FileExistsError as e:
+            messagebox.showerror("Shared State Error", f"{e}\nIf no other instance is running, "
+                                 "run python shared_state.py --remove and start again.")
+            raise SystemExit(1)
+
         # Serial Connections
         try:
             self.gantry_ser = serial.Serial('COM4', 9600, timeout=1)
-            self.arm_ser = serial.Serial('COM3', 9600, timeout=1)
+            if ARM_MOTION_PROCESS:
+                self.motion = MotionProcess('COM3', 9600, realtime=ARM_MOTION_REALTIME, state_name=self.state.name)
+                self.arm_ser = self.motion.port  # everything else still reads and writes through this
+            else:
+                self.motion = None
+                self.arm_ser = serial.Serial('COM3', 9600, timeout=1)
             time.sleep(2)
         except serial.SerialException as e:
             messagebox.showerror("Serial Error", f"Failed to connect: {e}")
             self.root.quit()
+        # The POS poller and whatever waits for gantry replies on the Tk thread
+        # (a script, the job queue, G-code, a single POS read) take turns on the
+        # port, so neither reads the other's replies
+        self.gantry_port_lock = threading.Lock()
+        self.gantry_port_owner = None  # what holds the port: a script run, the G-code streamer, ...
 
         # JSON Files
         self.gantry_pos_file = "gantry_positions.json"
@@ -29,6 +86,11 @@ class UnifiedGantryArmGUI:
         self.arm_pos_file = "arm_positions.json"
         self.arm_seq_file = "arm_sequences.json"
         self.auto_file = "automation_scripts.json"
+        self.journal_file = RUN_JOURNAL_FILE
+        self.job_queue = JobQueue()
+        self.cal_file = CALIBRATION_FILE
+        self.trajectory_cache = TrajectoryCache(cache_dir=TRAJECTORY_CACHE_DIR)
+        self.arm_calibration_key = ""  # table_key() of the table last uploaded from here
 
         # Initialize Data
         self.gantry_positions = self.load_json(self.gantry_pos_file)
@@ -39,7 +101,18 @@ class UnifiedGantryArmGUI:
 
         # GUI Setup
         self.notebook = ttk.Notebook(root)
+        # Feed override scales every playback, whichever tab started it
+        self.feed_override = FeedOverride()
+        override_frame = tk.Frame(root, bg="#f0f0f0")
+        override_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10)
+        tk.Label(override_frame, text="Feed Override %:", bg="#f0f0f0").pack(side=tk.LEFT)
+        self.feed_override_scale = tk.Scale(override_frame, from_=10, to=200, resolution=5, orient=tk.HORIZONTAL,
+                                            length=300, command=self.on_feed_override)
+        self.feed_override_scale.set(100)
+        self.feed_override_scale.pack(side=tk.LEFT, padx=5)
+        tk.Button(override_frame, text="100%", command=lambda: self.feed_override_scale.set(100)).pack(side=tk.LEFT)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.renderer = DisplayRenderer(root)  # all position displays go through here
 
         # Gantry Tab
         self.gantry_frame = tk.Frame(self.notebook, bg="#e3f2fd")
@@ -56,6 +129,11 @@ class UnifiedGantryArmGUI:
         self.notebook.add(self.auto_frame, text="Automation")
         self.setup_auto_tab()
 
+        # Telemetry Tab
+        self.telemetry_frame = tk.Frame(self.notebook, bg="#fff3e0")
+        self.notebook.add(self.telemetry_frame, text="Telemetry")
+        self.setup_telemetry_tab()
+
         # Gantry Update Thread (Arm doesn't need updates since Uno doesn't return positions)
         self.running = True
         self.gantry_slider_moving = False
@@ -63,6 +141,16 @@ class UnifiedGantryArmGUI:
         self.update_thread.daemon = True
         self.update_thread.start()
 
+        # Start from the pose the arm reports instead of assuming all zeros
+        self.sync_arm_pose()
+        try:
+            self.arm_frame_rate = read_arm_frame_rate(self.arm_ser, self.clock) or ARM_FRAME_RATE
+        except serial.SerialException:
+            self.arm_frame_rate = ARM_FRAME_RATE
+        self.root.after(ARM_IDLE_CHECK_MS, self.check_arm_pose_idle)
+        self.shown_gantry_time = 0.0
+        self.root.after(LIVE_STATE_MS, self.show_live_state)
+
     def load_json(self, file_path):
         if os.path.exists(file_path):
             try:
@@ -84,6 +172,15 @@ class UnifiedGantryArmGUI:
 
     # Gantry Tab
     def setup_gantry_tab(self):
+        # Jog state
+        self.jog = None                    # (axis, direction) while jogging
+        self.jog_pending = None            # after() id until a press becomes a hold
+        self.jog_keepalive = None          # after() id of the next keepalive
+        self.jog_key_release = None        # after() id of a debounced key release
+        self.jog_click_suppressed = False  # swallow the click that ends a hold
+        self.gantry_streaming = False      # G-code owns the port; Stop goes through the streamer
+        self.gantry_limits = ((0, 8200), (0, 8200))  # as last sent with CONX/CONY
+
         # Axis Control
         axis_frame = tk.Frame(self.gantry_frame, bg="#e3f2fd", bd=2, relief=tk.RAISED)
         axis_frame.pack(fill=tk.X, pady=5)
@@ -94,8 +191,10 @@ class UnifiedGantryArmGUI:
         x_frame = tk.Frame(axis_frame, bg="#e3f2fd")
         x_frame.pack(fill=tk.X, padx=10, pady=5)
         tk.Label(x_frame, text="X/Z Axis (0–8200 steps):", bg="#e3f2fd").pack(side=tk.LEFT)
-        tk.Button(x_frame, text="X+", command=lambda: self.move_gantry_axis('X', True), bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
-        tk.Button(x_frame, text="X-", command=lambda: self.move_gantry_axis('X', False), bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
+        for text, direction in (("X+", True), ("X-", False)):
+            btn = tk.Button(x_frame, text=text, command=lambda d=direction: self.move_gantry_axis('X', d), bg="#4CAF50", fg="white")
+            btn.pack(side=tk.LEFT, padx=5)
+            self.bind_gantry_jog(btn, 'X', direction)
 
         # X Slider
         self.gantry_x_var = tk.DoubleVar(value=0)
@@ -107,8 +206,10 @@ class UnifiedGantryArmGUI:
         y_frame = tk.Frame(axis_frame, bg="#e3f2fd")
         y_frame.pack(fill=tk.X, padx=10, pady=5)
         tk.Label(y_frame, text="Y Axis (0–8200 steps):", bg="#e3f2fd").pack(side=tk.LEFT)
-        tk.Button(y_frame, text="Y+", command=lambda: self.move_gantry_axis('Y', True), bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
-        tk.Button(y_frame, text="Y-", command=lambda: self.move_gantry_axis('Y', False), bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
+        for text, direction in (("Y+", True), ("Y-", False)):
+            btn = tk.Button(y_frame, text=text, command=lambda d=direction: self.move_gantry_axis('Y', d), bg="#4CAF50", fg="white")
+            btn.pack(side=tk.LEFT, padx=5)
+            self.bind_gantry_jog(btn, 'Y', direction)
 
         # Y Slider
         self.gantry_y_var = tk.DoubleVar(value=0)
@@ -116,6 +217,11 @@ class UnifiedGantryArmGUI:
                                         command=self.on_gantry_y_slider_move, bg="#e3f2fd", length=400)
         self.gantry_y_slider.pack(fill=tk.X, padx=10, pady=5)
 
+        # Hold-to-jog with the arrow keys while the Gantry tab is shown
+        for key, axis, direction in (("Right", 'X', True), ("Left", 'X', False), ("Up", 'Y', True), ("Down", 'Y', False)):
+            self.root.bind(f"<KeyPress-{key}>", lambda e, a=axis, d=direction: self.on_jog_key_press(e, a, d))
+            self.root.bind(f"<KeyRelease-{key}>", lambda e: self.on_jog_key_release(e))
+
         # Step Size
         step_frame = tk.Frame(axis_frame, bg="#e3f2fd")
         step_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -172,6 +278,7 @@ class UnifiedGantryArmGUI:
         control_frame.pack(fill=tk.X, pady=10)
         tk.Button(control_frame, text="Home", command=self.gantry_home, bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=5)
         tk.Button(control_frame, text="Emergency Stop", command=self.gantry_stop, bg="#f44336", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(control_frame, text="Run G-code", command=self.run_gcode_file, bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=5)
 
         # Saved Positions
         saved_frame = tk.Frame(self.gantry_frame, bg="#e3f2fd", bd=2, relief=tk.RAISED)
@@ -199,6 +306,8 @@ class UnifiedGantryArmGUI:
         tk.Button(seq_buttons, text="Play Seq", command=self.play_gantry_sequence, bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
         tk.Button(seq_buttons, text="Modify", command=self.modify_gantry_step, bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=5)
         tk.Button(seq_buttons, text="Delete Step", command=self.delete_gantry_step, bg="#f44336", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(seq_buttons, text="Simplify", command=lambda: self.simplify_sequence_dialog("gantry"), bg="#673ab7", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(seq_buttons, text="Import Recording", command=lambda: self.import_recording("gantry"), bg="#673ab7", fg="white").pack(side=tk.LEFT, padx=5)
 
         # Status
         status_frame = tk.Frame(self.gantry_frame, bg="#e3f2fd")
@@ -218,8 +327,13 @@ class UnifiedGantryArmGUI:
         self.movement_mode = "simultaneous"  # Default to simultaneous movement
         self.movement_mode_enabled = False   # Default to disabled
         self.last_angles = [0] * 6           # Track last sent angles for single motor movement
+        self.last_arm_frame_time = 0.0       # when the last frame was sent, for idle pose checks
+        self.arm_frame_rate = ARM_FRAME_RATE # servo frames/s the arm latches (RATE), caps send_arm_angles
+        self.pending_arm_frame = None        # newest frame held back by the rate cap
         self.stop_flag = [False]             # Stop flag for emergency stop
         self.joint_names = ["Base", "Shoulder", "Elbow", "Wrist Tilt", "Wrist Rotate", "Gripper"]
+        self.ik_solver = ArmIKSolver()
+        self.chain = GantryArmChain(self.ik_solver)
 
         # Main frame with two columns
         main_frame = tk.Frame(self.arm_frame, bg="#c8e6c9")
@@ -268,10 +382,7 @@ class UnifiedGantryArmGUI:
                 to=30,
                 orient=tk.HORIZONTAL,
                 resolution=1,
-                command=lambda x, idx=i: (
-                    self.send_arm_angles([servo.get() for servo in self.sliders], single_motor_index=idx if self.movement_mode_enabled and self.movement_mode == "single" else None),
-                    self.update_arm_angle_labels()
-                ),
+                command=lambda value, idx=i: self.on_arm_slider_move(idx, value),
                 bg="#e3f2fd",
                 troughcolor="#bbdefb",
                 length=300
@@ -322,6 +433,24 @@ class UnifiedGantryArmGUI:
         )
         self.mode_button.pack(side=tk.LEFT, padx=5)
 
+        self.task_space_var = tk.IntVar(value=0)
+        tk.Checkbutton(
+            movement_mode_frame,
+            text="Straight-Line Tool Path",
+            variable=self.task_space_var,
+            bg="#d1c4e9",
+            font=("Helvetica", 9)
+        ).pack(anchor="w", padx=10, pady=2)
+
+        self.verify_pose_var = tk.IntVar(value=0)
+        tk.Checkbutton(
+            movement_mode_frame,
+            text="Verify Pose When Idle",
+            variable=self.verify_pose_var,
+            bg="#d1c4e9",
+            font=("Helvetica", 9)
+        ).pack(anchor="w", padx=10, pady=2)
+
         ttk.Separator(left_scrollable_frame, orient="horizontal").pack(fill=tk.X, pady=10)
 
         # Control buttons (left column)
@@ -346,7 +475,9 @@ class UnifiedGantryArmGUI:
             ("Home Position", self.arm_home_position),
             ("Emergency Stop", self.arm_emergency_stop),
             ("Custom Angles (Comma-Separated)", self.arm_custom_angles),
-            ("Custom Joint Angles", self.arm_custom_joint_angles)
+            ("Custom Joint Angles", self.arm_custom_joint_angles),
+            ("Tool Position (X,Y,Z mm)", self.arm_tool_position),
+            ("Servo Calibration", self.arm_calibration)
         ]
 
         button_grid_frame = tk.Frame(button_frame, bg="#c8e6c9")
@@ -526,6 +657,26 @@ class UnifiedGantryArmGUI:
             relief=tk.RAISED
         ).pack(side=tk.LEFT, padx=2)
 
+        tk.Button(
+            sequence_buttons_frame,
+            text="Simplify",
+            command=lambda: self.simplify_sequence_dialog("arm"),
+            bg="#673ab7",
+            fg="white",
+            font=("Helvetica", 8),
+            relief=tk.RAISED
+        ).pack(side=tk.LEFT, padx=2)
+
+        tk.Button(
+            sequence_buttons_frame,
+            text="Import Recording",
+            command=lambda: self.import_recording("arm"),
+            bg="#673ab7",
+            fg="white",
+            font=("Helvetica", 8),
+            relief=tk.RAISED
+        ).pack(side=tk.LEFT, padx=2)
+
         # Update lists after all widgets are initialized
         self.update_arm_lists()
 
@@ -540,7 +691,7 @@ class UnifiedGantryArmGUI:
         action_frame = tk.Frame(create_frame, bg="#d1c4e9")
         action_frame.pack(fill=tk.X, padx=10, pady=5)
         tk.Label(action_frame, text="Action Type:", bg="#d1c4e9").pack(side=tk.LEFT)
-        self.action_type = ttk.Combobox(action_frame, values=["Gantry Position", "Arm Sequence"], state="readonly")
+        self.action_type = ttk.Combobox(action_frame, values=["Gantry Position", "Arm Sequence", "Tool Target (X,Y,Z mm)"], state="readonly")
         self.action_type.pack(side=tk.LEFT, padx=5)
         tk.Label(action_frame, text="Name:", bg="#d1c4e9").pack(side=tk.LEFT)
         self.action_name = ttk.Combobox(action_frame)
@@ -558,6 +709,8 @@ class UnifiedGantryArmGUI:
         tk.Button(script_buttons, text="Move Up", command=self.move_auto_action_up, bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=5)
         tk.Button(script_buttons, text="Move Down", command=self.move_auto_action_down, bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=5)
         tk.Button(script_buttons, text="Delete", command=self.delete_auto_action, bg="#f44336", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(script_buttons, text="Pin/Unpin", command=self.toggle_auto_action_pin, bg="#673ab7", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(script_buttons, text="Optimize Order", command=self.optimize_auto_script, bg="#673ab7", fg="white").pack(side=tk.LEFT, padx=5)
 
         # Script Management
         manage_frame = tk.Frame(self.auto_frame, bg="#d1c4e9")
@@ -568,18 +721,53 @@ class UnifiedGantryArmGUI:
         tk.Button(manage_frame, text="Save Script", command=self.save_auto_script, bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
         tk.Button(manage_frame, text="Load Script", command=self.load_auto_script, bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
         tk.Button(manage_frame, text="Run Script", command=self.run_auto_script, bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(manage_frame, text="Simulate", command=self.simulate_auto_script, bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(manage_frame, text="Estimate", command=self.show_auto_estimate, bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=5)
+
+        run_frame = tk.Frame(self.auto_frame, bg="#d1c4e9")
+        run_frame.pack(fill=tk.X, pady=5)
+        tk.Button(run_frame, text="Pause", command=self.pause_auto_script, bg="#FF9800", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(run_frame, text="Resume", command=self.resume_auto_script, bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(run_frame, text="Resume Interrupted Run", command=self.resume_interrupted_run, bg="#673ab7", fg="white").pack(side=tk.LEFT, padx=5)
+
+        # Job Queue
+        queue_frame = tk.Frame(self.auto_frame, bg="#d1c4e9")
+        queue_frame.pack(fill=tk.X, pady=5)
+        queue_controls = tk.Frame(queue_frame, bg="#d1c4e9")
+        queue_controls.pack(fill=tk.X, padx=10)
+        tk.Label(queue_controls, text="Repeat:", bg="#d1c4e9").pack(side=tk.LEFT)
+        self.job_repeat = tk.Entry(queue_controls, width=5)
+        self.job_repeat.insert(0, "1")
+        self.job_repeat.pack(side=tk.LEFT, padx=5)
+        tk.Label(queue_controls, text="Priority:", bg="#d1c4e9").pack(side=tk.LEFT)
+        self.job_priority = tk.Entry(queue_controls, width=5)
+        self.job_priority.insert(0, "0")
+        self.job_priority.pack(side=tk.LEFT, padx=5)
+        tk.Button(queue_controls, text="Enqueue", command=self.enqueue_auto_script, bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(queue_controls, text="Run Queue", command=self.run_job_queue, bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(queue_controls, text="Clear Queue", command=self.clear_job_queue, bg="#f44336", fg="white").pack(side=tk.LEFT, padx=5)
+        self.job_list = tk.Listbox(queue_frame, height=4)
+        self.job_list.pack(fill=tk.X, padx=10, pady=5)
 
         # Status
         status_frame = tk.Frame(self.auto_frame, bg="#d1c4e9")
         status_frame.pack(fill=tk.X, pady=10)
         self.auto_status = tk.Label(status_frame, text="Ready", bg="#d1c4e9")
         self.auto_status.pack(pady=5)
+        self.auto_estimate = tk.Label(status_frame, text="Estimated cycle time: -", bg="#d1c4e9")
+        self.auto_estimate.pack(pady=5)
 
         self.current_script = []
+        self.current_script_name = None
+        self.active_runner = None
+        self.pause_flag = [False]
         self.update_auto_list()
 
     # Gantry Methods
     def move_gantry_axis(self, axis, direction):
+        if self.jog_click_suppressed:
+            self.jog_click_suppressed = False
+            return
         try:
             steps = int(self.gantry_step_size.get())
             if steps <= 0:
@@ -593,7 +781,87 @@ class UnifiedGantryArmGUI:
         except serial.SerialException:
             messagebox.showerror("Error", "Serial communication error")
 
+    def bind_gantry_jog(self, button, axis, direction):
+        """Holding an axis button longer than JOG_HOLD_MS jogs continuously; a short click still steps."""
+        button.bind("<ButtonPress-1>", lambda e: self.on_jog_press(axis, direction))
+        button.bind("<ButtonRelease-1>", lambda e: self.on_jog_release())
+
+    def on_jog_press(self, axis, direction):
+        self.cancel_pending_jog()
+        self.jog_pending = self.root.after(JOG_HOLD_MS, lambda: self.start_gantry_jog(axis, direction))
+
+    def on_jog_release(self):
+        self.cancel_pending_jog()
+        if self.jog is not None:
+            self.stop_gantry_jog()
+            self.jog_click_suppressed = True
+
+    def cancel_pending_jog(self):
+        if self.jog_pending is not None:
+            self.root.after_cancel(self.jog_pending)
+            self.jog_pending = None
+
+    def on_jog_key_press(self, event, axis, direction):
+        if self.notebook.select() != str(self.gantry_frame) or isinstance(event.widget, (tk.Entry, ttk.Combobox)):
+            return
+        # Key autorepeat sends release/press pairs; a press cancels the pending stop
+        if self.jog_key_release is not None:
+            self.root.after_cancel(self.jog_key_release)
+            self.jog_key_release = None
+        if self.jog != (axis, direction):
+            if self.jog is not None:
+                self.stop_gantry_jog()
+            self.start_gantry_jog(axis, direction)
+
+    def on_jog_key_release(self, event):
+        if self.jog is not None and self.jog_key_release is None:
+            self.jog_key_release = self.root.after(JOG_KEY_RELEASE_MS, self.on_jog_key_timeout)
+
+    def on_jog_key_timeout(self):
+        self.jog_key_release = None
+        self.stop_gantry_jog()
+
+    def gantry_jog_speed(self):
+        """Jog velocity in steps/s from the speed slider (µs per step)."""
+        return int(1000000 / max(self.gantry_speed_var.get(), 1))
+
+    def start_gantry_jog(self, axis, direction):
+        self.jog_pending = None
+        self.jog = (axis, direction)
+        self.send_gantry_jog()
+        self.gantry_status.config(text=f"Jogging {axis} {'+' if direction else '-'}")
+
+    def send_gantry_jog(self):
+        """Stream the jog velocity; the firmware stops the axis if this keepalive stops arriving."""
+        if self.jog is None:
+            return
+        axis, direction = self.jog
+        speed = self.gantry_jog_speed()
+        try:
+            self.gantry_ser.write(f"JOG,{axis},{speed if direction else -speed}\n".encode())
+        except serial.SerialException:
+            self.jog = None
+            messagebox.showerror("Error", "Serial communication error")
+            return
+        self.jog_keepalive = self.root.after(JOG_KEEPALIVE_MS, self.send_gantry_jog)
+
+    def stop_gantry_jog(self):
+        if self.jog is None:
+            return
+        axis, _ = self.jog
+        self.jog = None
+        if self.jog_keepalive is not None:
+            self.root.after_cancel(self.jog_keepalive)
+            self.jog_keepalive = None
+        try:
+            self.gantry_ser.write(f"JOG,{axis},0\n".encode())
+            self.gantry_status.config(text=f"Jog {axis} stopped")
+        except serial.SerialException:
+            messagebox.showerror("Error", "Serial communication error")
+
     def on_gantry_x_slider_move(self, value):
+        if self.renderer.is_echo(self.gantry_x_var, value):
+            return
         if not self.gantry_slider_moving:
             self.gantry_slider_moving = True
             try:
@@ -606,6 +874,8 @@ class UnifiedGantryArmGUI:
             self.gantry_slider_moving = False
 
     def on_gantry_y_slider_move(self, value):
+        if self.renderer.is_echo(self.gantry_y_var, value):
+            return
         if not self.gantry_slider_moving:
             self.gantry_slider_moving = True
             try:
@@ -617,9 +887,42 @@ class UnifiedGantryArmGUI:
                 messagebox.showerror("Error", "Serial communication error")
             self.gantry_slider_moving = False
 
+    def claim_gantry_port(self, owner):
+        """Take the gantry port from the POS poller, so replies and move confirmations reach only the caller.
+
+        Waits for the poller's current POS exchange to finish. Returns False,
+        after warning, if something else on the Tk thread already has it.
+        """
+        if self.gantry_port_owner is not None or not self.gantry_port_lock.acquire(timeout=GANTRY_CLAIM_TIMEOUT):
+            messagebox.showwarning("Busy", f"The gantry is busy ({self.gantry_port_owner or 'polling'})")
+            return False
+        self.gantry_port_owner = owner
+        try:
+            self.gantry_ser.reset_input_buffer()  # a POS reply the poller gave up waiting for
+        except serial.SerialException:
+            pass
+        return True
+
+    def release_gantry_port(self):
+        self.gantry_port_owner = None
+        self.gantry_port_lock.release()
+
     def gantry_stop(self):
+        if self.gantry_streaming:
+            self.stop_flag[0] = True  # the streamer sends the halt and stops reading
+            return
+        if self.gantry_port_owner is not None:
+            # A running script is reading the port; it sees the flag once the halt ends its move
+            self.stop_flag[0] = True
+            try:
+                self.gantry_ser.write(b"!")
+            except serial.SerialException:
+                messagebox.showerror("Error", "Serial communication error")
+            return
+        if not self.claim_gantry_port("stopping"):
+            return
         try:
-            self.gantry_ser.write("STOP\n".encode())
+            self.gantry_ser.write(b"!")  # realtime halt, bypasses queued lines
             start_time = time.time()
             while time.time() - start_time < 1:
                 if self.gantry_ser.in_waiting:
@@ -630,6 +933,42 @@ class UnifiedGantryArmGUI:
             messagebox.showwarning("Warning", "Stop failed: No response")
         except serial.SerialException:
             messagebox.showerror("Error", "Serial communication error")
+        finally:
+            self.release_gantry_port()
+
+    def run_gcode_file(self):
+        file_path = filedialog.askopenfilename(filetypes=[("G-code", "*.gcode *.nc *.ngc *.txt"), ("All files", "*.*")])
+        if not file_path:
+            return
+        if not self.claim_gantry_port("G-code"):
+            return
+        self.stop_flag[0] = False
+        self.gantry_streaming = True
+        streamer = GcodeStreamer(self.gantry_ser, clock=self.clock, stop_flag=self.stop_flag,
+                                 on_position=self.publish_gantry_position)
+
+        # The streamer blocks waiting for "ok"s, so it runs on its own thread
+        # and everything that touches Tk is handed back with after()
+        def progress(count, command):
+            self.root.after(0, lambda: self.gantry_status.config(text=f"G-code line {count}: {command}"))
+
+        def finish(count, error):
+            self.gantry_streaming = False
+            self.release_gantry_port()
+            if error is not None:
+                messagebox.showerror("Error", f"G-code failed: {error}")
+            else:
+                self.gantry_status.config(text=f"G-code {'stopped' if self.stop_flag[0] else 'done'} ({count} lines)")
+
+        def stream():
+            count, error = 0, None
+            try:
+                count = streamer.stream_file(file_path, on_progress=progress)
+            except (OSError, ValueError, serial.SerialException) as e:
+                error = e
+            self.root.after(0, lambda: finish(count, error))
+
+        threading.Thread(target=stream, daemon=True).start()
 
     def gantry_home(self):
         try:
@@ -646,8 +985,8 @@ class UnifiedGantryArmGUI:
                 raise ValueError("Position must be 0–8200")
             self.gantry_ser.write(f"SETX:{x_pos}\n".encode())
             self.gantry_ser.write(f"SETY:{y_pos}\n".encode())
-            self.gantry_x_var.set(x_pos)
-            self.gantry_y_var.set(y_pos)
+            self.renderer.set(self.gantry_x_var, x_pos)
+            self.renderer.set(self.gantry_y_var, y_pos)
             self.gantry_status.config(text=f"Position set to X:{x_pos}, Y:{y_pos}")
             self.gantry_x_pos.delete(0, tk.END)
             self.gantry_y_pos.delete(0, tk.END)
@@ -666,6 +1005,7 @@ class UnifiedGantryArmGUI:
                 raise ValueError("Constraints must be 0 ≤ min ≤ max ≤ 8200")
             self.gantry_ser.write(f"CONX:{x_min},{x_max}\n".encode())
             self.gantry_ser.write(f"CONY:{y_min},{y_max}\n".encode())
+            self.gantry_limits = ((x_min, x_max), (y_min, y_max))
             self.gantry_x_slider.config(from_=x_min, to=x_max)
             self.gantry_y_slider.config(from_=y_min, to=y_max)
             self.gantry_status.config(text=f"Constraints set: X:{x_min}-{x_max}, Y:{y_min}-{y_max}")
@@ -681,9 +1021,7 @@ class UnifiedGantryArmGUI:
             name = simpledialog.askstring("Save Position", "Enter name:")
             if not name:
                 return
-            self.gantry_ser.write("POS\n".encode())
-            time.sleep(0.1)
-            response = self.gantry_ser.readline().decode().strip()
+            response = self.read_gantry_pos_line()
             if response.startswith("X:"):
                 x_pos = int(response[2:response.index(",Y:")])
                 y_pos = int(response[response.index(",Y:") + 3:])
@@ -707,8 +1045,8 @@ class UnifiedGantryArmGUI:
             self.gantry_ser.write(f"X:{x_pos},{speed}\n".encode())
             time.sleep(0.1)
             self.gantry_ser.write(f"Y:{y_pos},{speed}\n".encode())
-            self.gantry_x_var.set(x_pos)
-            self.gantry_y_var.set(y_pos)
+            self.renderer.set(self.gantry_x_var, x_pos)
+            self.renderer.set(self.gantry_y_var, y_pos)
             self.gantry_status.config(text=f"Loaded '{name}': X:{x_pos}, Y:{y_pos}")
         except serial.SerialException:
             messagebox.showerror("Error", "Serial communication error")
@@ -727,11 +1065,19 @@ class UnifiedGantryArmGUI:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to delete: {e}")
 
-    def record_gantry_step(self):
+    def read_gantry_pos_line(self):
+        """Ask for POS and return the reply line, with the port taken from the poller meanwhile."""
+        if not self.claim_gantry_port("reading position"):
+            return ""
         try:
             self.gantry_ser.write("POS\n".encode())
-            time.sleep(0.1)
-            response = self.gantry_ser.readline().decode().strip()
+            return self.gantry_ser.readline().decode().strip()
+        finally:
+            self.release_gantry_port()
+
+    def record_gantry_step(self):
+        try:
+            response = self.read_gantry_pos_line()
             if response.startswith("X:"):
                 x_pos = int(response[2:response.index(",Y:")])
                 y_pos = int(response[response.index(",Y:") + 3:])
@@ -771,16 +1117,18 @@ class UnifiedGantryArmGUI:
             messagebox.showwarning("Error", "No sequence loaded")
             return
         try:
-            speed = self.gantry_speed_var.get()
             for step in self.current_gantry_seq:
+                # Read per step so speed changes apply from the next move; the
+                # feed override is applied by the firmware (FEED)
+                speed = self.gantry_speed_var.get()
                 x_pos, y_pos = step
                 self.gantry_ser.write(f"X:{x_pos},{speed}\n".encode())
                 time.sleep(0.1)
                 self.gantry_ser.write(f"Y:{y_pos},{speed}\n".encode())
-                self.gantry_x_var.set(x_pos)
-                self.gantry_y_var.set(y_pos)
+                self.renderer.set(self.gantry_x_var, x_pos)
+                self.renderer.set(self.gantry_y_var, y_pos)
                 self.gantry_status.config(text=f"Playing: X:{x_pos}, Y:{y_pos}")
-                self.root.update()
+                self.renderer.pump()
                 time.sleep(speed / 1000000.0)
             self.gantry_status.config(text="Playback complete")
         except serial.SerialException:
@@ -844,50 +1192,146 @@ class UnifiedGantryArmGUI:
             send_angles[single_motor_index] = angles[single_motor_index]
         else:
             send_angles = angles
-        angle_str = ",".join(map(str, send_angles)) + "\n"
+        self.last_angles = send_angles  # Update last sent angles
+        # The arm latches at most one frame per PWM period; hold newer frames
+        # back and send only the latest once the period has passed.
+        wait = 1.0 / self.arm_frame_rate - (time.time() - self.last_arm_frame_time)
+        if wait > 0:
+            if self.pending_arm_frame is None:
+                self.root.after(max(1, int(wait * 1000)), self.flush_arm_frame)
+            self.pending_arm_frame = send_angles
+            return
+        self.write_arm_frame(send_angles)
+
+    def flush_arm_frame(self):
+        if self.pending_arm_frame is not None:
+            angles, self.pending_arm_frame = self.pending_arm_frame, None
+            self.write_arm_frame(angles)
+
+    def write_arm_frame(self, angles):
+        angle_str = ",".join(map(str, angles)) + "\n"
         try:
             self.arm_ser.write(angle_str.encode())
-            self.last_angles = send_angles  # Update last sent angles
+            self.last_arm_frame_time = time.time()
+            self.telemetry.update_range(time.time(), "J1", angles)
+            if self.motion is None:
+                self.state.write_arm(angles)  # with a motion process, it publishes the frames it sends
         except serial.SerialException:
             messagebox.showerror("Error", "Serial communication error")
+            self.sync_arm_pose()
+
+    def sync_arm_pose(self):
+        """Read the arm's pose with READ_POS and make it the GUI's state. Returns True on success."""
+        try:
+            self.arm_ser.reset_input_buffer()
+            angles = read_arm_angles(self.arm_ser, self.clock)
+        except serial.SerialException:
+            return False
+        if angles is None:
+            return False
+        self.last_angles = list(angles)
+        for i, angle in enumerate(angles):
+            self.renderer.set(self.sliders[i], min(max(angle, -30), 30))
+        self.update_arm_angle_labels()
+        self.telemetry.update_range(time.time(), "J1", angles)
+        return True
+
+    def check_arm_pose_idle(self):
+        """While enabled and the arm is idle, re-read its pose and adopt it if it drifted.
+
+        A running script or G-code file pumps Tk events, so this can fire in
+        the middle of one; it is skipped then rather than reading the arm port
+        under the runner or stopping the motion with a dialog.
+        """
+        busy = self.active_runner is not None or self.gantry_port_owner is not None
+        if not busy and self.verify_pose_var.get() and time.time() - self.last_arm_frame_time > ARM_IDLE_AFTER_S:
+            expected = [int(round(a)) for a in self.last_angles]
+            if self.sync_arm_pose() and self.last_angles != expected:
+                messagebox.showwarning("Arm Pose", f"Arm reported {self.last_angles}, expected {expected}. Display updated.")
+        self.root.after(ARM_IDLE_CHECK_MS, self.check_arm_pose_idle)
 
     def move_to_arm_angles(self, target_angles, speed_ms, sequential=False):
         """Smoothly transition to target angles with specified speed, optionally moving one motor at a time."""
-        current_angles = [servo.get() for servo in self.sliders]
-        steps = 20
-        step_delay = speed_ms // steps
-
-        if sequential and self.movement_mode_enabled and self.movement_mode == "single":
-            for motor_idx in range(len(current_angles)):
-                if self.stop_flag[0]:
-                    return
-                start_angle = current_angles[motor_idx]
-                end_angle = target_angles[motor_idx]
-                for step in range(steps + 1):
-                    if self.stop_flag[0]:
-                        return
-                    angle = start_angle + (end_angle - start_angle) * step / steps
-                    interpolated_angles = current_angles.copy()
-                    interpolated_angles[motor_idx] = int(round(angle))
-                    self.sliders[motor_idx].set(min(max(interpolated_angles[motor_idx], -30), 30))
-                    self.send_arm_angles(interpolated_angles, single_motor_index=motor_idx)
-                    self.update_arm_angle_labels()
-                    self.root.update()
-                    time.sleep(step_delay / 1000.0)
-                current_angles[motor_idx] = target_angles[motor_idx]
-        else:
-            for step in range(steps + 1):
-                if self.stop_flag[0]:
-                    return
-                interpolated_angles = []
-                for i in range(len(current_angles)):
-                    angle = current_angles[i] + (target_angles[i] - current_angles[i]) * step / steps
-                    interpolated_angles.append(int(round(angle)))
-                    self.sliders[i].set(min(max(interpolated_angles[i], -30), 30))
-                self.send_arm_angles(interpolated_angles)
-                self.update_arm_angle_labels()
-                self.root.update()
-                time.sleep(step_delay / 1000.0)
+        current_angles = self.arm_slider_angles()
+        step_delay = speed_ms // 20
+        sequential = sequential and self.movement_mode_enabled and self.movement_mode == "single"
+        if self.task_space_var.get() and not sequential:
+            self.move_arm_task_space(target_angles, speed_ms)
+            return
+
+        if self.motion is not None:
+            frames = [angles for angles, _ in interpolate_arm_frames(current_angles, target_angles, sequential=sequential)]
+            self.stream_arm_schedule(*frame_schedule(frames, step_delay / 1000.0, self.arm_frame_rate))
+            return
+
+        deadline = self.clock.time()
+        for interpolated_angles, motor_idx in interpolate_arm_frames(current_angles, target_angles, sequential=sequential):
+            if self.stop_flag[0]:
+                return
+            if motor_idx is None:
+                for i in range(len(interpolated_angles)):
+                    self.renderer.set(self.sliders[i], min(max(interpolated_angles[i], -30), 30))
+            else:
+                self.renderer.set(self.sliders[motor_idx], min(max(interpolated_angles[motor_idx], -30), 30))
+            self.send_arm_angles(interpolated_angles, single_motor_index=motor_idx)
+            self.update_arm_angle_labels()
+            self.renderer.pump()
+            # Sleep to an absolute deadline so redraw time doesn't stretch the move
+            deadline += self.feed_override.scaled(step_delay / 1000.0)
+            self.clock.sleep(deadline - self.clock.time())
+
+    def move_arm_task_space(self, target_angles, speed_ms, path=None):
+        """Move the tool tip along a straight line (or the given path) to target_angles.
+
+        Frames are computed up front through batched IK and then streamed at a fixed rate.
+        """
+        current_angles = self.arm_slider_angles()
+        try:
+            if path is None:
+                path = line_path(tool_position(current_angles), tool_position(target_angles))
+            u, frames = task_space_frames(self.ik_solver, current_angles, path, end_angles=target_angles)
+        except ValueError as e:
+            messagebox.showerror("Task-Space Move", f"Error: {e}")
+            return
+        if self.motion is not None:
+            self.stream_arm_schedule(schedule_frames(u, frames, speed_ms / 1000.0), speed_ms / 1000.0)
+            return
+        playback = TrajectoryClock(self.feed_override, self.clock)
+        for t, angles in schedule_frames(u, frames, speed_ms / 1000.0):
+            if self.stop_flag[0]:
+                return
+            self.clock.sleep(playback.until(t))
+            for i, angle in enumerate(angles):
+                self.renderer.set(self.sliders[i], min(max(angle, -30), 30))
+            self.send_arm_angles(angles)
+            self.update_arm_angle_labels()
+            self.renderer.pump()
+
+    def stream_arm_schedule(self, schedule, duration):
+        """Play a [(t, angles)] schedule in the motion process, following its frames on screen."""
+        self.flush_arm_frame()
+        stream = self.motion.play(schedule, duration)
+        self.motion.wait(stream, on_frame=self.show_streamed_frame, stop_flag=self.stop_flag, on_idle=self.renderer.pump)
+
+    def show_streamed_frame(self, angles):
+        self.last_angles = list(angles)
+        self.show_arm_frame(angles)
+
+    def on_feed_override(self, value):
+        factor = float(value) / 100
+        self.feed_override.set(factor)
+        if self.motion is not None:
+            self.motion.set_override(factor)
+        if self.gantry_streaming:
+            return  # the streamer counts every byte it puts in the firmware's buffer
+        try:
+            if self.active_runner is not None:
+                # Same thread as the run, between its writes; it also stretches the pending move's deadline
+                self.active_runner.sync_feed(force=True)
+            elif self.gantry_port_owner is None:
+                self.gantry_ser.write(f"FEED,{int(float(value))}\n".encode())
+        except serial.SerialException:
+            pass
 
     def toggle_arm_movement_mode(self):
         """Toggle between simultaneous and single motor movement."""
@@ -903,7 +1347,7 @@ class UnifiedGantryArmGUI:
         """Save current servo positions with a user-defined name."""
         name = simpledialog.askstring("Save Position", "Enter position name:")
         if name:
-            self.arm_positions[name] = [servo.get() for servo in self.sliders]
+            self.arm_positions[name] = self.arm_slider_angles()
             self.save_json(self.arm_positions, self.arm_pos_file)
             self.update_arm_lists()
             messagebox.showinfo("Success", f"Saved position '{name}'")
@@ -928,7 +1372,7 @@ class UnifiedGantryArmGUI:
 
     def record_arm_step(self):
         """Record current servo positions as a step in the sequence."""
-        self.recorded_sequence.append([servo.get() for servo in self.sliders])
+        self.recorded_sequence.append(self.arm_slider_angles())
         self.update_arm_lists()
         messagebox.showinfo("Recorded", f"Step {len(self.recorded_sequence)} recorded.")
 
@@ -951,6 +1395,10 @@ class UnifiedGantryArmGUI:
         target_angles = [0] * 6
         speed_ms = int(self.arm_speed_slider.get())
         self.move_to_arm_angles(target_angles, speed_ms, sequential=self.movement_mode_enabled and self.movement_mode == "single")
+        try:
+            save_arm_pose(self.arm_ser)
+        except serial.SerialException:
+            pass
         messagebox.showinfo("Home", "Returned to home position (0°).")
 
     def arm_emergency_stop(self):
@@ -977,6 +1425,31 @@ class UnifiedGantryArmGUI:
             except ValueError as e:
                 messagebox.showerror("Invalid Input", f"Error: {e}")
 
+    def arm_tool_position(self):
+        """Prompt for a Cartesian tool target and move there through inverse kinematics."""
+        current_angles = self.arm_slider_angles()
+        x, y, z = tool_position(current_angles)
+        input_str = simpledialog.askstring(
+            "Tool Position",
+            f"Enter tool X,Y,Z in mm (current: {x:.1f},{y:.1f},{z:.1f}).\n"
+            "Enter 6 values (via X,Y,Z then end X,Y,Z) for an arc:"
+        )
+        if input_str:
+            try:
+                coords = [float(v) for v in re.split(r',\s*', input_str.strip())]
+                if len(coords) not in (3, 6):
+                    raise ValueError("Exactly 3 or 6 coordinates required.")
+                target = coords[-3:]
+                angles = self.ik_solver.solve(target, seed=current_angles)
+                angles[4:] = current_angles[4:]
+                speed_ms = int(self.arm_speed_slider.get())
+                if len(coords) == 6:
+                    self.move_arm_task_space(angles, speed_ms, path=arc_path((x, y, z), coords[:3], target))
+                else:
+                    self.move_to_arm_angles(angles, speed_ms, sequential=self.movement_mode_enabled and self.movement_mode == "single")
+            except ValueError as e:
+                messagebox.showerror("Invalid Input", f"Error: {e}")
+
     def arm_custom_joint_angles(self):
         """Open a dialog for individual joint angle inputs."""
         dialog = Toplevel(self.root)
@@ -1011,6 +1484,86 @@ class UnifiedGantryArmGUI:
         Button(dialog, text="Apply", command=apply_angles, bg="#4CAF50", fg="white").pack(pady=10)
         Button(dialog, text="Cancel", command=dialog.destroy, bg="#f44336", fg="white").pack(pady=5)
 
+    def arm_calibration(self):
+        """Edit per-joint calibration profiles and upload one to the arm as a pulse table."""
+        dialog = Toplevel(self.root)
+        dialog.title("Servo Calibration")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        profiles = load_profiles(self.cal_file)
+        name_frame = tk.Frame(dialog)
+        name_frame.pack(fill=tk.X, padx=10, pady=5)
+        Label(name_frame, text="Profile:").pack(side=tk.LEFT)
+        name_var = tk.StringVar(value=next(iter(profiles), "default"))
+        ttk.Combobox(name_frame, textvariable=name_var, values=list(profiles), width=20).pack(side=tk.LEFT, padx=5)
+
+        grid = tk.Frame(dialog)
+        grid.pack(padx=10, pady=5)
+        fields = ["offset", "gain", "min", "max"]
+        for col, heading in enumerate(["Joint", "Offset (°)", "Gain", "Min", "Max", "Reversed"]):
+            Label(grid, text=heading, font=("Helvetica", 10, "bold")).grid(row=0, column=col, padx=4)
+        rows = []
+        for i, joint in enumerate(self.joint_names):
+            Label(grid, text=joint).grid(row=i + 1, column=0, sticky="w")
+            entries = {}
+            for col, field in enumerate(fields):
+                entries[field] = Entry(grid, width=7)
+                entries[field].grid(row=i + 1, column=col + 1, padx=2, pady=2)
+            entries["reversed"] = tk.BooleanVar()
+            tk.Checkbutton(grid, variable=entries["reversed"]).grid(row=i + 1, column=5)
+            rows.append(entries)
+
+        def show(profile):
+            for entries, joint in zip(rows, profile):
+                for field in fields:
+                    entries[field].delete(0, tk.END)
+                    entries[field].insert(0, str(joint[field]))
+                entries["reversed"].set(bool(joint["reversed"]))
+
+        def read_profile():
+            return [{**{field: float(entries[field].get()) for field in fields}, "reversed": entries["reversed"].get()}
+                    for entries in rows]
+
+        def save():
+            try:
+                profiles[name_var.get()] = read_profile()
+                compile_table(profiles[name_var.get()])  # validate before saving
+            except ValueError as e:
+                messagebox.showerror("Invalid Input", f"Error: {e}", parent=dialog)
+                return
+            save_profiles(profiles, self.cal_file)
+            messagebox.showinfo("Saved", f"Calibration '{name_var.get()}' saved", parent=dialog)
+
+        def upload():
+            try:
+                table = compile_table(read_profile())
+                upload_table(self.arm_ser, table, self.clock)
+            except (ValueError, serial.SerialException) as e:
+                messagebox.showerror("Error", f"Upload failed: {e}", parent=dialog)
+                return
+            self.arm_calibration_key = table_key(table)
+            self.send_arm_angles(self.last_angles)  # re-send so the new table takes effect
+            messagebox.showinfo("Uploaded", "Calibration table uploaded", parent=dialog)
+
+        def clear():
+            try:
+                clear_table(self.arm_ser, self.clock)
+            except (ValueError, serial.SerialException) as e:
+                messagebox.showerror("Error", f"Clear failed: {e}", parent=dialog)
+                return
+            self.arm_calibration_key = ""
+            self.send_arm_angles(self.last_angles)
+            messagebox.showinfo("Cleared", "Arm is back on the uncalibrated mapping", parent=dialog)
+
+        show(profiles.get(name_var.get(), default_profile()))
+        buttons = tk.Frame(dialog)
+        buttons.pack(pady=10)
+        for text, command, color in [("Load", lambda: show(profiles.get(name_var.get(), default_profile())), "#2196F3"),
+                                     ("Save", save, "#4CAF50"), ("Upload", upload, "#4CAF50"),
+                                     ("Clear Board", clear, "#f44336"), ("Close", dialog.destroy, "#f44336")]:
+            Button(buttons, text=text, command=command, bg=color, fg="white").pack(side=tk.LEFT, padx=5)
+
     def apply_arm_manual_angle(self, index):
         """Apply angle from manual input box to the corresponding slider."""
         try:
@@ -1018,13 +1571,109 @@ class UnifiedGantryArmGUI:
             if not value:
                 raise ValueError("Angle is empty.")
             angle = float(value)
-            self.sliders[index].set(min(max(angle, -30), 30))
-            current_angles = [servo.get() for servo in self.sliders]
+            self.renderer.set(self.sliders[index], min(max(angle, -30), 30))
+            current_angles = self.arm_slider_angles()
             self.send_arm_angles(current_angles, single_motor_index=index if self.movement_mode_enabled and self.movement_mode == "single" else None)
             self.update_arm_angle_labels()
         except ValueError as e:
             messagebox.showerror("Invalid Input", f"Error for {self.joint_names[index]}: {e}")
 
+    def import_recording(self, kind):
+        """Load a demonstration recording as the current arm or gantry sequence, then offer to simplify it."""
+        file_path = filedialog.askopenfilename(filetypes=[("CSV", "*.csv"), ("All files", "*.*")])
+        if not file_path:
+            return
+        wanted = ["J1", "J2", "J3", "J4", "J5", "J6"] if kind == "arm" else ["X", "Y"]
+        try:
+            _, values, channels = load_recording(file_path)
+            steps = recording_steps(values, channels, wanted)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Failed to import recording: {e}")
+            return
+        if not steps:
+            messagebox.showwarning("Error", "Recording has no samples for this device")
+            return
+        if kind == "arm":
+            self.recorded_sequence = steps
+            self.update_arm_lists()
+        else:
+            self.current_gantry_seq = steps
+            self.update_gantry_lists()
+        self.simplify_sequence_dialog(kind)
+
+    def simplify_sequence_dialog(self, kind):
+        """Preview and apply RDP waypoint reduction on the current arm or gantry sequence."""
+        steps = self.recorded_sequence if kind == "arm" else getattr(self, "current_gantry_seq", [])
+        if len(steps) < 3:
+            messagebox.showwarning("Error", "Need at least 3 steps to simplify")
+            return
+        dialog = Toplevel(self.root)
+        dialog.title("Simplify Sequence")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        unit = "°" if kind == "arm" else "steps"
+        tolerance_frame = tk.Frame(dialog)
+        tolerance_frame.pack(fill=tk.X, padx=10, pady=5)
+        Label(tolerance_frame, text=f"Tolerance ({unit}):").pack(side=tk.LEFT)
+        tolerance_entry = Entry(tolerance_frame, width=8)
+        tolerance_entry.insert(0, str(ARM_SIMPLIFY_TOLERANCE if kind == "arm" else GANTRY_SIMPLIFY_TOLERANCE))
+        tolerance_entry.pack(side=tk.LEFT, padx=5)
+        summary = Label(tolerance_frame, text="")
+        summary.pack(side=tk.LEFT, padx=10)
+
+        canvas = tk.Canvas(dialog, width=600, height=300, bg="white")
+        canvas.pack(padx=10, pady=5)
+        original = np.asarray(steps, dtype=float)
+        result = {"steps": None}
+
+        def preview():
+            try:
+                tolerance = float(tolerance_entry.get())
+                if tolerance < 0:
+                    raise ValueError("Tolerance must not be negative")
+            except ValueError as e:
+                messagebox.showerror("Invalid Input", f"Error: {e}", parent=dialog)
+                result["steps"] = None
+                return
+            keep = rdp_mask(original, tolerance)
+            result["steps"] = [list(step) for step, kept in zip(steps, keep) if kept]
+            summary.config(text=f"{len(steps)} → {len(result['steps'])} waypoints")
+
+            # Each channel against step index: original in grey, kept waypoints in colour
+            canvas.delete("all")
+            width, height = int(canvas["width"]), int(canvas["height"])
+            low, high = original.min() - 1, original.max() + 1
+            index = np.arange(len(steps), dtype=float)
+            columns, mins, maxs = decimate_minmax(index, original, 0, len(steps) - 1, width)
+            xs = np.flatnonzero(keep) * (width - 1) / (len(steps) - 1)
+            for channel in range(original.shape[1]):
+                outline = minmax_polyline(columns, mins[:, channel], maxs[:, channel], low, high, height)
+                if len(outline) >= 4:
+                    canvas.create_line(outline, fill="#bdbdbd")
+                ys = (height - 1) - (original[keep, channel] - low) * (height - 1) / (high - low)
+                color = TELEMETRY_COLORS[channel % len(TELEMETRY_COLORS)]
+                canvas.create_line(np.column_stack((xs, ys)).ravel().tolist(), fill=color, width=2)
+
+        def apply():
+            preview()
+            if result["steps"] is None:
+                return
+            if kind == "arm":
+                self.recorded_sequence = result["steps"]
+                self.update_arm_lists()
+            else:
+                self.current_gantry_seq = result["steps"]
+                self.update_gantry_lists()
+            dialog.destroy()
+
+        buttons = tk.Frame(dialog)
+        buttons.pack(pady=10)
+        Button(buttons, text="Preview", command=preview, bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=5)
+        Button(buttons, text="Apply", command=apply, bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
+        Button(buttons, text="Cancel", command=dialog.destroy, bg="#f44336", fg="white").pack(side=tk.LEFT, padx=5)
+        preview()
+
     def move_arm_step_up(self):
         """Move the selected step up in the sequence."""
         selected = self.arm_seq_list.curselection()
@@ -1065,10 +1714,20 @@ class UnifiedGantryArmGUI:
 
     def update_arm_angle_labels(self):
         """Update labels to show current slider angles."""
-        for i, label in enumerate(self.angle_labels):
-            label.config(text=f"{self.sliders[i].get()}°")
-        for i, label in enumerate(self.manual_angle_labels):
-            label.config(text=f"{self.sliders[i].get()}°")
+        for i, angle in enumerate(self.arm_slider_angles()):
+            self.renderer.set(self.angle_labels[i], f"{round(angle)}°")
+            self.renderer.set(self.manual_angle_labels[i], f"{round(angle)}°")
+
+    def arm_slider_angles(self):
+        """Angles the arm sliders show, including updates not yet drawn."""
+        return [self.renderer.get(servo) for servo in self.sliders]
+
+    def on_arm_slider_move(self, index, value):
+        """Send a slider drag to the arm; ignores the callback from displaying a position."""
+        if self.renderer.is_echo(self.sliders[index], value):
+            return
+        self.send_arm_angles(self.arm_slider_angles(), single_motor_index=index if self.movement_mode_enabled and self.movement_mode == "single" else None)
+        self.update_arm_angle_labels()
 
     # Automation Methods
     def add_auto_action(self):
@@ -1077,6 +1736,17 @@ class UnifiedGantryArmGUI:
         if not action_type or not name:
             messagebox.showwarning("Error", "Select action type and name")
             return
+        if action_type.startswith("Tool Target"):
+            try:
+                target = [float(v) for v in re.split(r',\s*', name.strip())]
+                if len(target) != 3:
+                    raise ValueError
+            except ValueError:
+                messagebox.showwarning("Error", "Enter the tool target as X,Y,Z in mm")
+                return
+            self.current_script.append({"type": "tool_target", "name": name, "target": target})
+            self.update_auto_list()
+            return
         type_key = "gantry_pos" if action_type == "Gantry Position" else "arm_seq"
         data = self.gantry_positions if type_key == "gantry_pos" else self.arm_sequences
         if name not in data:
@@ -1116,6 +1786,35 @@ class UnifiedGantryArmGUI:
             self.current_script.pop(index)
             self.update_auto_list()
 
+    def toggle_auto_action_pin(self):
+        """Pin a gantry visit so Optimize Order keeps it in place."""
+        selected = self.auto_script_list.curselection()
+        if not selected:
+            return
+        index = selected[0]
+        action = self.current_script[index]
+        if action["type"] != "gantry_pos":
+            messagebox.showwarning("Error", "Only gantry positions can be pinned")
+            return
+        action["fixed"] = not action.get("fixed", False)
+        self.update_auto_list()
+        self.auto_script_list.selection_set(index)
+
+    def optimize_auto_script(self):
+        """Reorder unpinned gantry visits (with their following actions) to minimize travel time."""
+        if not self.current_script:
+            messagebox.showwarning("Error", "No script loaded")
+            return
+        try:
+            start = (int(self.gantry_x_var.get()), int(self.gantry_y_var.get()))
+            new_script, before, after = optimize_script(self.current_script, self.gantry_positions, start)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Optimization failed: {e}")
+            return
+        self.current_script = new_script
+        self.update_auto_list()
+        self.auto_status.config(text=f"Gantry travel: {before:.1f} s -> {after:.1f} s")
+
     def save_auto_script(self):
         if not self.current_script:
             messagebox.showwarning("Error", "No script to save")
@@ -1135,49 +1834,232 @@ class UnifiedGantryArmGUI:
         name = simpledialog.askstring("Load Script", "Enter script name:")
         if name and name in self.automation_scripts:
             self.current_script = self.automation_scripts[name]
+            self.current_script_name = name
             self.update_auto_list()
             messagebox.showinfo("Loaded", f"Script '{name}' loaded")
         else:
             messagebox.showwarning("Error", "Script not found")
 
-    def run_auto_script(self):
-        if not self.current_script:
+    def run_auto_script(self, start_index=0, script=None, script_name=None):
+        script = script or self.current_script
+        if not script:
             messagebox.showwarning("Error", "No script loaded")
             return
+        if not self.claim_gantry_port("running a script"):
+            return
+        self.stop_flag[0] = False
+        self.pause_flag[0] = False
+        runner = self.make_auto_runner()
+        self.active_runner = runner
         try:
-            for action in self.current_script:
-                action_type = action["type"]
-                name = action["name"]
-                if action_type == "gantry_pos":
-                    if name not in self.gantry_positions:
-                        raise ValueError(f"Gantry position '{name}' not found")
-                    x_pos, y_pos = self.gantry_positions[name]
-                    speed = self.gantry_speed_var.get()
-                    self.gantry_ser.write(f"X:{x_pos},{speed}\n".encode())
-                    time.sleep(0.1)
-                    self.gantry_ser.write(f"Y:{y_pos},{speed}\n".encode())
-                    start_time = time.time()
-                    while time.time() - start_time < 2:
-                        if self.gantry_ser.in_waiting:
-                            response = self.gantry_ser.readline().decode().strip()
-                            if response.startswith("X:") and f"Y:{y_pos}" in response:
-                                break
-                    self.gantry_x_var.set(x_pos)
-                    self.gantry_y_var.set(y_pos)
-                    self.auto_status.config(text=f"Gantry moved to '{name}'")
-                elif action_type == "arm_seq":
-                    if name not in self.arm_sequences:
-                        raise ValueError(f"Arm sequence '{name}' not found")
-                    speed_ms = int(self.arm_speed_slider.get())
-                    for step in self.arm_sequences[name]:
-                        self.move_to_arm_angles(step, speed_ms, sequential=self.movement_mode_enabled and self.movement_mode == "single")
-                        self.auto_status.config(text=f"Playing arm step: {step}")
-                        self.root.update()
-                    self.auto_status.config(text=f"Arm sequence '{name}' completed")
-                self.root.update()
-            self.auto_status.config(text="Script complete")
+            report = runner.run(
+                script,
+                gantry_speed=self.gantry_speed_var.get(),
+                arm_speed_ms=int(self.arm_speed_slider.get()),
+                sequential=self.movement_mode_enabled and self.movement_mode == "single",
+                start_index=start_index,
+                script_name=script_name or self.current_script_name
+            )
+            self.auto_status.config(text=f"Script complete ({report['cycle_time']:.1f} s)")
         except (ValueError, serial.SerialException) as e:
             messagebox.showerror("Error", f"Automation failed: {e}")
+            self.last_angles = list(runner.arm_angles)
+            self.sync_arm_pose()  # the runner's idea of the pose may be wrong after an error
+        else:
+            self.last_angles = list(runner.arm_angles)
+        finally:
+            self.active_runner = None
+            self.pause_flag[0] = False
+            self.release_gantry_port()
+
+    def make_auto_runner(self):
+        return ScriptRunner(
+            self.gantry_ser, self.arm_ser, self.gantry_positions, self.arm_sequences,
+            clock=self.clock,
+            arm_angles=self.arm_slider_angles(),
+            gantry_start=[int(self.gantry_x_var.get()), int(self.gantry_y_var.get())],
+            chain=self.chain,
+            stop_flag=self.stop_flag,
+            on_status=self.show_auto_status,
+            on_arm_frame=self.show_arm_frame,
+            on_gantry_move=self.show_gantry_target,
+            arm_frame_rate=self.arm_frame_rate,
+            trajectory_cache=self.trajectory_cache,
+            calibration=self.arm_calibration_key,
+            motion=self.motion,
+            feed_override=self.feed_override,
+            pause_flag=self.pause_flag,
+            on_wait=self.renderer.pump,
+            journal=self.journal_file,
+            gantry_limits=self.gantry_limits,
+            on_position=self.publish_gantry_position
+        )
+
+    def enqueue_auto_script(self):
+        """Add the loaded script to the job queue with the given repeat count and priority."""
+        if not self.current_script:
+            messagebox.showwarning("Error", "No script loaded")
+            return
+        try:
+            self.job_queue.put(self.current_script_name or "untitled", list(self.current_script),
+                               repeat=int(self.job_repeat.get()), priority=int(self.job_priority.get()))
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid job: {e}")
+            return
+        self.update_job_list()
+
+    def run_job_queue(self):
+        """Run every queued job back to back; jobs enqueued meanwhile run too."""
+        if self.active_runner is not None:
+            messagebox.showwarning("Error", "A script is already running")
+            return
+        if not len(self.job_queue):
+            messagebox.showwarning("Error", "The job queue is empty")
+            return
+        if not self.claim_gantry_port("running the job queue"):
+            return
+        self.stop_flag[0] = False
+        self.pause_flag[0] = False
+        runner = self.make_auto_runner()
+        scheduler = JobScheduler(
+            runner, self.job_queue,
+            gantry_speed=self.gantry_speed_var.get(),
+            arm_speed_ms=int(self.arm_speed_slider.get()),
+            sequential=self.movement_mode_enabled and self.movement_mode == "single",
+            on_job=self.show_job
+        )
+        self.active_runner = runner
+        try:
+            jobs = scheduler.run_pending()
+        finally:
+            self.active_runner = None
+            self.pause_flag[0] = False
+            self.last_angles = list(runner.arm_angles)
+            self.release_gantry_port()
+        failed = [job for job in jobs if job.state == "failed"]
+        if failed:
+            self.sync_arm_pose()  # the runner's idea of the pose may be wrong after an error
+            messagebox.showerror("Error", "\n".join(f"Job {job.id} '{job.name}' failed: {job.error}" for job in failed))
+        self.auto_status.config(text=f"Queue finished ({sum(len(job.runs) for job in jobs)} runs)")
+
+    def clear_job_queue(self):
+        self.job_queue.cancel()
+        self.update_job_list()
+
+    def show_job(self, job):
+        self.update_job_list()
+        self.auto_status.config(text=f"Job {job.id} '{job.name}': run {min(len(job.runs) + 1, job.repeat)}/{job.repeat} ({job.state})")
+        self.renderer.pump()
+
+    def update_job_list(self):
+        self.job_list.delete(0, tk.END)
+        for job in self.job_queue.jobs.values():
+            stats = job.stats()
+            line = f"#{job.id} {job.name} x{job.repeat} (priority {job.priority}) - {job.state}, {stats['runs']}/{job.repeat} runs"
+            if job.runs:
+                line += f", {stats['min']:.1f}/{stats['mean']:.1f}/{stats['max']:.1f} s"
+            if job.gaps:
+                line += f", gap {stats['gap_mean'] * 1000:.0f} ms"
+            self.job_list.insert(tk.END, line)
+
+    def pause_auto_script(self):
+        """Hold the running script mid-motion; Resume continues from the same trajectory sample."""
+        if self.active_runner is None:
+            messagebox.showwarning("Error", "No script running")
+            return
+        self.active_runner.pause()
+        self.auto_status.config(text="Paused")
+
+    def resume_auto_script(self):
+        if self.active_runner is None or not self.pause_flag[0]:
+            return
+        self.active_runner.resume()
+        self.auto_status.config(text="Resumed")
+
+    def resume_interrupted_run(self):
+        """Continue the last run from its first unfinished action, as recorded in the journal."""
+        if self.active_runner is not None:
+            messagebox.showwarning("Error", "A script is already running")
+            return
+        run = read_journal(self.journal_file)
+        if run is None:
+            messagebox.showinfo("Resume", "No interrupted run to resume")
+            return
+        label = f"'{run['name']}'" if run["name"] else "the last script"
+        if not messagebox.askyesno("Resume", f"Resume {label} from action {run['next'] + 1} of {run['actions']}?"):
+            return
+        self.sync_arm_pose()  # the pose may have changed since the run was cut short
+        self.run_auto_script(start_index=run["next"], script=run["script"], script_name=run["name"])
+
+    def simulate_auto_script(self):
+        """Run the current script against simulated devices in virtual time and report the timeline."""
+        if not self.current_script:
+            messagebox.showwarning("Error", "No script loaded")
+            return
+        try:
+            report = simulate_script(
+                self.current_script, self.gantry_positions, self.arm_sequences,
+                gantry_speed=self.gantry_speed_var.get(),
+                arm_speed_ms=int(self.arm_speed_slider.get()),
+                sequential=self.movement_mode_enabled and self.movement_mode == "single",
+                gantry_start=(int(self.gantry_x_var.get()), int(self.gantry_y_var.get())),
+                arm_start=self.arm_slider_angles()
+            )
+        except ValueError as e:
+            messagebox.showerror("Error", f"Simulation failed: {e}")
+            return
+        lines = [f"{a['start']:7.2f} s  {a['end'] - a['start']:6.2f} s  {a['type']} '{a['name']}'" for a in report["actions"]]
+        self.auto_status.config(text=f"Simulated cycle time: {report['cycle_time']:.2f} s")
+        messagebox.showinfo("Simulation", "\n".join(lines + [f"Cycle time: {report['cycle_time']:.2f} s"]))
+
+    def estimate_auto_script(self):
+        return estimate_script(
+            self.current_script, self.gantry_positions, self.arm_sequences,
+            gantry_start=(int(self.gantry_x_var.get()), int(self.gantry_y_var.get())),
+            arm_start=self.arm_slider_angles(),
+            arm_speed_ms=int(self.arm_speed_slider.get()),
+            sequential=self.movement_mode_enabled and self.movement_mode == "single",
+            chain=self.chain
+        )
+
+    def show_auto_estimate(self):
+        """Show the per-action cycle-time breakdown of the current script."""
+        if not self.current_script:
+            messagebox.showwarning("Error", "No script loaded")
+            return
+        try:
+            estimate = self.estimate_auto_script()
+        except ValueError as e:
+            messagebox.showerror("Error", f"Estimate failed: {e}")
+            return
+        lines = [f"Action {a['index']+1}: {a['type']} '{a['name']}' - {a['ms']:.0f} ms" for a in estimate["actions"]]
+        messagebox.showinfo("Cycle Time Estimate", "\n".join(lines + [f"Total: {estimate['total_ms'] / 1000.0:.2f} s"]))
+
+    def show_auto_status(self, text):
+        self.auto_status.config(text=text)
+        self.renderer.pump()
+
+    def show_arm_frame(self, angles):
+        self.last_arm_frame_time = time.time()
+        self.telemetry.update_range(self.last_arm_frame_time, "J1", angles)
+        for i, angle in enumerate(angles):
+            self.renderer.set(self.sliders[i], min(max(angle, -30), 30))
+        self.update_arm_angle_labels()
+        self.renderer.pump()
+
+    def show_gantry_target(self, x_pos, y_pos):
+        self.renderer.set(self.gantry_x_var, x_pos)
+        self.renderer.set(self.gantry_y_var, y_pos)
+        self.publish_gantry_position(x_pos, y_pos, STATUS_IDLE)
+
+    def publish_gantry_position(self, x_pos, y_pos, status=STATUS_MOVING):
+        """Publish a gantry position to the live state and telemetry; never touches Tk.
+
+        Called by the POS poller, and while a run or G-code file owns the port,
+        by the runner or streamer with each position report it reads.
+        """
+        self.state.write_gantry(x_pos, y_pos, status)
+        self.telemetry.update(time.time(), X=x_pos, Y=y_pos)
 
     # Update Methods
     def update_gantry_lists(self):
@@ -1200,31 +2082,136 @@ class UnifiedGantryArmGUI:
     def update_auto_list(self):
         self.auto_script_list.delete(0, tk.END)
         for i, action in enumerate(self.current_script):
-            action_type = "Gantry Position" if action["type"] == "gantry_pos" else "Arm Sequence"
-            self.auto_script_list.insert(tk.END, f"Action {i+1}: {action_type} - {action['name']}")
+            action_type = {"gantry_pos": "Gantry Position", "arm_seq": "Arm Sequence", "tool_target": "Tool Target"}[action["type"]]
+            pinned = " [pinned]" if action.get("fixed") else ""
+            self.auto_script_list.insert(tk.END, f"Action {i+1}: {action_type} - {action['name']}{pinned}")
         self.action_name['values'] = list(self.gantry_positions.keys()) if self.action_type.get() == "Gantry Position" else list(self.arm_sequences.keys())
+        try:
+            total_ms = self.estimate_auto_script()["total_ms"] if self.current_script else 0
+            self.auto_estimate.config(text=f"Estimated cycle time: {total_ms / 1000.0:.2f} s")
+        except ValueError:
+            self.auto_estimate.config(text="Estimated cycle time: -")
+
+    def setup_telemetry_tab(self):
+        self.telemetry = TelemetryBuffer()
+        self.telemetry_paused = tk.BooleanVar(value=False)
+        self.telemetry_window = tk.StringVar(value="10")
+
+        controls = tk.Frame(self.telemetry_frame, bg="#fff3e0")
+        controls.pack(fill=tk.X, pady=5)
+        tk.Label(controls, text="Window (s):", bg="#fff3e0").pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(controls, textvariable=self.telemetry_window, values=["5", "10", "30", "60", "120"], width=5, state="readonly").pack(side=tk.LEFT)
+        tk.Checkbutton(controls, text="Pause", variable=self.telemetry_paused, bg="#fff3e0").pack(side=tk.LEFT, padx=10)
+        tk.Button(controls, text="Clear", command=self.telemetry.clear, bg="#f44336", fg="white").pack(side=tk.LEFT, padx=5)
+        self.recorder = None
+        self.record_button = tk.Button(controls, text="Start Recording", command=self.toggle_recording, bg="#4CAF50", fg="white")
+        self.record_button.pack(side=tk.LEFT, padx=5)
+        self.record_status = tk.Label(controls, text="", bg="#fff3e0")
+        self.record_status.pack(side=tk.LEFT, padx=5)
+
+        # One canvas per unit: gantry steps and arm degrees
+        self.telemetry_plots = []
+        for title, channels, y_range in [("Gantry (steps)", ["X", "Y"], (0, 8200)),
+                                         ("Arm joints (°)", ["J1", "J2", "J3", "J4", "J5", "J6"], (-30, 30))]:
+            tk.Label(self.telemetry_frame, text=title, font=("Helvetica", 12, "bold"), bg="#fff3e0").pack()
+            canvas = tk.Canvas(self.telemetry_frame, bg="white", height=200, highlightthickness=0)
+            canvas.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+            lines = {}
+            for i, (name, color) in enumerate(zip(channels, TELEMETRY_COLORS)):
+                lines[name] = canvas.create_line(0, 0, 0, 0, fill=color, width=1)
+                canvas.create_text(5 + 30 * i, 5, anchor=tk.NW, text=name, fill=color)
+            self.telemetry_plots.append((canvas, lines, y_range))
+
+        self.redraw_telemetry()
+
+    def toggle_recording(self):
+        """Start or stop a continuous demonstration recording of all telemetry channels."""
+        if self.recorder is None:
+            file_path = filedialog.asksaveasfilename(defaultextension=".csv", initialfile=time.strftime("demo_%Y%m%d_%H%M%S.csv"),
+                                                     filetypes=[("CSV", "*.csv")])
+            if not file_path:
+                return
+            try:
+                self.recorder = Recorder(file_path, self.telemetry.channels, self.telemetry.latest_values)
+                self.recorder.start()
+            except OSError as e:
+                self.recorder = None
+                messagebox.showerror("Error", f"Failed to start recording: {e}")
+                return
+            self.record_button.config(text="Stop Recording", bg="#f44336")
+        else:
+            stats = self.recorder.stop()
+            self.recorder = None
+            self.record_button.config(text="Start Recording", bg="#4CAF50")
+            dropped = f", {stats['dropped']} dropped" if stats["dropped"] else ""
+            self.record_status.config(text=f"Saved {stats['rows']} samples ({stats['duration']:.0f} s{dropped})")
+            if stats["dropped"]:
+                messagebox.showwarning("Recording", f"{stats['dropped']} of {stats['rows'] + stats['dropped']} samples "
+                                       f"were dropped because the disk fell behind; {stats['path']} has gaps")
+
+    def redraw_telemetry(self):
+        """Redraw the telemetry plots; cost depends on canvas width, not on history length."""
+        if self.recorder is not None:
+            dropped = f", {self.recorder.dropped} dropped" if self.recorder.dropped else ""
+            self.record_status.config(text=f"Recording: {self.recorder.sampled * self.recorder.period:.0f} s{dropped}")
+        if self.notebook.select() == str(self.telemetry_frame) and not self.telemetry_paused.get():
+            window = float(self.telemetry_window.get())
+            t1 = time.time()
+            times, values = self.telemetry.snapshot(since=t1 - window)
+            for canvas, lines, (y_low, y_high) in self.telemetry_plots:
+                width, height = max(canvas.winfo_width(), 2), max(canvas.winfo_height(), 2)
+                for name, item in lines.items():
+                    column = values[:, self.telemetry.channels.index(name)]
+                    points = minmax_polyline(*decimate_minmax(times, column, t1 - window, t1, width), y_low, y_high, height)
+                    # Canvas lines need at least two points
+                    canvas.coords(item, points if len(points) >= 4 else [0, 0, 0, 0])
+        self.root.after(TELEMETRY_REDRAW_MS, self.redraw_telemetry)
 
     def update_gantry_positions(self):
+        """Poll POS and publish the gantry's section of the live state; never touches Tk."""
+        x_pos = y_pos = 0
         while self.running:
+            # Skip polling while a script, G-code file or command owns the port;
+            # scripts and G-code files publish the position reports they read
+            if not self.gantry_port_lock.acquire(timeout=0.5):
+                continue
             try:
                 self.gantry_ser.write("POS\n".encode())
                 response = self.gantry_ser.readline().decode().strip()
                 if response.startswith("X:"):
+                    previous = (x_pos, y_pos)
                     x_pos = int(response[2:response.index(",Y:")])
                     y_pos = int(response[response.index(",Y:") + 3:])
-                    if not self.gantry_slider_moving:
-                        self.gantry_x_var.set(x_pos)
-                        self.gantry_y_var.set(y_pos)
-                    self.gantry_pos_label.config(text=f"X: {x_pos}, Y: {y_pos}")
-                time.sleep(0.5)
-            except (serial.SerialException, ValueError):
+                    status = STATUS_IDLE if (x_pos, y_pos) == previous else STATUS_MOVING
+                    self.publish_gantry_position(x_pos, y_pos, status)
+            except serial.SerialException:
+                self.state.write_gantry(x_pos, y_pos, STATUS_ERROR)
+            except ValueError:
                 pass
+            finally:
+                self.gantry_port_lock.release()
+            time.sleep(GANTRY_POLL_S)  # outside the lock, so a claim from the Tk thread gets in
+
+    def show_live_state(self):
+        """Show the latest published gantry position; runs on the Tk thread."""
+        x_pos, y_pos, status, t = self.state.read_gantry()
+        if t != self.shown_gantry_time:
+            self.shown_gantry_time = t
+            if not self.gantry_slider_moving:
+                self.renderer.set(self.gantry_x_var, x_pos)
+                self.renderer.set(self.gantry_y_var, y_pos)
+            suffix = "" if status == STATUS_IDLE else f" ({STATUS_NAMES[status]})"
+            self.renderer.set(self.gantry_pos_label, f"X: {x_pos}, Y: {y_pos}{suffix}")
+        self.root.after(LIVE_STATE_MS, self.show_live_state)
 
     def __del__(self):
         self.running = False
+        if self.arm_ser.is_open:
+            save_arm_pose(self.arm_ser)  # READ_POS reports this pose after the next connect
         for ser in [self.gantry_ser, self.arm_ser]:
             if ser.is_open:
                 ser.close()
+        self.state.close()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# The arm firmware maps a GUI angle of -45..45 onto a servo angle of 0..180,
+# so one GUI degree is two degrees of joint rotation about the home pose.
+GUI_TO_JOINT_DEG = 2.0
+ARM_JOINT_LIMIT = 30  # GUI units, same clamp as the arm sliders
+
+# Nominal Denavit-Hartenberg table (d mm, a mm, alpha deg, theta offset deg) for the
+# five kinematic joints: Base, Shoulder, Elbow, Wrist Tilt, Wrist Rotate. The gripper
+# does not move the tool point. At home (all zeros) the upper arm is vertical and the
+# forearm and tool point straight forward along +X. Re-measure for your build.
+ARM_DH = [
+    (70.0, 0.0, 90.0, 0.0),
+    (0.0, 105.0, 0.0, 90.0),
+    (0.0, 100.0, 0.0, -90.0),
+    (0.0, 0.0, -90.0, -90.0),
+    (110.0, 0.0, 0.0, 0.0),
+]
+IK_JOINTS = 4  # joints that move the tool point; Wrist Rotate and Gripper are passed through
+
+
+def _dh_transforms(theta, d, a, alpha):
+    ct, st = np.cos(theta), np.sin(theta)
+    ca, sa = np.cos(alpha), np.sin(alpha)
+    T = np.zeros(theta.shape + (4, 4))
+    T[..., 0, 0] = ct
+    T[..., 0, 1] = -st * ca
+    T[..., 0, 2] = st * sa
+    T[..., 0, 3] = a * ct
+    T[..., 1, 0] = st
+    T[..., 1, 1] = ct * ca
+    T[..., 1, 2] = -ct * sa
+    T[..., 1, 3] = a * st
+    T[..., 2, 1] = sa
+    T[..., 2, 2] = ca
+    T[..., 2, 3] = d
+    T[..., 3, 3] = 1.0
+    return T
+
+
+def forward_kinematics(angles, dh=ARM_DH):
+    """Tool pose(s) for GUI joint angles of shape (6,) or (N, 6). Returns (4, 4) or (N, 4, 4)."""
+    angles = np.asarray(angles, dtype=float)
+    q = np.radians(angles[..., :len(dh)] * GUI_TO_JOINT_DEG)
+    T = np.broadcast_to(np.eye(4), q.shape[:-1] + (4, 4))
+    for j, (d, a, alpha, offset) in enumerate(dh):
+        T = T @ _dh_transforms(q[..., j] + np.radians(offset), d, a, np.radians(alpha))
+    return T
+
+
+def tool_position(angles, dh=ARM_DH):
+    """Tool point (mm) for GUI joint angles of shape (6,) or (N, 6)."""
+    return forward_kinematics(angles, dh)[..., :3, 3]
+
+
+class ArmIKSolver:
+    """Damped-least-squares position IK in GUI joint units with an LRU solution cache.
+
+    Single targets are warm-started from the previous solution and cached by
+    target rounded to `quantum` mm, so repeated pick points are a dict lookup.
+    solve_path() solves a whole (N, 3) path in one vectorized iteration.
+    """
+
+    def __init__(self, dh=ARM_DH, limit=ARM_JOINT_LIMIT, tolerance=0.5, quantum=0.1,
+                 cache_size=4096, max_iterations=100, damping=1.0, max_step=5.0):
+        self.dh = dh
+        self.limit = limit
+        self.tolerance = tolerance
+        self.quantum = quantum
+        self.cache_size = cache_size
+        self.max_iterations = max_iterations
+        self.damping = damping
+        self.max_step = max_step
+        self.cache = OrderedDict()
+        self.last_solution = np.zeros(6)
+
+    def _key(self, target):
+        return tuple(int(round(c / self.quantum)) for c in target)
+
+    def _iterate(self, targets, seeds):
+        """Run DLS on every row at once. Returns (angles (N, 6), residual (N,) in mm)."""
+        q = np.array(seeds, dtype=float)
+        targets = np.asarray(targets, dtype=float)
+        h = 1e-3
+        eye = np.eye(3) * self.damping ** 2
+        for _ in range(self.max_iterations):
+            p = tool_position(q, self.dh)
+            err = targets - p
+            active = np.linalg.norm(err, axis=1) > self.tolerance * 0.1
+            if not active.any():
+                break
+            probes = np.repeat(q[:, None, :], IK_JOINTS, axis=1)
+            probes[:, np.arange(IK_JOINTS), np.arange(IK_JOINTS)] += h
+            J = (tool_position(probes, self.dh) - p[:, None, :]).transpose(0, 2, 1) / h
+            dq = (J.transpose(0, 2, 1) @ np.linalg.solve(J @ J.transpose(0, 2, 1) + eye, err[..., None]))[..., 0]
+            dq = np.clip(dq, -self.max_step, self.max_step)
+            q[active, :IK_JOINTS] += dq[active]
+            np.clip(q[:, :IK_JOINTS], -self.limit, self.limit, out=q[:, :IK_JOINTS])
+        residual = np.linalg.norm(targets - tool_position(q, self.dh), axis=1)
+        return q, residual
+
+    def solve_batch(self, targets, seeds):
+        """Solve (N, 3) targets from per-row (N, 6) seeds. Returns (angles, residual_mm) arrays."""
+        return self._iterate(targets, seeds)
+
+    def solve(self, target, seed=None):
+        """GUI angles (list of 6 floats) placing the tool at target (x, y, z mm)."""
+        key = self._key(target)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            solution = self.cache[key]
+        else:
+            seed = self.last_solution if seed is None else np.asarray(seed, dtype=float)
+            q, residual = self._iterate([target], [seed])
+            if residual[0] > self.tolerance:
+                raise ValueError(f"Target {tuple(target)} out of reach ({residual[0]:.1f} mm off)")
+            solution = q[0]
+            self.cache[key] = solution
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        self.last_solution = solution
+        return [float(a) for a in solution]
+
+    def solve_path(self, targets, seed=None, passes=2):
+        """Vectorized IK for an (N, 3) path. Returns an (N, 6) array of GUI angles.
+
+        The first pass seeds every point from the start pose; later passes seed
+        each point from its predecessor's solution to keep the path continuous.
+        """
+        targets = np.asarray(targets, dtype=float)
+        start = self.last_solution if seed is None else np.asarray(seed, dtype=float)
+        q, residual = self._iterate(targets, np.broadcast_to(start, (len(targets), 6)))
+        for _ in range(passes - 1):
+            seeds = np.vstack([start, q[:-1]])
+            q, residual = self._iterate(targets, seeds)
+        bad = np.flatnonzero(residual > self.tolerance)
+        if bad.size:
+            raise ValueError(f"Path point {bad[0]} {tuple(targets[bad[0]])} out of reach")
+        self.last_solution = q[-1]
+        return q
+
+    def clear_cache(self):
+        self.cache.clear()
@@ -0,0 +1,139 @@
+import numpy as np
+
+from arm_kinematics import IK_JOINTS
+
+ARM_INTERPOLATION_STEPS = 20
+ARM_SLIDER_LIMIT = 30
+
+
+def clamp_arm_angle(angle, limit=ARM_SLIDER_LIMIT):
+    return min(max(angle, -limit), limit)
+
+
+def interpolate_arm_frames(current_angles, target_angles, steps=ARM_INTERPOLATION_STEPS, sequential=False):
+    """Yield (angles, motor_index) frames for a joint-space move.
+
+    In sequential mode each motor moves in turn and motor_index names the one
+    being moved; otherwise all joints move together and motor_index is None.
+    """
+    current_angles = list(current_angles)
+    if sequential:
+        for motor_idx in range(len(current_angles)):
+            start_angle = current_angles[motor_idx]
+            end_angle = target_angles[motor_idx]
+            for step in range(steps + 1):
+                angle = start_angle + (end_angle - start_angle) * step / steps
+                interpolated_angles = current_angles.copy()
+                interpolated_angles[motor_idx] = int(round(angle))
+                yield interpolated_angles, motor_idx
+            current_angles[motor_idx] = target_angles[motor_idx]
+    else:
+        for step in range(steps + 1):
+            interpolated_angles = []
+            for i in range(len(current_angles)):
+                angle = current_angles[i] + (target_angles[i] - current_angles[i]) * step / steps
+                interpolated_angles.append(int(round(angle)))
+            yield interpolated_angles, None
+
+
+# Task-space (straight-line / arc) moves
+
+ARM_STREAM_RATE = 50  # Hz, fixed rate at which precomputed frames are sent
+
+
+def line_path(start, end):
+    """Straight tool path from start to end (mm) as a function of u in [0, 1]."""
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    return lambda u: start + np.asarray(u, dtype=float)[:, None] * (end - start)
+
+
+def arc_path(start, via, end):
+    """Circular tool path from start through via to end (mm), as a function of u in [0, 1]."""
+    start, via, end = (np.asarray(p, dtype=float) for p in (start, via, end))
+    a, b = via - start, end - start
+    normal = np.cross(a, b)
+    if np.linalg.norm(normal) < 1e-9:
+        return line_path(start, end)
+    center = start + np.cross(a.dot(a) * b - b.dot(b) * a, normal) / (2.0 * normal.dot(normal))
+    radius = np.linalg.norm(start - center)
+    e1 = (start - center) / radius
+    e2 = np.cross(normal / np.linalg.norm(normal), e1)
+    offset = end - center
+    sweep = np.arctan2(offset.dot(e2), offset.dot(e1)) % (2 * np.pi)
+
+    def points(u):
+        theta = sweep * np.asarray(u, dtype=float)[:, None]
+        return center + radius * (np.cos(theta) * e1 + np.sin(theta) * e2)
+    return points
+
+
+def task_space_frames(solver, start_angles, path, end_angles=None, tolerance=0.5, max_joint_step=2.0, max_depth=12):
+    """Adaptively discretize a tool path into joint frames using batched IK.
+
+    Intervals are bisected until the IK solution at their midpoint lies within
+    `tolerance` GUI degrees of the joint-space midpoint and no joint moves more
+    than `max_joint_step` between frames, so straight stretches of joint space
+    get few frames and curved ones get many. Returns (u, frames) where u in
+    [0, 1] is the path parameter of each (N, 6) frame.
+    """
+    start = np.asarray(start_angles, dtype=float)
+    if end_angles is None:
+        end_target = path(np.array([1.0]))
+        end, residual = solver.solve_batch(end_target, start[None, :])
+        if residual[0] > solver.tolerance:
+            raise ValueError(f"Target {tuple(end_target[0])} out of reach")
+        end = end[0]
+        end[IK_JOINTS:] = start[IK_JOINTS:]
+    else:
+        end = np.asarray(end_angles, dtype=float)
+    u = [0.0, 1.0]
+    frames = [start, end]
+    pending = [0]
+    for _ in range(max_depth):
+        if not pending:
+            break
+        lo = np.array([u[i] for i in pending])
+        hi = np.array([u[i + 1] for i in pending])
+        q_lo = np.array([frames[i] for i in pending])
+        q_hi = np.array([frames[i + 1] for i in pending])
+        mid_u = (lo + hi) / 2
+        linear = (q_lo + q_hi) / 2
+        q_mid, residual = solver.solve_batch(path(mid_u), linear)
+        q_mid[:, IK_JOINTS:] = linear[:, IK_JOINTS:]
+        if (residual > solver.tolerance).any():
+            bad = int(np.argmax(residual))
+            raise ValueError(f"Path point {tuple(path(mid_u[bad:bad + 1])[0])} out of reach")
+        split = (np.abs(q_mid - linear).max(axis=1) > tolerance) | (np.abs(q_hi - q_lo).max(axis=1) > max_joint_step)
+        next_pending = []
+        shift = 0
+        for k, i in enumerate(pending):
+            i += shift
+            if split[k]:
+                u.insert(i + 1, float(mid_u[k]))
+                frames.insert(i + 1, q_mid[k])
+                next_pending.extend([i, i + 1])
+                shift += 1
+        pending = next_pending
+    return np.array(u), np.array(frames)
+
+
+def schedule_frames(u, frames, duration, rate_hz=ARM_STREAM_RATE):
+    """Place frames on a fixed-rate tick grid for a move lasting `duration` seconds.
+
+    Frame i is due at u[i] * duration, rounded up to the next tick; when several
+    frames fall in the same tick only the latest is kept. Returns [(t, angles)].
+    """
+    period = 1.0 / rate_hz
+    ticks = np.ceil(np.asarray(u) * duration / period - 1e-9).astype(int)
+    previous = [int(round(a)) for a in frames[0]]
+    schedule = []
+    for i in range(1, len(frames)):
+        angles = [int(round(a)) for a in frames[i]]
+        t = float(ticks[i] * period)
+        if schedule and schedule[-1][0] == t:
+            schedule[-1] = (t, angles)
+        elif angles != previous:
+            schedule.append((t, angles))
+        previous = angles
+    return schedule
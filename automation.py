@@ -0,0 +1,487 @@
+import json
+import os
+
+from arm_motion import ARM_INTERPOLATION_STEPS, clamp_arm_angle, interpolate_arm_frames
+from clock import RealClock, VirtualClock
+from kinematic_chain import GantryArmChain
+from motion_process import frame_schedule
+from simulator import GANTRY_MAX_POSITION, SimulatedArm, SimulatedGantry, gantry_move_time
+
+GANTRY_AXIS_DELAY = 0.1         # pause between the X and Y commands of one move
+GANTRY_CONFIRM_TIMEOUT = 2.0    # margin over the predicted travel time for the "X:..,Y:.." confirmation
+GANTRY_POLL_INTERVAL = 0.01
+GANTRY_REPORT_INTERVAL = 0.1    # '?' position reports while waiting on a move, for on_position
+FEED_SYNC_INTERVAL = 0.05       # at most 20 FEED lines/s while the override ramps
+ARM_FRAME_RATE = 60             # PWM_FREQ in PS2_Arm_Ardiuno.ino, for firmware without RATE
+PAUSE_POLL_INTERVAL = 0.05
+RUN_JOURNAL_FILE = "run_journal.jsonl"  # progress of the last run, kept next to automation_scripts.json
+
+
+class GantryTimeoutError(ValueError):
+    """A gantry target was never confirmed, so the carriage may still be travelling."""
+
+
+def parse_gantry_position(line):
+    """[x, y] from an "X:<x>,Y:<y>" line (a POS reply or a move confirmation), or None for any other line."""
+    if not line.startswith("X:") or ",Y:" not in line:
+        return None
+    try:
+        return [int(line[2:line.index(",Y:")]), int(line[line.index(",Y:") + 3:])]
+    except ValueError:
+        return None
+
+
+def read_gantry_position(ser, clock=None, timeout=1.0):
+    """Ask the gantry for its position. Returns [x, y] or None if it doesn't answer."""
+    clock = clock or RealClock()
+    ser.write(b"POS\n")
+    start_time = clock.time()
+    while clock.time() - start_time < timeout:
+        position = parse_gantry_position(ser.readline().decode().strip())
+        if position is not None:
+            return position
+    return None
+
+
+def read_arm_angles(ser, clock=None, timeout=1.0):
+    """Ask the arm for its six angles with READ_POS. Returns the list or None if it doesn't answer."""
+    clock = clock or RealClock()
+    ser.write(b"READ_POS\n")
+    start_time = clock.time()
+    while clock.time() - start_time < timeout:
+        parts = ser.readline().decode().strip().split(",")
+        if len(parts) == 6:
+            try:
+                return [int(p) for p in parts]
+            except ValueError:
+                pass
+    return None
+
+
+def save_arm_pose(ser):
+    """Have the arm keep its pose in EEPROM (SAVE_POS), so READ_POS is right after the next reset.
+
+    The firmware never saves on its own, to spare the EEPROM: send this after
+    homing and before closing the port, not after every move.
+    """
+    ser.write(b"SAVE_POS\n")
+
+
+def read_arm_frame_rate(ser, clock=None, timeout=1.0):
+    """Ask the arm how many servo frames per second it can latch. Returns None if it doesn't answer."""
+    clock = clock or RealClock()
+    ser.write(b"RATE\n")
+    start_time = clock.time()
+    while clock.time() - start_time < timeout:
+        response = ser.readline().decode().strip()
+        if response.startswith("RATE:"):
+            try:
+                return float(response[5:].split(",")[0])
+            except ValueError:
+                pass
+    return None
+
+
+def read_journal(file_path=RUN_JOURNAL_FILE):
+    """Where an interrupted run can pick up, from its journal.
+
+    Returns {"name", "script", "next", "actions"} with the index of the
+    first action that did not complete, or None if there is no journal or
+    its run completed.
+    """
+    if not os.path.exists(file_path):
+        return None
+    run = None
+    with open(file_path, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # a line cut short by the crash; everything before it stands
+            if entry["event"] == "start":
+                run = {"name": entry["name"], "script": entry["script"], "next": 0}
+            elif run is not None and entry["event"] == "done":
+                run["next"] = max(run["next"], entry["index"] + 1)
+            elif entry["event"] == "complete":
+                run = None
+    if run is None or run["next"] >= len(run["script"]):
+        return None
+    run["actions"] = len(run["script"])
+    return run
+
+
+class ScriptRunner:
+    """Executes automation scripts against the gantry and arm serial ports.
+
+    The ports may be real pyserial objects or the stand-ins from simulator.py.
+    All pacing goes through the injected clock, so with a VirtualClock a run
+    takes no wall time and produces a deterministic timeline.
+    """
+
+    def __init__(self, gantry_ser, arm_ser, gantry_positions, arm_sequences, clock=None,
+                 arm_angles=None, gantry_start=None, chain=None, stop_flag=None,
+                 on_status=None, on_arm_frame=None, on_gantry_move=None, arm_frame_rate=None,
+                 trajectory_cache=None, calibration="", motion=None, feed_override=None,
+                 pause_flag=None, on_wait=None, journal=None, gantry_limits=None, on_position=None):
+        self.gantry_ser = gantry_ser
+        self.arm_ser = arm_ser
+        self.gantry_positions = gantry_positions
+        self.arm_sequences = arm_sequences
+        self.clock = clock or RealClock()
+        self.arm_angles = list(arm_angles) if arm_angles else [0] * 6
+        self.gantry_pos = list(gantry_start) if gantry_start else [0, 0]
+        self.chain = chain
+        self.stop_flag = stop_flag if stop_flag is not None else [False]
+        self.on_status = on_status
+        self.on_arm_frame = on_arm_frame
+        self.on_gantry_move = on_gantry_move
+        self.on_position = on_position            # called with (x, y) of each position report read mid-move
+        self.reported_at = None                   # clock time of the last '?' sent
+        self.arm_frame_rate = arm_frame_rate  # frames/s the arm can latch; None sends every frame
+        self.last_arm_frame = None
+        self.trajectory_cache = trajectory_cache  # compiled arm sequences, shared between runs
+        self.calibration = calibration            # table_key() of the arm's calibration table
+        self.motion = motion                      # MotionProcess that paces arm frames, if any
+        self.feed_override = feed_override        # FeedOverride read at every frame and gantry move
+        self.pause_flag = pause_flag if pause_flag is not None else [False]
+        self.on_wait = on_wait                    # called while waiting, so a GUI can keep handling events
+        self.journal = journal                    # path of the per-action progress journal, if any
+        self.prequeued = None                     # (position name, travel time, FEED percent) queued for the next run
+        self.gantry_feed = None                   # FEED percent last sent to the gantry
+        self.feed_sent_at = None                  # clock time of that FEED line
+        # Soft limits set with CONX/CONY, ((x_min, x_max), (y_min, y_max)); the firmware clamps targets to them
+        self.gantry_limits = gantry_limits or ((0, GANTRY_MAX_POSITION), (0, GANTRY_MAX_POSITION))
+        self.timeline = []
+        self.start_time = self.clock.time()
+
+    def log(self, event, detail=""):
+        self.timeline.append({"t": self.clock.time() - self.start_time, "event": event, "detail": detail})
+
+    def status(self, text):
+        if self.on_status:
+            self.on_status(text)
+
+    def pause(self):
+        """Hold both devices mid-motion: a gantry feed hold, and the arm stops before its next frame."""
+        if self.pause_flag[0]:
+            return
+        self.pause_flag[0] = True
+        self.gantry_ser.write(b"#")
+        if self.motion is not None:
+            self.motion.pause()
+        self.log("paused")
+
+    def resume(self):
+        """Continue exactly where pause() stopped."""
+        if not self.pause_flag[0]:
+            return
+        self.pause_flag[0] = False
+        self.gantry_ser.write(b"~")
+        if self.motion is not None:
+            self.motion.resume()
+        self.log("resumed")
+
+    def hold_if_paused(self):
+        """Wait while paused. Returns False if the run was stopped instead of resumed."""
+        while self.pause_flag[0]:
+            if self.stop_flag[0]:
+                return False
+            if self.on_wait:
+                self.on_wait()
+            self.clock.sleep(PAUSE_POLL_INTERVAL)
+        return not self.stop_flag[0]
+
+    def write_journal(self, **entry):
+        if not self.journal:
+            return
+        with open(self.journal, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())  # survive a power loss right after the action
+
+    def sync_feed(self, force=False):
+        """Send FEED if the override has moved to another whole percent. Returns True if it sent one.
+
+        Called before every gantry target and on every tick of a gantry wait
+        (and by a GUI when its override control changes), so a change reaches
+        the firmware, which applies it to the move in progress, straight away.
+        While the override ramps, lines are spaced FEED_SYNC_INTERVAL apart
+        unless force is set.
+        """
+        if not self.feed_override:
+            return False
+        percent = round(self.feed_override.factor() * 100)
+        now = self.clock.time()
+        if percent == self.gantry_feed or (not force and self.feed_sent_at is not None
+                                           and now - self.feed_sent_at < FEED_SYNC_INTERVAL):
+            return False
+        self.gantry_ser.write(f"FEED,{percent}\n".encode())
+        self.gantry_feed, self.feed_sent_at = percent, now
+        return True
+
+    def clamp_gantry(self, x_pos, y_pos):
+        """The position the firmware will actually go to, and confirm, for a target."""
+        (x_min, x_max), (y_min, y_max) = self.gantry_limits
+        return [min(max(x_pos, x_min), x_max), min(max(y_pos, y_min), y_max)]
+
+    def gantry_timeout(self, x_pos, y_pos):
+        """Halt the gantry and fail the run: nothing may start while the carriage could still be moving."""
+        self.gantry_ser.write(b"!")  # also drops targets queued behind the lost one
+        self.prequeued = None
+        self.log("timeout", f"no confirmation for X:{x_pos}, Y:{y_pos}")
+        raise GantryTimeoutError(f"No confirmation from the gantry for X:{x_pos}, Y:{y_pos}")
+
+    def send_gantry(self, x_pos, y_pos, speed):
+        """Queue an X/Y target on the gantry without waiting for it to arrive.
+
+        Returns the predicted travel time at the FEED now in force (self.gantry_feed).
+        """
+        self.sync_feed(force=True)
+        feed = self.gantry_feed / 100 if self.gantry_feed else 1.0
+        target = self.clamp_gantry(x_pos, y_pos)
+        travel_time = gantry_move_time(self.gantry_pos, target, feed)
+        self.gantry_ser.write(f"X:{x_pos},{speed}\n".encode())
+        self.clock.sleep(GANTRY_AXIS_DELAY)
+        self.gantry_ser.write(f"Y:{y_pos},{speed}\n".encode())
+        self.gantry_pos = target
+        return travel_time
+
+    def wait_gantry(self, x_pos, y_pos, travel_time=0.0, feed=None):
+        """Wait for the confirmation of a queued target. Returns True if confirmed.
+
+        The confirmation is expected at the target clamped to the soft
+        limits. travel_time was predicted at FEED percent feed (default: the
+        one in force). Whenever the FEED in force differs, the time still to
+        go is stretched by the slow-down, so a move slowed mid-way isn't
+        given up on. With on_position set, the gantry is asked for a realtime
+        position report ('?') every GANTRY_REPORT_INTERVAL while it travels.
+        """
+        feed = feed or self.gantry_feed
+        arrival = self.clock.time() + travel_time
+        target = self.clamp_gantry(x_pos, y_pos)
+        while True:
+            self.sync_feed()
+            if feed and self.gantry_feed and self.gantry_feed != feed:
+                now = self.clock.time()
+                # Top speed scales with FEED but acceleration doesn't, so a speed-up
+                # may save less than its ratio; the deadline is only ever extended
+                arrival = now + max(0.0, arrival - now) * max(1.0, feed / self.gantry_feed)
+                feed = self.gantry_feed
+            if self.clock.time() >= arrival + GANTRY_CONFIRM_TIMEOUT:
+                return False
+            if self.stop_flag[0]:
+                return False
+            if self.pause_flag[0]:
+                held_from = self.clock.time()
+                if not self.hold_if_paused():
+                    return False
+                arrival += self.clock.time() - held_from  # time in a feed hold doesn't count
+                continue
+            if self.on_wait:
+                self.on_wait()
+            if self.on_position and (self.reported_at is None
+                                     or self.clock.time() - self.reported_at >= GANTRY_REPORT_INTERVAL):
+                self.gantry_ser.write(b"?")
+                self.reported_at = self.clock.time()
+            if self.gantry_ser.in_waiting:
+                position = parse_gantry_position(self.gantry_ser.readline().decode().strip())
+                if position and self.on_position:
+                    self.on_position(*position)
+                # Both axes must match exactly: "Y:100" is a prefix of "Y:1000", and a
+                # mid-move report can share one coordinate with the target
+                if position == target:
+                    return True
+            else:
+                self.clock.sleep(GANTRY_POLL_INTERVAL)
+
+    def move_gantry(self, x_pos, y_pos, speed):
+        """Send an X/Y move and wait for the position confirmation. Returns True if confirmed, False if stopped."""
+        travel_time = self.send_gantry(x_pos, y_pos, speed)
+        return self.wait_gantry(x_pos, y_pos, travel_time, self.gantry_feed)
+
+    def move_arm(self, target_angles, speed_ms, sequential=False):
+        """Interpolate to target_angles like move_to_arm_angles. Returns False if stopped.
+
+        Frames closer together than the arm's frame period are skipped (the
+        last one is always sent), since the servos would never see them.
+        """
+        step_delay = speed_ms // ARM_INTERPOLATION_STEPS
+        frames = list(interpolate_arm_frames(self.arm_angles, target_angles, sequential=sequential))
+        if self.motion is not None:
+            return self.stream_arm_moves([[angles for angles, _ in frames]], step_delay)
+        for i, (angles, _) in enumerate(frames):
+            if not self.send_arm_frame(angles, step_delay, final=i == len(frames) - 1):
+                return False
+        return True
+
+    def send_arm_frame(self, angles, step_delay, final=False):
+        """Send one interpolation frame and wait step_delay ms. Returns False if stopped.
+
+        A frame that comes sooner than the arm's frame period after the
+        previous one is skipped unless it is the final frame of a move.
+        """
+        if self.stop_flag[0] or not self.hold_if_paused():
+            return False
+        now = self.clock.time()
+        if (self.arm_frame_rate is None or final or self.last_arm_frame is None
+                or now - self.last_arm_frame >= 1.0 / self.arm_frame_rate):
+            self.arm_ser.write((",".join(map(str, angles)) + "\n").encode())
+            self.last_arm_frame = now
+        self.adopt_arm_frame(angles)
+        self.clock.sleep(self.feed_override.scaled(step_delay / 1000.0) if self.feed_override else step_delay / 1000.0)
+        return True
+
+    def adopt_arm_frame(self, angles):
+        self.arm_angles = [clamp_arm_angle(a) for a in angles]
+        if self.on_arm_frame:
+            self.on_arm_frame(angles)
+
+    def stream_arm_moves(self, moves, step_delay, steps=None):
+        """Hand moves (lists of frames) to the motion process back to back. Returns False if stopped.
+
+        All moves are queued at once so there is no gap between them; when
+        steps are given, each one's status is reported as its move ends.
+        """
+        streams = [self.motion.play(*frame_schedule(frames, step_delay / 1000.0, self.arm_frame_rate))
+                   for frames in moves]
+        completed = True
+        for i, stream in enumerate(streams):
+            if not completed:
+                self.motion.wait(stream)  # already stopped; just collect it
+                continue
+            completed = self.motion.wait(stream, on_frame=self.adopt_arm_frame, stop_flag=self.stop_flag,
+                                         on_idle=self.on_wait)
+            if completed and steps:
+                self.status(f"Playing arm step: {steps[i]}")
+        return completed
+
+    def play_arm_sequence(self, steps, speed_ms, sequential=False):
+        """Move through every step of an arm sequence. Returns False if stopped.
+
+        The first step is reached with a live move from wherever the arm is.
+        With a trajectory cache the rest is played from the compiled plan, so
+        a sequence that runs every cycle is interpolated only once.
+        """
+        if self.trajectory_cache is None:
+            for step in steps:
+                if not self.move_arm(step, speed_ms, sequential=sequential):
+                    return False
+                self.status(f"Playing arm step: {step}")
+            return True
+        if not steps:
+            return True
+        if not self.move_arm(steps[0], speed_ms, sequential=sequential):
+            return False
+        self.status(f"Playing arm step: {steps[0]}")
+        trajectory = self.trajectory_cache.get(steps, speed_ms, sequential, self.calibration)
+        frames = trajectory.angles.tolist()
+        if self.motion is not None:
+            bounds = [0] + [end + 1 for end in trajectory.step_ends.tolist()]
+            moves = [frames[first:end] for first, end in zip(bounds, bounds[1:])]
+            return self.stream_arm_moves(moves, trajectory.step_delay, steps[1:])
+        first = 0
+        for step, end in zip(steps[1:], trajectory.step_ends.tolist()):
+            for i in range(first, end + 1):
+                if not self.send_arm_frame(frames[i], trajectory.step_delay, final=i == end):
+                    return False
+            first = end + 1
+            self.status(f"Playing arm step: {step}")
+        return True
+
+    def run(self, script, gantry_speed=500, arm_speed_ms=700, sequential=False, pipeline=True,
+            start_index=0, script_name=None, next_script=None):
+        """Run every action of a script and return {"cycle_time", "actions", "timeline"}.
+
+        With pipeline=True the target of a gantry move that directly follows
+        another one is queued on the firmware before the first one finishes,
+        so the carriage goes straight on without a host round trip. That
+        includes the first move of next_script, the script run right after
+        this one.
+
+        With a journal, every completed action is recorded as it finishes;
+        read_journal() then gives the start_index that continues a run cut
+        short by a crash or power loss.
+        """
+        self.timeline = []
+        self.start_time = self.clock.time()
+        actions = []
+        sent = {}  # action index -> (predicted travel time, FEED percent) of an already queued gantry target
+        if self.prequeued and start_index == 0 and script and script[0]["type"] == "gantry_pos" \
+                and script[0]["name"] == self.prequeued[0]:
+            sent[0] = self.prequeued[1:]
+        self.prequeued = None
+        if self.journal and start_index == 0:
+            open(self.journal, "w").close()
+            self.write_journal(event="start", name=script_name, script=script)
+        elif self.journal:
+            self.write_journal(event="resume", index=start_index)
+        for index, action in enumerate(script):
+            if index < start_index:
+                continue
+            if not self.hold_if_paused():
+                self.log("stopped")
+                break
+            action_type = action["type"]
+            name = action["name"]
+            started = self.clock.time() - self.start_time
+            self.log("start", f"{action_type} '{name}'")
+            if action_type == "gantry_pos":
+                if name not in self.gantry_positions:
+                    raise ValueError(f"Gantry position '{name}' not found")
+                x_pos, y_pos = self.gantry_positions[name]
+                if index not in sent:
+                    sent[index] = (self.send_gantry(x_pos, y_pos, gantry_speed), self.gantry_feed)
+                following = script[index + 1] if index + 1 < len(script) else (next_script or [None])[0]
+                if pipeline and following and following["type"] == "gantry_pos" and following["name"] in self.gantry_positions:
+                    travel_time = self.send_gantry(*self.gantry_positions[following["name"]], gantry_speed)
+                    if index + 1 < len(script):
+                        sent[index + 1] = (travel_time, self.gantry_feed)
+                    else:
+                        self.prequeued = (following["name"], travel_time, self.gantry_feed)
+                    self.log("queued", f"gantry_pos '{following['name']}'")
+                if not self.wait_gantry(x_pos, y_pos, *sent[index]) and not self.stop_flag[0]:
+                    self.gantry_timeout(x_pos, y_pos)
+                if self.on_gantry_move:
+                    self.on_gantry_move(x_pos, y_pos)
+                self.status(f"Gantry moved to '{name}'")
+            elif action_type == "arm_seq":
+                if name not in self.arm_sequences:
+                    raise ValueError(f"Arm sequence '{name}' not found")
+                self.play_arm_sequence(self.arm_sequences[name], arm_speed_ms, sequential)
+                self.status(f"Arm sequence '{name}' completed")
+            elif action_type == "tool_target":
+                if self.chain is None:
+                    self.chain = GantryArmChain()
+                plan = self.chain.resolve(action["target"], self.gantry_pos, self.arm_angles)
+                self.log("plan", f"gantry {plan['gantry']} ({plan['gantry_time']:.2f} s), arm {plan['arm_time']:.2f} s")
+                x_pos, y_pos = plan["gantry"]
+                if [x_pos, y_pos] != self.gantry_pos:
+                    if not self.move_gantry(x_pos, y_pos, gantry_speed) and not self.stop_flag[0]:
+                        self.gantry_timeout(x_pos, y_pos)
+                    if self.on_gantry_move:
+                        self.on_gantry_move(x_pos, y_pos)
+                self.move_arm(plan["arm"], arm_speed_ms)
+                self.status(f"Tool moved to '{name}'")
+            self.log("end", f"{action_type} '{name}'")
+            actions.append({"index": index, "type": action_type, "name": name,
+                            "start": started, "end": self.clock.time() - self.start_time})
+            if self.stop_flag[0]:
+                self.log("stopped")
+                break
+            self.write_journal(event="done", index=index)
+        else:
+            self.write_journal(event="complete")
+        if self.stop_flag[0]:
+            self.prequeued = None  # the halt discards whatever the firmware had queued
+        return {"cycle_time": self.clock.time() - self.start_time, "actions": actions, "timeline": self.timeline}
+
+
+def simulate_script(script, gantry_positions, arm_sequences, gantry_speed=500, arm_speed_ms=700,
+                    sequential=False, gantry_start=(0, 0), arm_start=None, speedup=None):
+    """Run a script against simulated devices in virtual time and return the run report."""
+    clock = VirtualClock(speedup=speedup)
+    gantry = SimulatedGantry(clock, x=gantry_start[0], y=gantry_start[1])
+    arm = SimulatedArm(clock, angles=arm_start)
+    runner = ScriptRunner(gantry, arm, gantry_positions, arm_sequences, clock=clock,
+                          arm_angles=arm_start, gantry_start=gantry_start)
+    return runner.run(script, gantry_speed, arm_speed_ms, sequential)
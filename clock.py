@@ -0,0 +1,34 @@
+import time
+
+
+class RealClock:
+    """Wall-clock time source used when driving the real devices."""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """Simulated time source: sleep() advances the clock instead of blocking.
+
+    With speedup=None the run is as fast as the CPU allows. A numeric speedup
+    (e.g. 100) still blocks for seconds / speedup so a run can be watched.
+    """
+
+    def __init__(self, start=0.0, speedup=None):
+        self.now = float(start)
+        self.speedup = speedup
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        self.now += seconds
+        if self.speedup:
+            time.sleep(seconds / self.speedup)
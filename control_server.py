@@ -0,0 +1,555 @@
+"""Local control server that owns the gantry and arm serial ports.
+
+Clients share one set of ports through HTTP and WebSocket instead of each
+opening COM3/COM4 themselves:
+
+    GET  /status               positions and jobs
+    GET  /jobs/<id>            one job
+    POST /gantry/move          {"x": 4000, "y": 1200, "speed": 500}
+    POST /gantry/home
+    POST /arm/move             {"angles": [0, 10, 0, 0, 0, 0], "speed_ms": 700}
+    POST /scripts/run          {"name": "pick_place", "repeat": 1}
+    POST /stop                 halts the gantry and every running job
+    GET  /ws                   WebSocket: telemetry pushed at TELEMETRY_PUSH_HZ,
+                               job events, and {"id", "method", "path", "body"}
+                               requests answered with {"type": "reply", ...}
+
+    python control_server.py --gantry-port COM4 --arm-port COM3
+    python control_server.py --simulate
+"""
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import os
+import queue
+import select
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import serial
+
+from automation import (ARM_FRAME_RATE, ScriptRunner, read_arm_angles, read_arm_frame_rate, read_gantry_position,
+                        save_arm_pose)
+from clock import RealClock
+from run_scripts import ARM_SEQ_FILE, AUTO_FILE, GANTRY_POS_FILE, load_json
+from servo_calibration import CALIBRATION_FILE, compile_table, load_profiles, upload_table
+from simulator import SimulatedArm, SimulatedGantry
+from trajectory_cache import TRAJECTORY_CACHE_DIR, TrajectoryCache, table_key
+
+TELEMETRY_PUSH_HZ = 10
+GANTRY_POLL_S = 0.1      # POS polling interval while no job owns the gantry
+PORT_IDLE_S = 0.005      # reader's pause while no bytes are waiting
+WS_QUEUE_SIZE = 64       # messages buffered per WebSocket client before the oldest are dropped
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class DeviceBusyError(RuntimeError):
+    """A device is already being driven by another request or job."""
+
+
+class _Port:
+    """A serial port read by one thread, with reads and writes taking turns under one lock.
+
+    The simulators aren't thread-safe, so the reader only holds the lock to
+    read bytes that are already waiting, never through a read timeout.
+    Every line received is handed to on_line and copied to each open
+    session, so several users can wait for replies without stealing lines
+    from each other.
+    """
+
+    def __init__(self, ser, on_line=None):
+        self.ser = ser
+        self.on_line = on_line
+        self._lock = threading.Lock()
+        self._sessions = set()
+        self._sessions_lock = threading.Lock()
+        self.running = True
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def _read_loop(self):
+        while self.running:
+            try:
+                with self._lock:
+                    line = self.ser.readline() if self.ser.in_waiting else b""
+            except serial.SerialException:
+                time.sleep(0.1)
+                continue
+            if not line:
+                time.sleep(PORT_IDLE_S)
+                continue
+            if self.on_line:
+                self.on_line(line.decode(errors="replace").strip())
+            with self._sessions_lock:
+                for lines in self._sessions:
+                    lines.put(line)
+
+    def write(self, data):
+        with self._lock:
+            return self.ser.write(data)
+
+    def session(self, timeout=1.0):
+        """A pyserial-like view with its own receive queue, for ScriptRunner and friends."""
+        return SharedPort(self, timeout)
+
+    def close(self):
+        self.running = False
+        self._thread.join(timeout=2)
+        self.ser.close()
+
+
+class SharedPort:
+    """One user's view of a _Port: lines received from now on, writes shared."""
+
+    def __init__(self, port, timeout=1.0):
+        self.port = port
+        self.timeout = timeout
+        self._lines = queue.Queue()
+        with port._sessions_lock:
+            port._sessions.add(self._lines)
+
+    @property
+    def in_waiting(self):
+        return self._lines.qsize()
+
+    def readline(self):
+        try:
+            return self._lines.get(timeout=self.timeout)
+        except queue.Empty:
+            return b""
+
+    def write(self, data):
+        return self.port.write(data)
+
+    def reset_input_buffer(self):
+        while not self._lines.empty():
+            self._lines.get_nowait()
+
+    def close(self):
+        with self.port._sessions_lock:
+            self.port._sessions.discard(self._lines)
+
+
+class DeviceHub:
+    """Owns both devices and runs commands and jobs for any number of clients.
+
+    Short commands write straight through. Motions hold a per-device lock
+    for their duration, and a second motion on the same device is refused
+    with DeviceBusyError rather than interleaved. Telemetry is updated by
+    the port reader threads and pushed from its own thread, so it never
+    waits behind a command.
+    """
+
+    def __init__(self, gantry_ser, arm_ser, data_dir=".", calibration=""):
+        self.clock = RealClock()
+        self.data_dir = data_dir
+        self.calibration = calibration
+        self.trajectory_cache = TrajectoryCache(cache_dir=os.path.join(data_dir, TRAJECTORY_CACHE_DIR))
+        self.gantry_pos = [0, 0]
+        self.arm_angles = [0] * 6
+        self.arm_frame_rate = ARM_FRAME_RATE
+        self.gantry = _Port(gantry_ser, self._on_gantry_line)
+        self.arm = _Port(arm_ser)
+        self.gantry_motion = threading.Lock()
+        self.arm_motion = threading.Lock()
+        self.jobs = {}
+        self._job_ids = itertools.count(1)
+        self._stop_flags = []  # stop flags of running jobs and arm moves
+        self._subscribers = set()
+        self._subscribers_lock = threading.Lock()
+        self.running = True
+        self._sync()
+        for target in (self._poll_loop, self._push_loop):
+            threading.Thread(target=target, daemon=True).start()
+
+    # Device state
+    def _sync(self):
+        """Read the real gantry position and arm pose (POS / READ_POS)."""
+        gantry, arm = self.gantry.session(), self.arm.session()
+        try:
+            self.gantry_pos = read_gantry_position(gantry, self.clock) or self.gantry_pos
+            self.arm_angles = read_arm_angles(arm, self.clock) or self.arm_angles
+            self.arm_frame_rate = read_arm_frame_rate(arm, self.clock) or self.arm_frame_rate
+        finally:
+            gantry.close()
+            arm.close()
+
+    def _gantry_busy(self):
+        """True while the gantry still works through queued moves (STATE replies Busy)."""
+        gantry = self.gantry.session()
+        try:
+            gantry.write(b"STATE\n")
+            deadline = time.monotonic() + gantry.timeout
+            while time.monotonic() < deadline:
+                response = gantry.readline().decode().strip()
+                if response in ("Busy", "Idle"):
+                    return response == "Busy"
+            return False  # firmware without STATE: nothing to go by
+        finally:
+            gantry.close()
+
+    def _on_gantry_line(self, line):
+        # POS replies and move confirmations share the "X:<x>,Y:<y>" format
+        if line.startswith("X:") and ",Y:" in line:
+            try:
+                self.gantry_pos = [int(line[2:line.index(",Y:")]), int(line[line.index(",Y:") + 3:])]
+            except ValueError:
+                pass
+
+    def _on_arm_frame(self, angles):
+        self.arm_angles = list(angles)
+
+    def _poll_loop(self):
+        while self.running:
+            # A job waiting for a move confirmation could mistake a POS reply
+            # for it, so only poll while nobody drives the gantry.
+            if not self.gantry_motion.locked():
+                self.gantry.write(b"POS\n")
+            time.sleep(GANTRY_POLL_S)
+
+    def telemetry(self):
+        return {"type": "telemetry", "t": time.time(), "gantry": list(self.gantry_pos), "arm": list(self.arm_angles)}
+
+    # Subscribers
+    def subscribe(self):
+        messages = queue.Queue(maxsize=WS_QUEUE_SIZE)
+        with self._subscribers_lock:
+            self._subscribers.add(messages)
+        return messages
+
+    def unsubscribe(self, messages):
+        with self._subscribers_lock:
+            self._subscribers.discard(messages)
+
+    def publish(self, message):
+        """Queue a message for every subscriber; a slow client loses its oldest messages, not others' time."""
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for messages in subscribers:
+            while True:
+                try:
+                    messages.put_nowait(message)
+                    break
+                except queue.Full:
+                    try:
+                        messages.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def _push_loop(self):
+        while self.running:
+            self.publish(self.telemetry())
+            time.sleep(1.0 / TELEMETRY_PUSH_HZ)
+
+    # Commands
+    def _runner(self, stop_flag):
+        return ScriptRunner(
+            self.gantry.session(), self.arm.session(),
+            load_json(os.path.join(self.data_dir, GANTRY_POS_FILE)),
+            load_json(os.path.join(self.data_dir, ARM_SEQ_FILE)),
+            clock=self.clock, arm_angles=self.arm_angles, gantry_start=self.gantry_pos,
+            stop_flag=stop_flag, on_arm_frame=self._on_arm_frame, arm_frame_rate=self.arm_frame_rate,
+            trajectory_cache=self.trajectory_cache, calibration=self.calibration
+        )
+
+    def move_gantry(self, x, y, speed=500):
+        if not 0 <= x <= 8200 or not 0 <= y <= 8200:
+            raise ValueError("Position must be 0–8200")
+        if not self.gantry_motion.acquire(blocking=False):
+            raise DeviceBusyError("Gantry is running a job")
+        try:
+            self.gantry.write(f"X:{int(x)},{int(speed)}\n".encode())
+            self.gantry.write(f"Y:{int(y)},{int(speed)}\n".encode())
+        finally:
+            self.gantry_motion.release()
+        return {"queued": [int(x), int(y)]}
+
+    def home_gantry(self):
+        if not self.gantry_motion.acquire(blocking=False):
+            raise DeviceBusyError("Gantry is running a job")
+        try:
+            self.gantry.write(b"HOME\n")
+        finally:
+            self.gantry_motion.release()
+        return {"homing": True}
+
+    def stop(self):
+        for stop_flag in list(self._stop_flags):
+            stop_flag[0] = True
+        self.gantry.write(b"!")  # realtime halt
+        return {"stopped": True}
+
+    def move_arm(self, angles, speed_ms=700):
+        """Interpolate the arm to angles; blocks the calling request until done."""
+        if len(angles) != 6:
+            raise ValueError("Expected 6 angles")
+        if not self.arm_motion.acquire(blocking=False):
+            raise DeviceBusyError("Arm is already moving")
+        stop_flag = [False]
+        self._stop_flags.append(stop_flag)
+        runner = self._runner(stop_flag)
+        try:
+            completed = runner.move_arm([float(a) for a in angles], int(speed_ms))
+        except serial.SerialException:
+            self._sync()
+            raise
+        finally:
+            self._stop_flags.remove(stop_flag)
+            runner.gantry_ser.close()
+            runner.arm_ser.close()
+            self.arm_motion.release()
+        return {"angles": self.arm_angles, "completed": completed}
+
+    def run_script(self, name, repeat=1):
+        """Start a script in a background job; returns the job record."""
+        scripts = load_json(os.path.join(self.data_dir, AUTO_FILE))
+        if name not in scripts:
+            raise ValueError(f"Script '{name}' not found")
+        repeat = int(repeat)
+        if repeat < 1:
+            raise ValueError(f"repeat must be at least 1, got {repeat}")
+        if not self.gantry_motion.acquire(blocking=False):
+            raise DeviceBusyError("Gantry is busy")
+        try:
+            if self._gantry_busy():
+                # A script would queue its first move behind the earlier one and time out waiting for it
+                raise DeviceBusyError("Gantry is still moving")
+        except (DeviceBusyError, serial.SerialException):
+            self.gantry_motion.release()
+            raise
+        if not self.arm_motion.acquire(blocking=False):
+            self.gantry_motion.release()
+            raise DeviceBusyError("Arm is busy")
+        job = {"id": next(self._job_ids), "name": name, "state": "running", "runs": [], "error": None}
+        self.jobs[job["id"]] = job
+        threading.Thread(target=self._run_job, args=(job, scripts[name], repeat), daemon=True).start()
+        return dict(job)
+
+    def _run_job(self, job, script, repeat):
+        stop_flag = [False]
+        self._stop_flags.append(stop_flag)
+        runner = self._runner(stop_flag)
+        try:
+            for _ in range(repeat):
+                report = runner.run(script)
+                job["runs"].append(round(report["cycle_time"], 3))
+                if stop_flag[0]:
+                    break
+            job["state"] = "stopped" if stop_flag[0] else "done"
+        except (ValueError, serial.SerialException) as e:
+            job["state"], job["error"] = "failed", str(e)
+            self._sync()  # re-read the real poses before anyone plans from them
+        finally:
+            self._stop_flags.remove(stop_flag)
+            runner.gantry_ser.close()
+            runner.arm_ser.close()
+            self.arm_motion.release()
+            self.gantry_motion.release()
+            self.publish({"type": "job", **job})
+
+    def status(self):
+        return {"gantry": list(self.gantry_pos), "arm": list(self.arm_angles),
+                "gantry_busy": self.gantry_motion.locked(), "arm_busy": self.arm_motion.locked(),
+                "jobs": list(self.jobs.values())}
+
+    def close(self):
+        self.running = False
+        save_arm_pose(self.arm)
+        self.gantry.close()
+        self.arm.close()
+
+    # Routing shared by HTTP and WebSocket requests
+    def handle(self, method, path, body):
+        """Dispatch one request. Returns (http_status, result)."""
+        body = body or {}
+        try:
+            if method == "GET" and path == "/status":
+                return 200, self.status()
+            if method == "GET" and path.startswith("/jobs/"):
+                job = self.jobs.get(int(path[6:]))
+                return (200, job) if job else (404, {"error": "No such job"})
+            if method == "POST" and path == "/gantry/move":
+                return 200, self.move_gantry(int(body["x"]), int(body["y"]), int(body.get("speed", 500)))
+            if method == "POST" and path == "/gantry/home":
+                return 200, self.home_gantry()
+            if method == "POST" and path == "/arm/move":
+                return 200, self.move_arm(body["angles"], int(body.get("speed_ms", 700)))
+            if method == "POST" and path == "/scripts/run":
+                return 202, self.run_script(body["name"], int(body.get("repeat", 1)))
+            if method == "POST" and path == "/stop":
+                return 200, self.stop()
+            return 404, {"error": f"No route for {method} {path}"}
+        except DeviceBusyError as e:
+            return 409, {"error": str(e)}
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, {"error": f"Bad request: {e}"}
+        except serial.SerialException as e:
+            return 503, {"error": f"Serial communication error: {e}"}
+
+
+class ControlHandler(BaseHTTPRequestHandler):
+    """JSON over HTTP, plus an upgrade to WebSocket on /ws."""
+
+    protocol_version = "HTTP/1.1"
+    rbufsize = 0  # unbuffered, so select() on the socket sees every pending WebSocket frame
+
+    @property
+    def hub(self):
+        return self.server.hub
+
+    def _send_json(self, status, result):
+        data = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/ws" and self.headers.get("Upgrade", "").lower() == "websocket":
+            self._websocket()
+            return
+        self._send_json(*self.hub.handle("GET", self.path, None))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self._read_exact(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "Body is not JSON"})
+            return
+        self._send_json(*self.hub.handle("POST", self.path, body))
+
+    def log_message(self, format, *args):
+        pass  # keep the console for errors
+
+    # WebSocket (RFC 6455, text frames only)
+    def _websocket(self):
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.close_connection = True
+
+        messages = self.hub.subscribe()
+        try:
+            while self.hub.running:
+                # Outgoing first, then any client frame; neither waits on a command
+                try:
+                    self._ws_send(json.dumps(messages.get(timeout=0.05)))
+                except queue.Empty:
+                    pass
+                if select.select([self.connection], [], [], 0)[0]:
+                    opcode, payload = self._ws_receive()
+                    if opcode is None or opcode == 0x8:
+                        break
+                    if opcode == 0x9:
+                        self._ws_send(payload, opcode=0xA)
+                    elif opcode == 0x1:
+                        threading.Thread(target=self._ws_request, args=(payload, messages), daemon=True).start()
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.hub.unsubscribe(messages)
+
+    def _ws_request(self, payload, messages):
+        """Run one client request off the connection thread and queue the reply."""
+        try:
+            request = json.loads(payload)
+            status, result = self.hub.handle(request.get("method", "GET"), request.get("path", ""), request.get("body"))
+        except ValueError:
+            request, status, result = {}, 400, {"error": "Message is not JSON"}
+        messages.put({"type": "reply", "id": request.get("id"), "status": status, "result": result})
+
+    def _ws_send(self, text, opcode=0x1):
+        data = text.encode() if isinstance(text, str) else text
+        if len(data) < 126:
+            header = struct.pack("!BB", 0x80 | opcode, len(data))
+        elif len(data) < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, len(data))
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, len(data))
+        self.wfile.write(header + data)
+        self.wfile.flush()
+
+    def _read_exact(self, count):
+        data = b""
+        while len(data) < count:
+            chunk = self.rfile.read(count - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def _ws_receive(self):
+        header = self._read_exact(2)
+        if len(header) < 2:
+            return None, b""
+        opcode, length = header[0] & 0x0F, header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self._read_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self._read_exact(8))[0]
+        mask = self._read_exact(4) if header[1] & 0x80 else b"\0\0\0\0"
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(self._read_exact(length)))
+        return opcode, payload
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Share the gantry and arm ports over HTTP and WebSocket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--gantry-port", default="COM4")
+    parser.add_argument("--arm-port", default="COM3")
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--data-dir", default=".", help="directory holding the GUI's JSON files")
+    parser.add_argument("--simulate", action="store_true", help="serve the simulators in real time")
+    parser.add_argument("--calibration", help="servo calibration profile to upload at startup")
+    args = parser.parse_args(argv)
+
+    if args.simulate:
+        clock = RealClock()
+        gantry_ser, arm_ser = SimulatedGantry(clock, timeout=0.05), SimulatedArm(clock, timeout=0.05)
+    else:
+        try:
+            gantry_ser = serial.Serial(args.gantry_port, args.baud, timeout=1)
+            arm_ser = serial.Serial(args.arm_port, args.baud, timeout=1)
+        except serial.SerialException as e:
+            parser.exit(3, f"Error: failed to connect: {e}\n")
+        time.sleep(2)  # Wait for the Arduinos to reset
+
+    table = None
+    if args.calibration:
+        profiles = load_profiles(os.path.join(args.data_dir, CALIBRATION_FILE))
+        if args.calibration not in profiles:
+            parser.exit(2, f"Error: calibration '{args.calibration}' not found\n")
+        try:
+            table = compile_table(profiles[args.calibration])
+            upload_table(arm_ser, table)
+        except (ValueError, serial.SerialException) as e:
+            parser.exit(3, f"Error: calibration upload failed: {e}\n")
+
+    hub = DeviceHub(gantry_ser, arm_ser, data_dir=args.data_dir, calibration=table_key(table))
+    server = ThreadingHTTPServer((args.host, args.port), ControlHandler)
+    server.daemon_threads = True
+    server.hub = hub
+    print(f"Control server on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        hub.stop()
+        hub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from arm_motion import ARM_INTERPOLATION_STEPS
+from automation import GANTRY_AXIS_DELAY
+from simulator import gantry_axis_time
+
+
+def arm_move_ms(speed_ms, sequential=False):
+    """Duration of one move_to_arm_angles call: 21 frames per motor, six motors in single mode."""
+    frames = ARM_INTERPOLATION_STEPS + 1
+    move_ms = frames * (speed_ms // ARM_INTERPOLATION_STEPS)
+    return move_ms * 6 if sequential else move_ms
+
+
+def gantry_move_ms(start, end):
+    """X starts immediately, Y after GANTRY_AXIS_DELAY; both follow AccelStepper trapezoids."""
+    x_time = gantry_axis_time(end[0] - start[0])
+    y_time = GANTRY_AXIS_DELAY + gantry_axis_time(end[1] - start[1])
+    return 1000.0 * max(x_time, y_time, GANTRY_AXIS_DELAY)
+
+
+def estimate_script(script, gantry_positions, arm_sequences, gantry_start=(0, 0), arm_start=None,
+                    arm_speed_ms=700, sequential=False, chain=None):
+    """Predict how long a script takes without touching hardware.
+
+    Returns {"total_ms", "actions"} where every action entry carries its
+    index, type, name and ms.
+    """
+    position = list(gantry_start)
+    arm_angles = list(arm_start) if arm_start else [0] * 6
+    actions = []
+    for index, action in enumerate(script):
+        entry = {"index": index, "type": action["type"], "name": action["name"]}
+        if action["type"] == "gantry_pos":
+            if action["name"] not in gantry_positions:
+                raise ValueError(f"Gantry position '{action['name']}' not found")
+            target = gantry_positions[action["name"]]
+            entry["ms"] = gantry_move_ms(position, target)
+            position = list(target)
+        elif action["type"] == "arm_seq":
+            if action["name"] not in arm_sequences:
+                raise ValueError(f"Arm sequence '{action['name']}' not found")
+            steps = arm_sequences[action["name"]]
+            entry["ms"] = len(steps) * arm_move_ms(arm_speed_ms, sequential)
+            if steps:
+                arm_angles = list(steps[-1])
+        elif action["type"] == "tool_target":
+            if chain is None:
+                from kinematic_chain import GantryArmChain
+                chain = GantryArmChain()
+            plan = chain.resolve(action["target"], position, arm_angles)
+            entry["ms"] = arm_move_ms(arm_speed_ms)
+            if plan["gantry"] != position:
+                entry["ms"] += gantry_move_ms(position, plan["gantry"])
+                position = plan["gantry"]
+            arm_angles = plan["arm"]
+        else:
+            entry["ms"] = 0.0
+        actions.append(entry)
+    return {"total_ms": sum(a["ms"] for a in actions), "actions": actions}
+
+
+def compare_scripts(scripts, gantry_positions, arm_sequences, **kwargs):
+    """Estimate several script variants; returns [(name, total_ms)] fastest first."""
+    totals = [(name, estimate_script(script, gantry_positions, arm_sequences, **kwargs)["total_ms"])
+              for name, script in scripts.items()]
+    return sorted(totals, key=lambda item: item[1])
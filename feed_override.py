@@ -0,0 +1,96 @@
+import threading
+
+from clock import RealClock
+
+FEED_OVERRIDE_MIN = 0.1
+FEED_OVERRIDE_MAX = 2.0
+FEED_OVERRIDE_RAMP = 2.0  # factor change per second; 10% -> 200% takes about 1 s
+
+
+class FeedOverride:
+    """Playback speed factor, shared between the control that sets it and the loops that play motion.
+
+    Playback runs on trajectory time, which advances at `factor` times real
+    time, so a precomputed trajectory is sped up or slowed down without being
+    recomputed. A new target is approached at no more than `ramp` per second,
+    so the commanded velocity changes smoothly instead of jumping.
+    """
+
+    def __init__(self, factor=1.0, ramp=FEED_OVERRIDE_RAMP, clock=None):
+        self.clock = clock or RealClock()
+        self.ramp = ramp
+        self.target = self._clamp(factor)
+        self._factor = self.target
+        self._updated = self.clock.time()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clamp(factor):
+        return min(max(float(factor), FEED_OVERRIDE_MIN), FEED_OVERRIDE_MAX)
+
+    def set(self, factor):
+        """Set the target factor (clamped to FEED_OVERRIDE_MIN..FEED_OVERRIDE_MAX)."""
+        with self._lock:
+            self._advance()
+            self.target = self._clamp(factor)
+
+    def factor(self):
+        """The effective factor now, on its ramp towards the target."""
+        with self._lock:
+            return self._advance()
+
+    def _advance(self):
+        """Move the factor along its ramp up to now and return it."""
+        now = self.clock.time()
+        limit = self.ramp * max(0.0, now - self._updated)
+        self._updated = now
+        self._factor += max(-limit, min(limit, self.target - self._factor))
+        return self._factor
+
+    def scaled(self, seconds):
+        """Real time a trajectory interval of `seconds` takes at the current factor."""
+        return seconds / self.factor()
+
+
+class TrajectoryClock:
+    """Trajectory time for one playback: starts at 0 and advances at the feed override's factor.
+
+    Integrating the (ramped) factor, rather than dividing the elapsed time
+    by it, keeps the position on the trajectory continuous when it changes.
+    """
+
+    def __init__(self, override, clock=None):
+        self.override = override
+        self.clock = clock or override.clock
+        self.t = 0.0
+        self.held = False
+        self._last = self.clock.time()
+        self._last_factor = override.factor()
+
+    def hold(self):
+        """Stop trajectory time where it is (pause)."""
+        self.time()
+        self.held = True
+
+    def release(self):
+        """Let trajectory time run on from where hold() stopped it."""
+        self._last = self.clock.time()
+        self._last_factor = self.override.factor()
+        self.held = False
+
+    def time(self):
+        if self.held:
+            return self.t
+        now = self.clock.time()
+        factor = self.override.factor()
+        # Trapezoid over the interval: exact while the factor ramps linearly
+        self.t += (now - self._last) * (self._last_factor + factor) / 2
+        self._last, self._last_factor = now, factor
+        return self.t
+
+    def until(self, t):
+        """Real seconds until trajectory time reaches t at the current factor (0 if it has)."""
+        remaining = t - self.time()
+        if self.held:
+            return float("inf") if remaining > 0 else 0.0
+        return max(0.0, remaining / self._last_factor)
@@ -0,0 +1,176 @@
+import re
+
+from automation import GANTRY_REPORT_INTERVAL, parse_gantry_position
+from clock import RealClock
+
+RX_BUFFER_SIZE = 128  # RX_SIZE in PS2_Gantry.ino
+MM_PER_INCH = 25.4
+STREAM_PROBE_S = 1.0    # silence after which the streamer asks for a realtime position report ('?')
+STREAM_TIMEOUT = 5.0    # silence, probes included, after which the gantry is taken to be gone
+STATE_POLL_S = 0.1      # STATE polling interval while the last moves finish
+
+_WORD = re.compile(r"([A-Z])\s*([-+]?(?:\d+\.?\d*|\.\d+))")
+
+
+def read_gcode_file(path):
+    """Yield the lines of a G-code file one at a time (the file is never loaded whole)."""
+    with open(path, "r") as f:
+        for line in f:
+            yield line
+
+
+def parse_gcode(lines):
+    """Translate G-code lines into gantry firmware commands, lazily.
+
+    Supported: G0/G1 X Y (mm), G4 P<ms> or S<s>, G28, G20/G21, G90/G91.
+    Feed rates are ignored; moves run at the firmware's AccelStepper limits.
+    Yields command strings such as "X,12.500,Y,40.000" or "DWELL,500". G28
+    is queued as a move to the origin: the firmware's HOME clears the queue,
+    which would throw away the moves streamed ahead of it.
+    """
+    x = y = 0.0
+    absolute = True
+    scale = 1.0
+    motion = None
+    for number, raw in enumerate(lines, 1):
+        line = re.sub(r"\(.*?\)", "", raw.split(";", 1)[0]).strip().upper()
+        if not line:
+            continue
+        words = _WORD.findall(line)
+        if not words:
+            raise ValueError(f"Line {number}: cannot parse '{raw.strip()}'")
+        codes = [int(float(v)) for letter, v in words if letter == "G"]
+        params = {letter: float(v) for letter, v in words if letter != "G"}
+        for code in codes:
+            if code == 20:
+                scale = MM_PER_INCH
+            elif code == 21:
+                scale = 1.0
+            elif code == 90:
+                absolute = True
+            elif code == 91:
+                absolute = False
+            elif code in (0, 1):
+                motion = code
+            elif code == 4:
+                ms = params.get("P", params.get("S", 0) * 1000.0 if "S" in params else 0)
+                yield f"DWELL,{int(round(ms))}"
+            elif code == 28:
+                x = y = 0.0
+                yield f"X,{x:.3f},Y,{y:.3f}"
+            else:
+                raise ValueError(f"Line {number}: unsupported G{code}")
+        if motion is not None and ("X" in params or "Y" in params) and not (set(codes) & {4, 28}):
+            if absolute:
+                x = params["X"] * scale if "X" in params else x
+                y = params["Y"] * scale if "Y" in params else y
+            else:
+                x += params.get("X", 0.0) * scale
+                y += params.get("Y", 0.0) * scale
+            yield f"X,{x:.3f},Y,{y:.3f}"
+
+
+class GcodeStreamer:
+    """Streams firmware commands to the gantry with character-counting flow control.
+
+    Every line sent is counted against the firmware's receive buffer until its
+    "ok" arrives, and a new line is only written if it fits. The buffer stays
+    full while the machine works through its queue, so throughput is set by
+    the motion rather than by one round trip per line.
+
+    An "ok" can take a whole move to come while the queue is full, so
+    silence alone isn't an error: after STREAM_PROBE_S without a line the
+    streamer asks for a realtime position report ('?'), and only after
+    STREAM_TIMEOUT without any reply does it give up with ValueError. The
+    stream is done once the firmware reports STATE Idle, not at the last "ok".
+    With on_position set, '?' is sent every GANTRY_REPORT_INTERVAL instead,
+    and on_position is called with (x, y) of every position line read; it
+    runs on the streaming thread.
+    """
+
+    def __init__(self, ser, clock=None, rx_buffer_size=RX_BUFFER_SIZE, stop_flag=None, on_position=None):
+        self.ser = ser
+        self.clock = clock or RealClock()
+        self.rx_buffer_size = rx_buffer_size
+        self.stop_flag = stop_flag if stop_flag is not None else [False]
+        self.on_position = on_position
+        self.probe_interval = GANTRY_REPORT_INTERVAL if on_position else STREAM_PROBE_S
+        self._heard = self._probed = self.clock.time()
+
+    def _readline(self):
+        """The next reply line, or "" once stopped; raises ValueError if the gantry stays silent."""
+        while not self.stop_flag[0]:
+            if self.on_position and self.clock.time() - self._probed >= self.probe_interval:
+                self.ser.write(b"?")
+                self._probed = self.clock.time()
+            response = self.ser.readline().decode().strip()
+            now = self.clock.time()
+            if response:
+                self._heard = now
+                position = parse_gantry_position(response)
+                if position and self.on_position:
+                    self.on_position(*position)
+                return response
+            if now - self._heard >= STREAM_TIMEOUT:
+                raise ValueError(f"The gantry stopped answering ({STREAM_TIMEOUT:.0f} s without a reply)")
+            if now - self._probed >= self.probe_interval:
+                self.ser.write(b"?")
+                self._probed = now
+            self.clock.sleep(STATE_POLL_S)
+        return ""
+
+    def _wait_ok(self, in_flight):
+        response = self._readline()
+        if response == "ok":
+            in_flight.pop(0)
+        elif response.startswith("error") or response == "Queue full":
+            raise ValueError(f"Gantry rejected a line: {response}")
+
+    def _wait_idle(self):
+        """Wait until the gantry has finished every queued move and dwell."""
+        while not self.stop_flag[0]:
+            self.ser.write(b"STATE\n")
+            response = self._readline()
+            while response not in ("Idle", "Busy", ""):
+                response = self._readline()  # position confirmations of the last moves
+            if response == "Idle":
+                return
+            self.clock.sleep(STATE_POLL_S)
+
+    def stream(self, commands, on_progress=None):
+        """Send every command and wait for the motion to finish; returns the number of lines sent."""
+        in_flight = []
+        sent = 0
+        streaming = True
+        self.ser.reset_input_buffer()  # drop stale POS replies
+        self._heard = self._probed = self.clock.time()
+        self.ser.write(b"STREAM,1\n")
+        in_flight.append(len(b"STREAM,1\n"))
+        try:
+            for command in commands:
+                data = (command + "\n").encode()
+                if len(data) > self.rx_buffer_size:
+                    raise ValueError(f"Line too long for the gantry buffer: {command}")
+                while sum(in_flight) + len(data) > self.rx_buffer_size:
+                    if self.stop_flag[0]:
+                        return sent
+                    self._wait_ok(in_flight)
+                self.ser.write(data)
+                in_flight.append(len(data))
+                sent += 1
+                if on_progress:
+                    on_progress(sent, command)
+            while in_flight and not self.stop_flag[0]:
+                self._wait_ok(in_flight)
+            self.ser.write(b"STREAM,0\n")
+            streaming = False
+            self._wait_idle()
+        finally:
+            if self.stop_flag[0]:
+                self.ser.write(b"!")
+            if streaming:
+                self.ser.write(b"STREAM,0\n")
+        return sent
+
+    def stream_file(self, path, on_progress=None):
+        return self.stream(parse_gcode(read_gcode_file(path)), on_progress)
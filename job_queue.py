@@ -0,0 +1,216 @@
+"""Queue of automation jobs, run back to back by a scheduler.
+
+A job is one automation script with a repeat count and a priority. The
+scheduler takes jobs highest priority first (then in the order they were
+queued) and runs them on one ScriptRunner without waiting between runs:
+the next job's arm plans are compiled while the current one runs, and the
+first gantry target of every run is queued on the firmware before the
+previous run's last move has finished.
+
+    jobs = JobQueue()
+    jobs.put("pick_place", scripts["pick_place"], repeat=20)
+    jobs.put("rework", scripts["rework"], priority=1)   # runs first
+    JobScheduler(runner, jobs, arm_speed_ms=700).run_pending()
+"""
+import heapq
+import itertools
+import threading
+
+import serial
+
+
+class Job:
+    """One queued script and what happened when it ran.
+
+    runs holds the cycle time of every completed run and gaps the host
+    time between the end of the run before it (of any job) and its start.
+    """
+
+    def __init__(self, job_id, name, script, repeat=1, priority=0):
+        self.id = job_id
+        self.name = name
+        self.script = script
+        self.repeat = int(repeat)
+        self.priority = int(priority)
+        self.state = "queued"  # queued, running, done, stopped, failed or cancelled
+        self.runs = []
+        self.gaps = []
+        self.error = None
+
+    def stats(self):
+        stats = {"runs": len(self.runs)}
+        if self.runs:
+            stats.update(min=min(self.runs), mean=sum(self.runs) / len(self.runs), max=max(self.runs))
+        if self.gaps:
+            stats.update(gap_mean=sum(self.gaps) / len(self.gaps), gap_max=max(self.gaps))
+        return stats
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "repeat": self.repeat, "priority": self.priority,
+                "state": self.state, "error": self.error, **self.stats()}
+
+
+class JobQueue:
+    """Jobs waiting to run, highest priority first and first come first served within a priority.
+
+    Every job ever queued stays in self.jobs, so finished ones can still be
+    reported. Safe to share between threads.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self._heap = []  # (-priority, order, job)
+        self._job_ids = itertools.count(1)
+        self._order = itertools.count()
+        self._changed = threading.Condition()
+
+    def put(self, name, script, repeat=1, priority=0):
+        """Queue a script; returns its Job."""
+        if not script:
+            raise ValueError(f"Script '{name}' is empty")
+        if int(repeat) < 1:
+            raise ValueError("Repeat count must be at least 1")
+        with self._changed:
+            job = Job(next(self._job_ids), name, script, repeat, priority)
+            self.jobs[job.id] = job
+            heapq.heappush(self._heap, (-job.priority, next(self._order), job))
+            self._changed.notify_all()
+        return job
+
+    def requeue(self, job):
+        """Put a job taken with get() back at the front of its priority."""
+        with self._changed:
+            job.state = "queued"
+            heapq.heappush(self._heap, (-job.priority, -job.id, job))
+            self._changed.notify_all()
+
+    def get(self, timeout=0.0):
+        """Take the next job off the queue, waiting up to timeout seconds; None if there is none."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._heap, timeout=timeout)
+            return heapq.heappop(self._heap)[2] if self._heap else None
+
+    def wait(self, timeout=None):
+        """Block until a job is queued or timeout seconds pass; True if one is waiting."""
+        with self._changed:
+            return bool(self._changed.wait_for(lambda: self._heap, timeout=timeout))
+
+    def peek(self):
+        """The job get() would return, left on the queue."""
+        with self._changed:
+            return self._heap[0][2] if self._heap else None
+
+    def cancel(self, job_id=None):
+        """Drop one queued job, or every queued job when job_id is None. Returns the jobs dropped."""
+        with self._changed:
+            dropped = [entry[2] for entry in self._heap if job_id is None or entry[2].id == job_id]
+            self._heap = [entry for entry in self._heap if entry[2] not in dropped]
+            heapq.heapify(self._heap)
+        for job in dropped:
+            job.state = "cancelled"
+        return dropped
+
+    def pending(self):
+        """Queued jobs in the order they will run."""
+        with self._changed:
+            return [entry[2] for entry in sorted(self._heap)]
+
+    def __len__(self):
+        with self._changed:
+            return len(self._heap)
+
+
+class JobScheduler:
+    """Runs the jobs of a JobQueue back to back on one ScriptRunner.
+
+    The job after the current one is taken off the queue when the current
+    one's last run starts, so its first gantry target can be queued ahead;
+    a job queued later, even with a higher priority, runs after it.
+    on_job(job) is called whenever a job starts, finishes a run or ends.
+    """
+
+    def __init__(self, runner, queue, gantry_speed=500, arm_speed_ms=700, sequential=False, on_job=None):
+        self.runner = runner
+        self.queue = queue
+        self.gantry_speed = gantry_speed
+        self.arm_speed_ms = arm_speed_ms
+        self.sequential = sequential
+        self.on_job = on_job
+        self._next = None        # job taken off the queue to follow the current one
+        self._last_end = None    # clock time the previous run ended
+        self._prefetched = None
+
+    def notify(self, job):
+        if self.on_job:
+            self.on_job(job)
+
+    def prefetch(self, job):
+        """Compile the arm plans of a job in the background, so its first run doesn't wait for them."""
+        cache = self.runner.trajectory_cache
+        if cache is None or job is None or job is self._prefetched:
+            return None
+        self._prefetched = job
+        sequences = [self.runner.arm_sequences[action["name"]] for action in job.script
+                     if action["type"] == "arm_seq" and action["name"] in self.runner.arm_sequences]
+        if not sequences:
+            return None
+
+        def compile_plans():
+            for steps in sequences:
+                cache.get(steps, self.arm_speed_ms, self.sequential, self.runner.calibration)
+
+        thread = threading.Thread(target=compile_plans, daemon=True)
+        thread.start()
+        return thread
+
+    def run_pending(self):
+        """Run queued jobs until the queue is empty or a run is stopped. Returns the jobs that ran."""
+        finished = []
+        self._last_end = None
+        try:
+            while True:
+                job, self._next = self._next or self.queue.get(), None
+                if job is None:
+                    break
+                finished.append(self.run_job(job))
+                if job.state == "stopped":
+                    break
+        finally:
+            if self._next is not None:
+                self.queue.requeue(self._next)  # taken off the queue for a run that never came
+                self._next = None
+            self.runner.prequeued = None
+        return finished
+
+    def run_job(self, job):
+        """Run every repetition of one job, then return it with its state set."""
+        job.state = "running"
+        self.notify(job)
+        self.prefetch(self.queue.peek())
+        try:
+            for run in range(job.repeat):
+                if run < job.repeat - 1:
+                    next_script = job.script
+                else:
+                    self._next = self.queue.get()
+                    self.prefetch(self._next)
+                    next_script = self._next.script if self._next else None
+                start = self.runner.clock.time()
+                if self._last_end is not None:
+                    job.gaps.append(start - self._last_end)
+                report = self.runner.run(job.script, self.gantry_speed, self.arm_speed_ms, self.sequential,
+                                         script_name=job.name, next_script=next_script)
+                self._last_end = self.runner.clock.time()
+                if self.runner.stop_flag[0]:
+                    job.state = "stopped"
+                    break
+                job.runs.append(report["cycle_time"])
+                self.notify(job)
+            else:
+                job.state = "done"
+        except (ValueError, serial.SerialException) as e:
+            job.state, job.error = "failed", str(e)
+            self.runner.prequeued = None  # the pose may be off; the next job starts with a fresh move
+            self._last_end = None
+        self.notify(job)
+        return job
@@ -0,0 +1,91 @@
+import numpy as np
+
+from arm_kinematics import ArmIKSolver, IK_JOINTS, tool_position
+from simulator import (FIRMWARE_STEPS_PER_MM, GANTRY_ACCELERATION, GANTRY_MAX_POSITION, GANTRY_MAX_SPEED,
+                       HOST_STEPS_PER_MM, trapezoid_time)
+
+ARM_JOINT_SPEED = 150.0  # GUI degrees per second (nominal hobby servo, ~0.2 s / 60 deg)
+
+
+class GantryArmChain:
+    """Kinematic model of the arm mounted on the gantry carriage.
+
+    World coordinates are mm with the origin at gantry home, X/Y along the
+    gantry axes and Z up. The arm base sits at carriage + mount_offset with its
+    own X/Y axes aligned to the gantry's.
+    """
+
+    def __init__(self, solver=None, mount_offset=(0.0, 0.0, 0.0), gantry_speed=None, gantry_accel=None,
+                 arm_joint_speed=ARM_JOINT_SPEED, concurrent=False):
+        self.solver = solver or ArmIKSolver()
+        self.mount_offset = np.asarray(mount_offset, dtype=float)
+        # AccelStepper limits are in firmware steps; keep them in mm for the model
+        self.gantry_speed = gantry_speed or GANTRY_MAX_SPEED / FIRMWARE_STEPS_PER_MM
+        self.gantry_accel = gantry_accel or GANTRY_ACCELERATION / FIRMWARE_STEPS_PER_MM
+        self.arm_joint_speed = arm_joint_speed
+        self.concurrent = concurrent
+
+    def tool_world_position(self, gantry_steps, arm_angles):
+        carriage = np.array([gantry_steps[0], gantry_steps[1], 0.0]) / HOST_STEPS_PER_MM
+        return carriage + self.mount_offset + tool_position(arm_angles)
+
+    def gantry_time(self, start_steps, end_steps):
+        """Move time for the gantry; X and Y run as independent trapezoids."""
+        start = np.asarray(start_steps, dtype=float) / HOST_STEPS_PER_MM
+        end = np.asarray(end_steps, dtype=float) / HOST_STEPS_PER_MM
+        distance = np.abs(end - start)
+        return np.maximum(
+            _trapezoid_times(distance[..., 0], self.gantry_speed, self.gantry_accel),
+            _trapezoid_times(distance[..., 1], self.gantry_speed, self.gantry_accel))
+
+    def arm_time(self, start_angles, end_angles):
+        delta = np.abs(np.asarray(end_angles, dtype=float) - np.asarray(start_angles, dtype=float))
+        return delta[..., :IK_JOINTS].max(axis=-1) / self.arm_joint_speed
+
+    def total_time(self, gantry_time, arm_time):
+        return np.maximum(gantry_time, arm_time) if self.concurrent else gantry_time + arm_time
+
+    def resolve(self, target, gantry_steps, arm_angles, grid=9, refine=3):
+        """Split a world tool target between gantry travel and arm motion.
+
+        Candidate carriage positions on a grid around the target (plus "gantry
+        stays put") are solved in one batched IK call; the grid is then refined
+        around the fastest candidate. Returns a dict with the gantry position
+        in GUI steps, arm angles and the predicted times.
+        """
+        target = np.asarray(target, dtype=float)
+        start_carriage = np.asarray(gantry_steps, dtype=float)
+        arm_angles = np.asarray(arm_angles, dtype=float)
+        reach = np.linalg.norm(tool_position(np.zeros(6))[:2]) * 1.5
+        center = (target[:2] - self.mount_offset[:2]) * HOST_STEPS_PER_MM
+        span = reach * HOST_STEPS_PER_MM
+        best = None
+        for _ in range(refine):
+            offsets = np.linspace(-span, span, grid)
+            candidates = np.stack(np.meshgrid(center[0] + offsets, center[1] + offsets), axis=-1).reshape(-1, 2)
+            candidates = np.vstack([start_carriage, candidates])
+            candidates = np.clip(np.round(candidates), 0, GANTRY_MAX_POSITION)
+            arm_targets = np.column_stack([
+                target[0] - candidates[:, 0] / HOST_STEPS_PER_MM,
+                target[1] - candidates[:, 1] / HOST_STEPS_PER_MM,
+                np.full(len(candidates), target[2]),
+            ]) - self.mount_offset
+            q, residual = self.solver.solve_batch(arm_targets, np.broadcast_to(arm_angles, (len(candidates), 6)))
+            q[:, IK_JOINTS:] = arm_angles[IK_JOINTS:]
+            g_time = self.gantry_time(start_carriage, candidates)
+            a_time = self.arm_time(arm_angles, q)
+            total = np.where(residual <= self.solver.tolerance, self.total_time(g_time, a_time), np.inf)
+            i = int(np.argmin(total))
+            if np.isfinite(total[i]) and (best is None or total[i] < best["time"]):
+                best = {"gantry": [int(c) for c in candidates[i]], "arm": [float(a) for a in q[i]],
+                        "time": float(total[i]), "gantry_time": float(g_time[i]), "arm_time": float(a_time[i])}
+            if best is not None:
+                center = np.asarray(best["gantry"], dtype=float)
+            span /= grid / 2.0
+        if best is None:
+            raise ValueError(f"Tool target {tuple(target)} is out of reach")
+        return best
+
+
+def _trapezoid_times(distances, max_speed, accel):
+    return np.vectorize(lambda d: trapezoid_time(d, max_speed, accel), otypes=[float])(distances)
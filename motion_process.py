@@ -0,0 +1,328 @@
+"""Arm frame streaming in a process of its own.
+
+The motion process owns the arm's serial port. The GUI hands it whole moves
+as frame schedules and it writes each frame at its deadline, so redraws,
+dialogs and JSON saves in the GUI process (and its GIL) cannot delay or
+bunch up frames. Everything else the GUI sends to the arm goes through
+MotionProcess.port, a pyserial stand-in that forwards writes over the same
+pipe and delivers the arm's reply lines back.
+
+    motion = MotionProcess("COM3", realtime=True)
+    arm_ser = motion.port                          # READ_POS, CAL, sliders...
+    stream = motion.play(*frame_schedule(frames, 0.035))
+    motion.wait(stream, on_frame=show)
+"""
+import collections
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+
+import serial
+
+from clock import RealClock
+from feed_override import FeedOverride, TrajectoryClock
+from shared_state import STATUS_IDLE, STATUS_MOVING, SharedState
+from simulator import SimulatedArm
+
+MOTION_PRIORITY = 50        # SCHED_FIFO priority when realtime=True (1-99)
+MOTION_IDLE_POLL_S = 0.005  # how often an idle motion process reads the port
+MOTION_START_TIMEOUT = 5.0  # includes the Uno's 2 s reset when the port opens
+
+
+def frame_schedule(frames, step_delay, frame_rate=None):
+    """Turn evenly spaced frames into (schedule, duration) for MotionProcess.play.
+
+    Frame i is due at i * step_delay seconds and the move lasts
+    len(frames) * step_delay, the same pacing as ScriptRunner.move_arm. With
+    a frame_rate, frames closer than one frame period to the previously
+    sent one are dropped, except the last.
+    """
+    schedule = []
+    for i, angles in enumerate(frames):
+        t = i * step_delay
+        if (frame_rate is None or not schedule or i == len(frames) - 1
+                or t - schedule[-1][0] >= 1.0 / frame_rate):
+            schedule.append((t, [int(a) for a in angles]))
+    return schedule, len(frames) * step_delay
+
+
+def _raise_priority():
+    """Move this process to SCHED_FIFO; returns False where that isn't allowed or supported."""
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(MOTION_PRIORITY))
+    except (AttributeError, OSError):
+        return False
+    return True
+
+
+def _frame_angles(data):
+    """The six angles of a frame line written to the arm, or None for any other command."""
+    parts = data.decode(errors="replace").strip().split(",")
+    if len(parts) != 6:
+        return None
+    try:
+        return [int(float(p)) for p in parts]
+    except ValueError:
+        return None
+
+
+def _motion_main(conn, port, baud, realtime, simulate, state_name):
+    """Body of the motion process: play schedules on time and relay the port both ways."""
+    realtime = _raise_priority() if realtime else False
+    # Every frame reaches the arm from here, so this process is the arm's writer of the live state
+    state = SharedState(state_name) if state_name else None
+    try:
+        if simulate:
+            ser = SimulatedArm(RealClock(), timeout=0)
+        else:
+            ser = serial.Serial(port, baud, timeout=0)
+            time.sleep(2)  # Wait for the Arduino to reset
+    except serial.SerialException as e:
+        conn.send(("error", str(e)))
+        return
+    conn.send(("ready", realtime))
+
+    # Schedules are played on trajectory time, which the feed override speeds up or slows down
+    override = FeedOverride()
+    clock = TrajectoryClock(override)
+    pending = collections.deque()  # (stream_id, schedule, duration) not yet started
+    current = None
+    start = index = 0
+    last_end = 0.0
+    rx = b""
+    while True:
+        if current is not None:
+            _, schedule, duration = current
+            due = start + (schedule[index][0] if index < len(schedule) else duration)
+            timeout = min(clock.until(due), MOTION_IDLE_POLL_S)
+        else:
+            timeout = 0.0 if pending else MOTION_IDLE_POLL_S
+        while conn.poll(timeout):
+            timeout = 0.0
+            message = conn.recv()
+            kind = message[0]
+            if kind == "write":
+                ser.write(message[1])
+                angles = _frame_angles(message[1])
+                if state and angles:
+                    state.write_arm(angles, STATUS_MOVING if current else STATUS_IDLE)
+            elif kind == "play":
+                pending.append(message[1:])
+            elif kind == "override":
+                override.set(message[1])
+            elif kind == "pause":
+                clock.hold()
+            elif kind == "resume":
+                clock.release()
+            elif kind == "stop":
+                for stream in ([current] if current else []) + list(pending):
+                    conn.send(("done", stream[0], False))
+                current = None
+                pending.clear()
+                clock.release()
+                if state:
+                    state.write_arm(state.read_arm()[0], STATUS_IDLE)
+            elif kind == "close":
+                ser.close()
+                if state:
+                    state.close()
+                return
+
+        if ser.in_waiting:
+            rx += ser.read(ser.in_waiting)
+            while b"\n" in rx:
+                line, rx = rx.split(b"\n", 1)
+                conn.send(("line", line + b"\n"))
+
+        now = clock.time()
+        if current is None and pending:
+            current = pending.popleft()
+            # Queued streams run back to back on the same time line
+            start, index = max(now, last_end), 0
+        while current is not None:
+            stream_id, schedule, duration = current
+            if index < len(schedule):
+                if now < start + schedule[index][0]:
+                    break
+                angles = schedule[index][1]
+                ser.write((",".join(map(str, angles)) + "\n").encode())
+                conn.send(("frame", stream_id, angles))
+                if state:
+                    state.write_arm(angles, STATUS_MOVING)
+                index += 1
+            elif now >= start + duration:
+                conn.send(("done", stream_id, True))
+                last_end = start + duration
+                current = pending.popleft() if pending else None
+                start, index = last_end, 0
+                if state and current is None:
+                    state.write_arm(state.read_arm()[0], STATUS_IDLE)
+            else:
+                break
+
+
+class MotionPort:
+    """pyserial stand-in for the arm port while the motion process owns it."""
+
+    def __init__(self, motion, timeout=1):
+        self.motion = motion
+        self.timeout = timeout
+        self._lines = collections.deque()
+        self._arrived = threading.Condition()
+
+    @property
+    def is_open(self):
+        return self.motion.is_alive()
+
+    @property
+    def in_waiting(self):
+        with self._arrived:
+            return sum(len(line) for line in self._lines)
+
+    def readline(self):
+        with self._arrived:
+            self._arrived.wait_for(lambda: self._lines, timeout=self.timeout)
+            return self._lines.popleft() if self._lines else b""
+
+    def write(self, data):
+        if not self.is_open:
+            raise serial.SerialException("Motion process is not running")
+        self.motion._send(("write", data))
+        return len(data)
+
+    def reset_input_buffer(self):
+        with self._arrived:
+            self._lines.clear()
+
+    def close(self):
+        self.motion.close()
+
+    def _deliver(self, line):
+        with self._arrived:
+            self._lines.append(line)
+            self._arrived.notify_all()
+
+
+class MotionProcess:
+    """Starts the motion process for one arm port and talks to it over a pipe.
+
+    realtime=True asks for SCHED_FIFO (Linux, needs CAP_SYS_NICE or root);
+    self.realtime says whether it was granted. With state_name the process
+    publishes every frame it sends to that shared_state.SharedState block.
+    Raises serial.SerialException if the port cannot be opened.
+    """
+
+    def __init__(self, port=None, baud=9600, realtime=False, simulate=False, state_name=None):
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._send_lock = threading.Lock()
+        self._streams = {}  # stream_id -> {"frames": deque of angles, "done": None/True/False}
+        self._stream_ids = itertools.count(1)
+        self._changed = threading.Condition()
+        self._process = multiprocessing.Process(
+            target=_motion_main, args=(child_conn, port, baud, realtime, simulate, state_name), daemon=True)
+        self._process.start()
+        child_conn.close()
+        if not self._conn.poll(MOTION_START_TIMEOUT):
+            self._process.terminate()
+            raise serial.SerialException("Motion process did not start")
+        status, detail = self._conn.recv()
+        if status == "error":
+            raise serial.SerialException(detail)
+        self.realtime = detail
+        self.port = MotionPort(self)
+        threading.Thread(target=self._receive_loop, daemon=True).start()
+
+    def is_alive(self):
+        return self._process.is_alive()
+
+    def play(self, schedule, duration):
+        """Queue a [(t, angles)] schedule lasting `duration` s; returns its stream id.
+
+        Streams queued while another is playing start exactly when it ends.
+        """
+        stream_id = next(self._stream_ids)
+        with self._changed:
+            self._streams[stream_id] = {"frames": collections.deque(), "done": None}
+        self._send(("play", stream_id, schedule, duration))
+        return stream_id
+
+    def wait(self, stream_id, on_frame=None, stop_flag=None, on_idle=None, poll_s=0.02):
+        """Block until a stream ends, calling on_frame(angles) for each frame sent.
+
+        on_idle() is called every poll_s, also while paused, so a GUI can
+        keep handling events. Setting stop_flag[0] stops the motion process.
+        Returns True if the stream played to the end, False if it was stopped.
+        """
+        stream = self._streams[stream_id]
+        stopping = False
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: stream["frames"] or stream["done"] is not None, timeout=poll_s)
+                frames = list(stream["frames"])
+                stream["frames"].clear()
+                done = stream["done"]
+            for angles in frames:
+                if on_frame:
+                    on_frame(angles)
+            if on_idle:
+                on_idle()
+            if done is not None:
+                with self._changed:
+                    del self._streams[stream_id]
+                return done
+            if stop_flag is not None and stop_flag[0] and not stopping:
+                self.stop()
+                stopping = True
+            if not self.is_alive():
+                return False
+
+    def set_override(self, factor):
+        """Play this much faster (or slower, below 1) than scheduled, from the next control tick."""
+        self._send(("override", factor))
+
+    def pause(self):
+        """Hold before the next frame; resume() continues from exactly that frame."""
+        self._send(("pause",))
+
+    def resume(self):
+        self._send(("resume",))
+
+    def stop(self):
+        """Abandon the playing stream and every queued one."""
+        self._send(("stop",))
+
+    def close(self):
+        if self.is_alive():
+            self._send(("close",))
+            self._process.join(1.0)
+
+    def _send(self, message):
+        with self._send_lock:
+            self._conn.send(message)
+
+    def _receive_loop(self):
+        while True:
+            try:
+                message = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            kind = message[0]
+            if kind == "line":
+                self.port._deliver(message[1])
+                continue
+            with self._changed:
+                stream = self._streams.get(message[1])
+                if stream is not None:
+                    if kind == "frame":
+                        stream["frames"].append(message[2])
+                    elif kind == "done":
+                        stream["done"] = message[2]
+                self._changed.notify_all()
+        # The process has gone; release anyone still waiting
+        with self._changed:
+            for stream in self._streams.values():
+                if stream["done"] is None:
+                    stream["done"] = False
+            self._changed.notify_all()
@@ -0,0 +1,246 @@
+"""Start automation scripts by tapping a part's NFC tag on the WAP32_NFC reader.
+
+For a card other than the last one it saw, the reader prints
+
+    PICC type: MIFARE 1KB
+    A new card has been detected.
+    The NUID tag is:
+    In hex:  DE AD BE EF
+    In dec:  222 173 190 239
+
+and for the same card again only "Card read previously.". Each tap is
+looked up in nfc_tags.json ({"DEADBEEF": "pick_place", ...}, next to the
+GUI's files) and the mapped script is queued on a JobQueue, so a tap during
+a run starts its script as soon as the run ends.
+
+    python nfc_dispatch.py --nfc-port COM5 --gantry-port COM4 --arm-port COM3
+    python nfc_dispatch.py --nfc-port - --simulate     # reader lines from stdin
+
+Exit codes as run_scripts.py.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+import serial
+
+from automation import (ARM_FRAME_RATE, ScriptRunner, read_arm_angles, read_arm_frame_rate, read_gantry_position,
+                        save_arm_pose)
+from clock import RealClock
+from job_queue import JobQueue, JobScheduler
+from run_scripts import (ARM_SEQ_FILE, AUTO_FILE, EXIT_BAD_INPUT, EXIT_INTERRUPTED, EXIT_NO_DEVICE, EXIT_OK,
+                         GANTRY_POS_FILE, load_json, open_devices)
+from trajectory_cache import TRAJECTORY_CACHE_DIR, TrajectoryCache
+
+NFC_TAG_FILE = "nfc_tags.json"
+NFC_DEBOUNCE_S = 2.0  # reads of the same tag closer together than this are one tap
+NFC_BAUD = 9600
+REPEAT_LINE = "Card read previously."
+
+
+def parse_uid(line):
+    """The UID of an "In hex:" line as upper-case hex without spaces, or None for any other line."""
+    line = line.strip()
+    if not line.startswith("In hex:"):
+        return None
+    digits = "".join(line[len("In hex:"):].split()).upper()
+    try:
+        int(digits, 16)
+    except ValueError:
+        return None
+    return digits
+
+
+def normalize_uid(uid):
+    """Tag map keys may be written "DE AD BE EF", "de:ad:be:ef" or "DEADBEEF"."""
+    return "".join(c for c in uid.upper() if c in "0123456789ABCDEF")
+
+
+class TagReader:
+    """Turns the reader's output lines into taps, one per card presented.
+
+    The reader only prints a UID for a card other than the last one; a
+    repeat of the last card is reported as REPEAT_LINE, so that line is
+    taken as another read of the last UID. Any read within `debounce`
+    seconds of the previous read of the same card is dropped, which covers
+    a tag held on the reader or bouncing at the edge of its field.
+    """
+
+    def __init__(self, debounce=NFC_DEBOUNCE_S, clock=None):
+        self.debounce = debounce
+        self.clock = clock or RealClock()
+        self.last_uid = None
+        self._last_read = {}  # uid -> time of its last read, tap or not
+
+    def feed(self, line):
+        """Take one line from the reader; returns a UID when it is a new tap, else None."""
+        uid = parse_uid(line)
+        if uid is None:
+            if line.strip() != REPEAT_LINE or self.last_uid is None:
+                return None
+            uid = self.last_uid
+        self.last_uid = uid
+        now = self.clock.time()
+        previous = self._last_read.get(uid)
+        self._last_read[uid] = now
+        if previous is not None and now - previous < self.debounce:
+            return None
+        return uid
+
+
+class TagDispatcher:
+    """Queues the script mapped to each tapped tag.
+
+    tags maps UIDs to script names and scripts holds the scripts
+    themselves; both are loaded once, so a tap costs a dict lookup and a
+    queue put. Raises ValueError for a tag mapped to a missing script.
+    """
+
+    def __init__(self, tags, scripts, queue, on_unknown=None):
+        self.tags = {normalize_uid(uid): name for uid, name in tags.items()}
+        missing = sorted(set(self.tags.values()) - set(scripts))
+        if missing:
+            raise ValueError(f"Tagged script(s) not found: {', '.join(missing)}")
+        self.scripts = scripts
+        self.queue = queue
+        self.on_unknown = on_unknown
+
+    def dispatch(self, uid):
+        """Queue the script for a tap; returns its Job, or None for a tag that isn't mapped."""
+        name = self.tags.get(uid)
+        if name is None:
+            if self.on_unknown:
+                self.on_unknown(uid)
+            return None
+        return self.queue.put(name, self.scripts[name])
+
+    def listen(self, lines, reader=None, on_job=None):
+        """Dispatch the taps in an iterable of reader lines (bytes or str) until it ends."""
+        reader = reader or TagReader()
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode(errors="replace")
+            uid = reader.feed(line)
+            if uid is None:
+                continue
+            job = self.dispatch(uid)
+            if job is not None and on_job:
+                on_job(job)
+
+
+def serial_lines(ser):
+    """Lines from a serial port until it fails; readline() returns as soon as a line is complete."""
+    while True:
+        try:
+            line = ser.readline()
+        except serial.SerialException:
+            return
+        if line:
+            yield line
+
+
+def prefetch_plans(runner, scripts, arm_speed_ms, sequential):
+    """Compile the arm plans of every tagged script up front, so no tap waits for a compile."""
+    for script in scripts:
+        for action in script:
+            if action["type"] == "arm_seq" and action["name"] in runner.arm_sequences:
+                runner.trajectory_cache.get(runner.arm_sequences[action["name"]], arm_speed_ms, sequential,
+                                            runner.calibration)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run automation scripts when their NFC tags are tapped.")
+    parser.add_argument("--nfc-port", required=True, help="serial port of the NFC reader, or - for stdin")
+    parser.add_argument("--gantry-port", default="COM4")
+    parser.add_argument("--arm-port", default="COM3")
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--gantry-speed", type=int, default=500)
+    parser.add_argument("--arm-speed", type=int, default=700, help="arm move time in ms")
+    parser.add_argument("--sequential", action="store_true", help="move one servo at a time")
+    parser.add_argument("--debounce", type=float, default=NFC_DEBOUNCE_S, help="seconds between taps of one tag")
+    parser.add_argument("--data-dir", default=".", help="directory holding the GUI's JSON files and " + NFC_TAG_FILE)
+    parser.add_argument("--simulate", action="store_true", help="run against the simulators in virtual time")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per event instead of text")
+    args = parser.parse_args(argv)
+
+    def report(event, **detail):
+        if args.json:
+            print(json.dumps({"event": event, **detail}), flush=True)
+        else:
+            print(f"{event}: " + ", ".join(f"{key} {value}" for key, value in detail.items()), flush=True)
+
+    jobs = JobQueue()
+    try:
+        tags = load_json(os.path.join(args.data_dir, NFC_TAG_FILE))
+        if not tags:
+            raise ValueError(f"No tags mapped in {NFC_TAG_FILE}")
+        scripts = load_json(os.path.join(args.data_dir, AUTO_FILE))
+        gantry_positions = load_json(os.path.join(args.data_dir, GANTRY_POS_FILE))
+        arm_sequences = load_json(os.path.join(args.data_dir, ARM_SEQ_FILE))
+        dispatcher = TagDispatcher(tags, scripts, jobs, on_unknown=lambda uid: report("unknown tag", uid=uid))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_BAD_INPUT
+
+    try:
+        gantry_ser, arm_ser, clock = open_devices(args)
+        nfc_ser = None if args.nfc_port == "-" else serial.Serial(args.nfc_port, NFC_BAUD, timeout=1)
+    except serial.SerialException as e:
+        print(f"Error: failed to connect: {e}", file=sys.stderr)
+        return EXIT_NO_DEVICE
+
+    stop_flag = [False]
+    runner = ScriptRunner(
+        gantry_ser, arm_ser, gantry_positions, arm_sequences, clock=clock,
+        arm_angles=read_arm_angles(arm_ser, clock), gantry_start=read_gantry_position(gantry_ser, clock),
+        stop_flag=stop_flag, arm_frame_rate=read_arm_frame_rate(arm_ser, clock) or ARM_FRAME_RATE,
+        trajectory_cache=TrajectoryCache(cache_dir=os.path.join(args.data_dir, TRAJECTORY_CACHE_DIR))
+    )
+    prefetch_plans(runner, [scripts[name] for name in set(dispatcher.tags.values())], args.arm_speed, args.sequential)
+
+    def on_job(job):
+        if job.state in ("done", "failed"):
+            report(f"job {job.state}", id=job.id, script=job.name,
+                   cycle_time=round(job.runs[-1], 3) if job.runs else None, error=job.error)
+
+    scheduler = JobScheduler(runner, jobs, args.gantry_speed, args.arm_speed, args.sequential, on_job=on_job)
+    lines = sys.stdin if nfc_ser is None else serial_lines(nfc_ser)
+    listener = threading.Thread(target=dispatcher.listen, args=(lines, TagReader(args.debounce)),
+                                kwargs={"on_job": lambda job: report("tap", id=job.id, script=job.name)}, daemon=True)
+    listener.start()
+    report("ready", tags=len(dispatcher.tags))
+
+    exit_code = EXIT_OK
+    try:
+        while True:
+            # Wake on every tap; the timeout only keeps Ctrl+C responsive on Windows
+            if jobs.wait(1.0):
+                ran = scheduler.run_pending()
+                if any(job.state == "failed" for job in ran):
+                    # The runner's idea of the pose may be wrong after an error
+                    runner.arm_angles = read_arm_angles(arm_ser, clock) or runner.arm_angles
+                    runner.gantry_pos = read_gantry_position(gantry_ser, clock) or runner.gantry_pos
+            elif not listener.is_alive() and not len(jobs):
+                # End of stdin, or the reader's port went away
+                if nfc_ser is not None:
+                    print("Error: lost the NFC reader", file=sys.stderr)
+                    exit_code = EXIT_NO_DEVICE
+                break
+    except KeyboardInterrupt:
+        stop_flag[0] = True
+        gantry_ser.write(b"!")  # realtime halt
+        print("Interrupted", file=sys.stderr)
+        exit_code = EXIT_INTERRUPTED
+    finally:
+        save_arm_pose(arm_ser)
+        gantry_ser.close()
+        arm_ser.close()
+        if nfc_ser is not None:
+            nfc_ser.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import threading
+
+import numpy as np
+
+from clock import RealClock
+
+RECORD_RATE_HZ = 50
+RECORD_CHUNK_ROWS = 500      # rows per disk write (10 s at 50 Hz)
+RECORD_BUFFER_CHUNKS = 8     # ring capacity in chunks; the writer may fall this far behind
+
+
+class Recorder:
+    """Samples a source at a fixed rate and streams the samples to a CSV file.
+
+    The sampler thread stores each sample into a preallocated ring buffer,
+    and a writer thread appends full chunks to disk. Memory use is fixed
+    however long the recording runs. If the disk stalls for longer than the
+    ring holds, the oldest unwritten samples are dropped and counted, and
+    the sampler itself never blocks.
+    """
+
+    def __init__(self, path, channels, source, rate_hz=RECORD_RATE_HZ, chunk_rows=RECORD_CHUNK_ROWS,
+                 chunks=RECORD_BUFFER_CHUNKS, clock=None):
+        self.path = path
+        self.channels = list(channels)
+        self.source = source  # callable returning one value per channel
+        self.period = 1.0 / rate_hz
+        self.chunk_rows = chunk_rows
+        self.clock = clock or RealClock()
+        self.buffer = np.empty((chunk_rows * chunks, 1 + len(self.channels)))
+        self.sampled = 0   # rows ever sampled
+        self.written = 0   # rows ever written or dropped
+        self.dropped = 0
+        self.start_time = None
+        self._running = False
+        self._finishing = False  # set once the sampler has stopped; writer drains and exits
+        self._lock = threading.Lock()
+        self._chunk_ready = threading.Condition(self._lock)
+        self._threads = []
+
+    def start(self):
+        self._file = open(self.path, "w")
+        self._file.write(",".join(["t"] + self.channels) + "\n")
+        self.start_time = self.clock.time()
+        self._running = True
+        self._finishing = False
+        self._threads = [threading.Thread(target=self._sample_loop, daemon=True),
+                         threading.Thread(target=self._write_loop, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop sampling, write everything still buffered and return the stats."""
+        self._running = False
+        self._threads[0].join()
+        with self._lock:
+            self._finishing = True
+            self._chunk_ready.notify()
+        self._threads[1].join()
+        self._file.close()
+        return self.stats()
+
+    def stats(self):
+        return {"rows": self.sampled - self.dropped, "dropped": self.dropped,
+                "duration": self.sampled * self.period, "path": self.path}
+
+    def _sample_loop(self):
+        capacity = len(self.buffer)
+        deadline = self.start_time
+        while self._running:
+            with self._lock:
+                if self.sampled - self.written >= capacity:
+                    # Writer fell a whole ring behind; give up its oldest row
+                    # before its slot is reused, so the writer never copies it
+                    self.written += 1
+                    self.dropped += 1
+            row = self.buffer[self.sampled % capacity]
+            row[0] = self.clock.time() - self.start_time
+            row[1:] = self.source()
+            with self._lock:
+                self.sampled += 1
+                if self.sampled - self.written >= self.chunk_rows:
+                    self._chunk_ready.notify()
+            # Sleep to the next slot on a fixed grid so the rate doesn't drift
+            deadline += self.period
+            self.clock.sleep(deadline - self.clock.time())
+
+    def _write_loop(self):
+        capacity = len(self.buffer)
+        while True:
+            with self._lock:
+                while not self._finishing and self.sampled - self.written < self.chunk_rows:
+                    self._chunk_ready.wait()
+                finished = self._finishing
+                start = self.written
+                count = self.sampled - start if finished else self.chunk_rows
+                # Copy out under the lock (a quick memcpy) and format outside it
+                rows = self.buffer[np.arange(start, start + count) % capacity]
+                self.written = start + count
+            if count:
+                np.savetxt(self._file, rows, delimiter=",", fmt="%.10g")
+                self._file.flush()
+            if finished:
+                return
+
+
+def load_recording(path):
+    """Read a recording back as (times, values, channels)."""
+    with open(path, "r") as f:
+        channels = f.readline().strip().split(",")[1:]
+    data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+    return data[:, 0], data[:, 1:], channels
@@ -0,0 +1,82 @@
+import threading
+import time
+import tkinter as tk
+
+RENDER_FPS = 30
+
+
+class DisplayRenderer:
+    """Batches widget updates and applies them at most once per display frame.
+
+    Callers record what a widget should show with set(); nothing touches Tk
+    until the next frame, when all pending values are applied together. set()
+    only stores the value, so it is safe from worker threads. Scales invoke
+    their command when their value is changed programmatically, so the value
+    a flush moves a Scale to is remembered until its callback arrives, and
+    is_echo() lets that one callback be ignored instead of sending the value
+    to the device again. Any other callback value, such as a drag by the
+    user, is not an echo.
+    """
+
+    def __init__(self, root, fps=RENDER_FPS):
+        self.root = root
+        self.frame_s = 1.0 / fps
+        self._pending = {}  # widget -> value to show
+        self._echo = {}     # widget -> value its Scale callback will report for the last flush
+        self._lock = threading.Lock()
+        self._last_frame = 0.0
+        self.root.after(int(self.frame_s * 1000), self._tick)
+
+    def set(self, widget, value):
+        """Show value on a Scale, Label (as its text) or Tk variable at the next frame."""
+        with self._lock:
+            self._pending[widget] = value
+
+    def get(self, widget):
+        """The value a widget is about to show, falling back to what it shows now."""
+        with self._lock:
+            if widget in self._pending:
+                return self._pending[widget]
+        return widget.get()
+
+    def is_echo(self, widget, value):
+        """True if a Scale callback reports the value a flush just moved it to.
+
+        The expected value is used up by the first callback that follows, echo or not.
+        """
+        expected = self._echo.pop(widget, None)
+        try:
+            return expected is not None and float(value) == expected
+        except (TypeError, ValueError):
+            return False
+
+    def flush(self):
+        """Apply all pending values now."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for widget, value in pending.items():
+            if isinstance(widget, tk.Label):
+                widget.config(text=value)
+                continue
+            before = float(widget.get())
+            widget.set(value)
+            # Scales only call back when the value changes; remember it after rounding to the resolution
+            after = float(widget.get())
+            if after != before:
+                self._echo[widget] = after
+        self._last_frame = time.time()
+
+    def pump(self):
+        """From a blocking motion loop: flush and process events if a frame is due.
+
+        Returns without touching Tk between frames, so loop timing does not
+        depend on redraw cost.
+        """
+        if time.time() - self._last_frame >= self.frame_s:
+            self.flush()
+            self.root.update()
+
+    def _tick(self):
+        if self._pending:
+            self.flush()
+        self.root.after(int(self.frame_s * 1000), self._tick)
@@ -0,0 +1,149 @@
+from itertools import permutations
+
+from simulator import gantry_move_time
+
+EXACT_LIMIT = 8  # visits up to this count are ordered by exhaustive search
+
+
+def travel_time_matrix(points, move_time=gantry_move_time):
+    return [[move_time(a, b) if i != j else 0.0 for j, b in enumerate(points)] for i, a in enumerate(points)]
+
+
+def route_time(order, points, start, end=None, move_time=gantry_move_time):
+    """Travel time for visiting points in order from start (and on to end, if given)."""
+    stops = [start] + [points[i] for i in order] + ([end] if end is not None else [])
+    return sum(move_time(a, b) for a, b in zip(stops, stops[1:]))
+
+
+def _feasible(route, precedence):
+    position = {node: k for k, node in enumerate(route)}
+    return all(position[a] < position[b] for a, b in precedence)
+
+
+def optimize_order(points, start, end=None, precedence=(), move_time=gantry_move_time, exact_limit=EXACT_LIMIT):
+    """Order gantry visits to minimize total travel time.
+
+    points are (x, y) GUI step positions, start the current position and end
+    an optional fixed position to finish at. precedence holds (a, b) index
+    pairs meaning visit a must come before visit b. Small inputs are solved
+    exactly; larger ones use nearest neighbour followed by 2-opt and Or-opt.
+    Returns (order, travel_time).
+    """
+    n = len(points)
+    if n == 0:
+        return [], 0.0
+    S, E = n, n + 1
+    nodes = list(points) + [start, end if end is not None else start]
+    D = travel_time_matrix(nodes, move_time)
+    if end is None:
+        for row in D:
+            row[E] = 0.0
+    precedence = [tuple(p) for p in precedence]
+
+    def cost(route):
+        return sum(D[a][b] for a, b in zip(route, route[1:]))
+
+    if n <= exact_limit:
+        best = None
+        for perm in permutations(range(n)):
+            route = [S] + list(perm) + [E]
+            if precedence and not _feasible(perm, precedence):
+                continue
+            c = cost(route)
+            if best is None or c < best[0]:
+                best = (c, list(perm))
+        if best is None:
+            raise ValueError("Ordering constraints cannot be satisfied")
+        return best[1], best[0]
+
+    # Nearest neighbour among visits whose predecessors are already done
+    route = [S]
+    remaining = set(range(n))
+    while remaining:
+        ready = [j for j in remaining if all(a not in remaining for a, b in precedence if b == j)]
+        if not ready:
+            raise ValueError("Ordering constraints cannot be satisfied")
+        j = min(ready, key=lambda k: D[route[-1]][k])
+        route.append(j)
+        remaining.remove(j)
+    route.append(E)
+
+    improved = True
+    while improved:
+        improved = False
+        # 2-opt: reverse route[i..k]
+        for i in range(1, len(route) - 2):
+            for k in range(i + 1, len(route) - 1):
+                a, b, c, d = route[i - 1], route[i], route[k], route[k + 1]
+                delta = D[a][c] + D[b][d] - D[a][b] - D[c][d]
+                if delta < -1e-9:
+                    candidate = route[:i] + route[i:k + 1][::-1] + route[k + 1:]
+                    if not precedence or _feasible(candidate, precedence):
+                        route = candidate
+                        improved = True
+        # Or-opt: move a run of 1-3 visits elsewhere
+        for length in (1, 2, 3):
+            for i in range(1, len(route) - length):
+                segment = route[i:i + length]
+                prev, nxt = route[i - 1], route[i + length]
+                removed = D[prev][segment[0]] + D[segment[-1]][nxt] - D[prev][nxt]
+                rest = route[:i] + route[i + length:]
+                for j in range(len(rest) - 1):
+                    if j == i - 1:
+                        continue
+                    added = D[rest[j]][segment[0]] + D[segment[-1]][rest[j + 1]] - D[rest[j]][rest[j + 1]]
+                    if added - removed < -1e-9:
+                        candidate = rest[:j + 1] + segment + rest[j + 1:]
+                        if not precedence or _feasible(candidate, precedence):
+                            route = candidate
+                            improved = True
+                            break
+                if improved:
+                    break
+            if improved:
+                break
+    return route[1:-1], cost(route)
+
+
+def optimize_script(script, gantry_positions, start=(0, 0), precedence=()):
+    """Reorder the gantry visits of an automation script to cut travel time.
+
+    Each "gantry_pos" action and the actions that follow it up to the next
+    gantry move form one visit and move together. Visits marked "fixed" keep
+    their slot and split the script into independently optimized segments;
+    precedence lists (a, b) pairs of visit indices that must keep their order.
+    Returns (new_script, travel_time_before, travel_time_after).
+    """
+    head, visits = [], []
+    for action in script:
+        if action["type"] == "gantry_pos":
+            if action["name"] not in gantry_positions:
+                raise ValueError(f"Gantry position '{action['name']}' not found")
+            visits.append([action])
+        elif visits:
+            visits[-1].append(action)
+        else:
+            head.append(action)
+    points = [tuple(gantry_positions[v[0]["name"]]) for v in visits]
+    before = route_time(range(len(visits)), points, start)
+
+    order = []
+    segment = []
+    position = start
+    for index in range(len(visits) + 1):
+        if index < len(visits) and not visits[index][0].get("fixed"):
+            segment.append(index)
+            continue
+        end = points[index] if index < len(visits) else None
+        local_precedence = [(segment.index(a), segment.index(b)) for a, b in precedence if a in segment and b in segment]
+        local_order, _ = optimize_order([points[i] for i in segment], position, end, local_precedence)
+        order.extend(segment[i] for i in local_order)
+        if index < len(visits):
+            order.append(index)
+            position = points[index]
+        segment = []
+    after = route_time(order, points, start)
+    new_script = list(head)
+    for index in order:
+        new_script.extend(visits[index])
+    return new_script, before, after
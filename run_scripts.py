@@ -0,0 +1,181 @@
+"""Run saved automation scripts and sequences without the GUI.
+
+Examples:
+    python run_scripts.py -s pick_place -n 20
+    python run_scripts.py -s pick_place --arm-seq wave --gantry-port /dev/ttyUSB0 --arm-port /dev/ttyUSB1
+    python run_scripts.py -s pick_place --simulate --json
+
+Exit codes: 0 all runs completed, 1 a run failed or a gantry move was not
+confirmed, 2 bad arguments or data files, 3 the devices could not be opened,
+130 interrupted.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import serial
+
+from automation import (ARM_FRAME_RATE, ScriptRunner, read_arm_angles, read_arm_frame_rate, read_gantry_position,
+                        save_arm_pose)
+from clock import RealClock, VirtualClock
+from servo_calibration import CALIBRATION_FILE, compile_table, load_profiles, upload_table
+from simulator import SimulatedArm, SimulatedGantry
+from trajectory_cache import TRAJECTORY_CACHE_DIR, TrajectoryCache, table_key
+
+EXIT_OK = 0
+EXIT_RUN_FAILED = 1
+EXIT_BAD_INPUT = 2
+EXIT_NO_DEVICE = 3
+EXIT_INTERRUPTED = 130
+
+# Same files the GUI reads, relative to --data-dir
+GANTRY_POS_FILE = "gantry_positions.json"
+GANTRY_SEQ_FILE = "gantry_sequences.json"
+ARM_SEQ_FILE = "arm_sequences.json"
+AUTO_FILE = "automation_scripts.json"
+
+
+def load_json(file_path):
+    """Read a GUI data file; a missing or empty file is an empty dict."""
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, "r") as f:
+        content = f.read().strip()
+        return json.loads(content) if content else {}
+
+
+def build_jobs(args, scripts, gantry_positions, gantry_sequences, arm_sequences):
+    """Turn the requested names into (label, script) pairs.
+
+    Sequences become one-off scripts: an arm sequence is a single arm_seq
+    action, and each step of a gantry sequence becomes a gantry_pos action on
+    a generated position name so it runs through the same pipelined path.
+    """
+    jobs = []
+    for name in args.script:
+        if name not in scripts:
+            raise ValueError(f"Script '{name}' not found")
+        jobs.append((f"script '{name}'", scripts[name]))
+    for name in args.arm_seq:
+        if name not in arm_sequences:
+            raise ValueError(f"Arm sequence '{name}' not found")
+        jobs.append((f"arm sequence '{name}'", [{"type": "arm_seq", "name": name}]))
+    for name in args.gantry_seq:
+        if name not in gantry_sequences:
+            raise ValueError(f"Gantry sequence '{name}' not found")
+        script = []
+        for i, step in enumerate(gantry_sequences[name]):
+            step_name = f"{name}[{i + 1}]"
+            gantry_positions[step_name] = step
+            script.append({"type": "gantry_pos", "name": step_name})
+        jobs.append((f"gantry sequence '{name}'", script))
+    return jobs
+
+
+def open_devices(args):
+    """Return (gantry, arm, clock), either real ports or the simulators."""
+    if args.simulate:
+        clock = VirtualClock()
+        return SimulatedGantry(clock), SimulatedArm(clock), clock
+    gantry_ser = serial.Serial(args.gantry_port, args.baud, timeout=1)
+    arm_ser = serial.Serial(args.arm_port, args.baud, timeout=1)
+    time.sleep(2)  # Wait for the Arduinos to reset
+    return gantry_ser, arm_ser, RealClock()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run saved gantry/arm automation without the GUI.")
+    parser.add_argument("-s", "--script", action="append", default=[], help="automation script name (repeatable)")
+    parser.add_argument("--arm-seq", action="append", default=[], help="arm sequence name (repeatable)")
+    parser.add_argument("--gantry-seq", action="append", default=[], help="gantry sequence name (repeatable)")
+    parser.add_argument("-n", "--repeat", type=int, default=1, help="times to run the whole job list")
+    parser.add_argument("--gantry-port", default="COM4")
+    parser.add_argument("--arm-port", default="COM3")
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--gantry-speed", type=int, default=500)
+    parser.add_argument("--arm-speed", type=int, default=700, help="arm move time in ms")
+    parser.add_argument("--sequential", action="store_true", help="move one servo at a time")
+    parser.add_argument("--data-dir", default=".", help="directory holding the GUI's JSON files")
+    parser.add_argument("--calibration", help="servo calibration profile to upload before running")
+    parser.add_argument("--simulate", action="store_true", help="run against the simulators in virtual time")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per run instead of text")
+    args = parser.parse_args(argv)
+
+    if not (args.script or args.arm_seq or args.gantry_seq):
+        parser.error("nothing to run: give --script, --arm-seq or --gantry-seq")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    try:
+        scripts = load_json(os.path.join(args.data_dir, AUTO_FILE))
+        gantry_positions = load_json(os.path.join(args.data_dir, GANTRY_POS_FILE))
+        gantry_sequences = load_json(os.path.join(args.data_dir, GANTRY_SEQ_FILE))
+        arm_sequences = load_json(os.path.join(args.data_dir, ARM_SEQ_FILE))
+        jobs = build_jobs(args, scripts, gantry_positions, gantry_sequences, arm_sequences)
+        table = None
+        if args.calibration:
+            profiles = load_profiles(os.path.join(args.data_dir, CALIBRATION_FILE))
+            if args.calibration not in profiles:
+                raise ValueError(f"Calibration '{args.calibration}' not found")
+            table = compile_table(profiles[args.calibration])
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_BAD_INPUT
+
+    try:
+        gantry_ser, arm_ser, clock = open_devices(args)
+    except serial.SerialException as e:
+        print(f"Error: failed to connect: {e}", file=sys.stderr)
+        return EXIT_NO_DEVICE
+    if table is not None:
+        try:
+            upload_table(arm_ser, table, clock)
+        except (ValueError, serial.SerialException) as e:
+            print(f"Error: calibration upload failed: {e}", file=sys.stderr)
+            return EXIT_NO_DEVICE
+
+    stop_flag = [False]
+    runner = ScriptRunner(
+        gantry_ser, arm_ser, gantry_positions, arm_sequences, clock=clock,
+        arm_angles=read_arm_angles(arm_ser, clock), gantry_start=read_gantry_position(gantry_ser, clock),
+        stop_flag=stop_flag, arm_frame_rate=read_arm_frame_rate(arm_ser, clock) or ARM_FRAME_RATE,
+        trajectory_cache=TrajectoryCache(cache_dir=os.path.join(args.data_dir, TRAJECTORY_CACHE_DIR)),
+        calibration=table_key(table)
+    )
+    exit_code = EXIT_OK
+    times = []
+    try:
+        for run in range(1, args.repeat + 1):
+            for label, script in jobs:
+                try:
+                    report, error = runner.run(script, args.gantry_speed, args.arm_speed, args.sequential), None
+                except (ValueError, serial.SerialException) as e:
+                    report, error = {"cycle_time": clock.time() - runner.start_time}, str(e)
+                if error:
+                    exit_code = EXIT_RUN_FAILED
+                times.append(report["cycle_time"])
+                if args.json:
+                    print(json.dumps({"run": run, "job": label, "cycle_time": round(report["cycle_time"], 3),
+                                      "ok": error is None, "error": error}), flush=True)
+                else:
+                    print(f"run {run}/{args.repeat} {label}: {report['cycle_time']:.2f} s "
+                          f"{'ok' if error is None else 'FAILED: ' + error}", flush=True)
+    except KeyboardInterrupt:
+        stop_flag[0] = True
+        gantry_ser.write(b"!")  # realtime halt
+        print("Interrupted", file=sys.stderr)
+        exit_code = EXIT_INTERRUPTED
+    finally:
+        save_arm_pose(arm_ser)
+        gantry_ser.close()
+        arm_ser.close()
+
+    if times and not args.json:
+        print(f"{len(times)} runs: min {min(times):.2f} s, mean {sum(times) / len(times):.2f} s, max {max(times):.2f} s")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import json
+import os
+
+import numpy as np
+
+from arm_kinematics import ARM_JOINT_LIMIT, GUI_TO_JOINT_DEG
+from clock import RealClock
+
+CALIBRATION_FILE = "servo_calibration.json"  # kept next to arm_positions.json
+SERVO_PULSE_MIN = 150    # SERVOMIN in PS2_Arm_Ardiuno.ino
+SERVO_PULSE_MAX = 600    # SERVOMAX
+SERVO_RANGE_DEG = 180
+TABLE_MIN_ANGLE = -ARM_JOINT_LIMIT
+TABLE_STEPS = 2 * ARM_JOINT_LIMIT + 1   # one entry per whole GUI degree, CAL_STEPS in the firmware
+UPLOAD_CHUNK = 8                        # pulses per CAL line; each chunk is one EEPROM burst on the Uno
+CAL_REPLY_TIMEOUT = 1.0
+
+
+def default_joint():
+    """Calibration that reproduces the firmware's uncalibrated map() chain."""
+    return {"offset": 0.0, "gain": 1.0, "min": -ARM_JOINT_LIMIT, "max": ARM_JOINT_LIMIT, "reversed": False}
+
+
+def default_profile():
+    return [default_joint() for _ in range(6)]
+
+
+def compile_table(profile):
+    """Compile a profile into a (6, TABLE_STEPS) uint16 table of PCA9685 pulse lengths.
+
+    Entry [j, a - TABLE_MIN_ANGLE] is the pulse for GUI angle a on joint j:
+    the angle is clamped to the joint's limits, scaled by gain, mirrored if
+    reversed, shifted by offset (servo degrees) and converted to a pulse.
+    Truncation matches Arduino map(), so the default profile reproduces the
+    firmware's uncalibrated output exactly.
+    """
+    if len(profile) != 6:
+        raise ValueError("A calibration profile needs 6 joints")
+    angles = np.arange(TABLE_MIN_ANGLE, TABLE_MIN_ANGLE + TABLE_STEPS, dtype=float)
+    table = np.empty((6, TABLE_STEPS), dtype=np.uint16)
+    for j, joint in enumerate(profile):
+        low, high = float(joint["min"]), float(joint["max"])
+        if low > high:
+            raise ValueError(f"Joint {j}: min {low} is above max {high}")
+        sign = -1.0 if joint["reversed"] else 1.0
+        servo = SERVO_RANGE_DEG / 2 + sign * float(joint["gain"]) * GUI_TO_JOINT_DEG * np.clip(angles, low, high) + float(joint["offset"])
+        servo = np.clip(servo, 0, SERVO_RANGE_DEG)
+        pulses = SERVO_PULSE_MIN + np.floor(servo * (SERVO_PULSE_MAX - SERVO_PULSE_MIN) / SERVO_RANGE_DEG + 1e-9)
+        table[j] = pulses.astype(np.uint16)
+    return table
+
+
+def table_commands(table, chunk=UPLOAD_CHUNK):
+    """Yield the CAL lines that upload a table, ending with CAL,END which activates it."""
+    for j, row in enumerate(table):
+        for start in range(0, len(row), chunk):
+            yield f"CAL,{j},{start}," + ",".join(str(int(p)) for p in row[start:start + chunk])
+    yield "CAL,END"
+
+
+def _send_cal(ser, line, clock, timeout):
+    ser.write((line + "\n").encode())
+    start_time = clock.time()
+    while clock.time() - start_time < timeout:
+        response = ser.readline().decode().strip()
+        if response == "CAL OK":
+            return
+        if response.startswith("CAL ERR"):
+            raise ValueError(f"Arm rejected '{line}': {response}")
+    raise ValueError(f"No reply from the arm to '{line}'")
+
+
+def upload_table(ser, table, clock=None, timeout=CAL_REPLY_TIMEOUT):
+    """Write a compiled table to the arm's EEPROM, one acknowledged line at a time.
+
+    The firmware stops using its old table on the first chunk and switches
+    to the new one on CAL,END, so an interrupted upload falls back to the
+    uncalibrated mapping rather than a half-written table.
+    """
+    clock = clock or RealClock()
+    ser.reset_input_buffer()
+    for line in table_commands(table):
+        _send_cal(ser, line, clock, timeout)
+
+
+def clear_table(ser, clock=None, timeout=CAL_REPLY_TIMEOUT):
+    """Return the arm to the uncalibrated SERVOMIN/SERVOMAX mapping."""
+    _send_cal(ser, "CAL,CLEAR", clock or RealClock(), timeout)
+
+
+def load_profiles(file_path=CALIBRATION_FILE):
+    """Profiles by name; a missing file has none."""
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, "r") as f:
+        content = f.read().strip()
+        return json.loads(content) if content else {}
+
+
+def save_profiles(profiles, file_path=CALIBRATION_FILE):
+    with open(file_path, "w") as f:
+        json.dump(profiles, f)
@@ -0,0 +1,159 @@
+"""Live device state in a fixed-layout shared-memory block.
+
+Device workers (the GUI's gantry poller, the motion process) write their
+section of the block and any number of readers in any process read it
+without locks, pipes or copies of anything but the few values they ask
+for. Each section has its own sequence counter (a seqlock) and exactly one
+writer: the writer makes the counter odd, updates the values and makes it
+even again, and a reader retries until it sees the same even counter
+before and after its read.
+
+    python shared_state.py          # print the live state a few times a second
+    python shared_state.py --remove # remove a block left behind by a crashed writer
+"""
+import argparse
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+STATE_NAME = "gantry_arm_state"
+STATE_READ_TIMEOUT = 0.5  # a writer holds a section for microseconds, unless it is descheduled mid-update
+
+STATUS_OFFLINE = 0
+STATUS_IDLE = 1
+STATUS_MOVING = 2
+STATUS_ERROR = 3
+STATUS_NAMES = {STATUS_OFFLINE: "offline", STATUS_IDLE: "idle", STATUS_MOVING: "moving", STATUS_ERROR: "error"}
+
+# One 64-byte cache line per gantry section and two for the arm, so the two
+# writers never share a line
+STATE_DTYPE = np.dtype({
+    "names": ["gantry_seq", "gantry", "gantry_status", "gantry_time",
+              "arm_seq", "arm", "arm_status", "arm_time"],
+    "formats": [np.uint64, (np.float64, 2), np.int64, np.float64,
+                np.uint64, (np.float64, 6), np.int64, np.float64],
+    "offsets": [0, 8, 24, 32, 64, 72, 120, 128],
+    "itemsize": 192,
+})
+SECTIONS = {"gantry": ("gantry_seq", "gantry", "gantry_status", "gantry_time"),
+            "arm": ("arm_seq", "arm", "arm_status", "arm_time")}
+
+
+class SharedState:
+    """A view of the state block. create=True makes the block; otherwise attach to it.
+
+    Raises FileExistsError when creating and the block already exists (another
+    live writer, or one that crashed: remove it with python shared_state.py
+    --remove), and FileNotFoundError when attaching and no process has created it.
+    """
+
+    def __init__(self, name=STATE_NAME, create=False):
+        self.created = create
+        if create:
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=STATE_DTYPE.itemsize)
+            except FileExistsError:
+                raise FileExistsError(f"shared state {name!r} already exists; is another instance running?") from None
+        else:
+            # Attaching on POSIX registers the block with this process's
+            # resource tracker, which would unlink it when this process exits.
+            # Undo that unless the tracker is the creator's (a forked worker).
+            own_tracker = getattr(resource_tracker._resource_tracker, "_fd", None) is None
+            self._shm = shared_memory.SharedMemory(name=name)
+            if own_tracker and os.name == "posix":
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+        self._block = np.ndarray((), dtype=STATE_DTYPE, buffer=self._shm.buf)
+        if create:
+            self._block[()] = np.zeros((), dtype=STATE_DTYPE)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def write_gantry(self, x, y, status=STATUS_IDLE, t=None):
+        self._write("gantry", (x, y), status, t)
+
+    def write_arm(self, angles, status=STATUS_IDLE, t=None):
+        self._write("arm", angles, status, t)
+
+    def read_gantry(self):
+        """(x, y, status, t) of the last gantry update."""
+        values, status, t = self._read("gantry")
+        return int(values[0]), int(values[1]), status, t
+
+    def read_arm(self):
+        """(angles, status, t) of the last arm update."""
+        values, status, t = self._read("arm")
+        return [int(a) for a in values], status, t
+
+    def read(self):
+        x, y, gantry_status, gantry_time = self.read_gantry()
+        angles, arm_status, arm_time = self.read_arm()
+        return {"gantry": [x, y], "gantry_status": STATUS_NAMES[gantry_status], "gantry_time": gantry_time,
+                "arm": angles, "arm_status": STATUS_NAMES[arm_status], "arm_time": arm_time}
+
+    def close(self):
+        self._block = None
+        self._shm.close()
+        if self.created:
+            self._shm.unlink()
+
+    def _write(self, section, values, status, t):
+        seq, values_field, status_field, time_field = SECTIONS[section]
+        block = self._block
+        block[seq] += 1  # odd: readers of this section retry
+        block[values_field] = values
+        block[status_field] = status
+        block[time_field] = time.time() if t is None else t
+        block[seq] += 1
+
+    def _read(self, section):
+        seq, values_field, status_field, time_field = SECTIONS[section]
+        block = self._block
+        deadline = time.monotonic() + STATE_READ_TIMEOUT
+        while time.monotonic() < deadline:
+            before = int(block[seq])
+            if not before % 2:
+                values = block[values_field].copy()
+                status = int(block[status_field])
+                t = float(block[time_field])
+                if int(block[seq]) == before:
+                    return values, status, t
+            time.sleep(0)  # let a preempted writer finish
+        raise TimeoutError(f"{section} state is stuck mid-update; its writer may have died")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the live gantry and arm state.")
+    parser.add_argument("--name", default=STATE_NAME)
+    parser.add_argument("--rate", type=float, default=5.0, help="lines per second")
+    parser.add_argument("--remove", action="store_true", help="remove a block left behind by a crashed writer")
+    args = parser.parse_args(argv)
+    if args.remove:
+        try:
+            block = shared_memory.SharedMemory(name=args.name)
+            block.close()
+            block.unlink()
+        except FileNotFoundError:
+            parser.exit(3, "Error: no live state to remove\n")
+        return
+    try:
+        state = SharedState(args.name)
+    except FileNotFoundError:
+        parser.exit(3, "Error: no live state; start the GUI first\n")
+    try:
+        while True:
+            live = state.read()
+            print(f"gantry X:{live['gantry'][0]} Y:{live['gantry'][1]} {live['gantry_status']}  "
+                  f"arm {live['arm']} {live['arm_status']}", flush=True)
+            time.sleep(1.0 / args.rate)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state.close()
+
+
+if __name__ == "__main__":
+    main()
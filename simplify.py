@@ -0,0 +1,67 @@
+import numpy as np
+
+ARM_SIMPLIFY_TOLERANCE = 1.0      # GUI degrees
+GANTRY_SIMPLIFY_TOLERANCE = 20.0  # host steps (about 1 mm)
+
+
+def segment_distances(points, start, end):
+    """Distance of every point from the segment start-end, all at once.
+
+    Works in any number of dimensions, so a row can be six joint angles or
+    an X/Y gantry position.
+    """
+    direction = end - start
+    length_sq = float(direction @ direction)
+    if length_sq == 0.0:
+        return np.linalg.norm(points - start, axis=1)
+    u = np.clip((points - start) @ direction / length_sq, 0.0, 1.0)
+    return np.linalg.norm(points - (start + u[:, None] * direction), axis=1)
+
+
+def rdp_mask(points, tolerance):
+    """Ramer–Douglas–Peucker: mask of the waypoints to keep.
+
+    Keeps both ends, then splits each segment at its farthest point while
+    that point deviates from the segment by more than `tolerance`. Every
+    dropped point lies within `tolerance` of the straight segment between
+    the kept points around it; the result is not guaranteed to be the
+    smallest such set, only close to it in practice.
+    Playback moves linearly between waypoints (in joint space for the arm),
+    so that is the largest deviation the simplified sequence can introduce.
+    Uses an explicit stack, and each segment is checked with one vectorized
+    distance computation.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = segment_distances(points[first + 1:last], points[first], points[last])
+        worst = int(np.argmax(distances))
+        if distances[worst] > tolerance:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def simplify_sequence(steps, tolerance):
+    """Return the waypoints of a sequence that RDP keeps, in their original form."""
+    if len(steps) < 3:
+        return [list(step) for step in steps]
+    keep = rdp_mask(steps, tolerance)
+    return [list(step) for step, kept in zip(steps, keep) if kept]
+
+
+def recording_steps(values, channels, wanted):
+    """Pick the `wanted` channels out of recorded rows as integer steps, skipping unset samples."""
+    columns = np.asarray(values)[:, [channels.index(name) for name in wanted]]
+    columns = columns[~np.isnan(columns).any(axis=1)]
+    return np.rint(columns).astype(int).tolist()
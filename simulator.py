@@ -0,0 +1,400 @@
+import math
+
+# Motion limits programmed into PS2_Gantry.ino (AccelStepper setMaxSpeed / setAcceleration)
+GANTRY_MAX_SPEED = 1000.0     # steps/s
+GANTRY_ACCELERATION = 500.0   # steps/s^2
+GANTRY_MAX_POSITION = 8200    # host-side travel limit in steps
+GANTRY_TRAVEL_MM = 400.0      # MAX_POSITION_MM in PS2_Gantry.ino
+FIRMWARE_STEPS_PER_MM = 400.0 # STEPS_PER_MM in PS2_Gantry.ino
+HOST_STEPS_PER_MM = GANTRY_MAX_POSITION / GANTRY_TRAVEL_MM  # GUI step units per mm of carriage travel
+FIRMWARE_STEPS_PER_HOST_STEP = FIRMWARE_STEPS_PER_MM / HOST_STEPS_PER_MM
+LINE_LATENCY = 0.005          # seconds between a request and its reply line
+GANTRY_QUEUE_SIZE = 8         # QUEUE_SIZE in PS2_Gantry.ino
+ARM_PWM_FREQ = 60             # PWM_FREQ in PS2_Arm_Ardiuno.ino
+
+
+def trapezoid_time(distance, max_speed=GANTRY_MAX_SPEED, accel=GANTRY_ACCELERATION):
+    """Duration of a rest-to-rest AccelStepper move over the given distance."""
+    d = abs(distance)
+    if d == 0:
+        return 0.0
+    if d >= max_speed * max_speed / accel:
+        return d / max_speed + max_speed / accel
+    return 2.0 * math.sqrt(d / accel)
+
+
+def trapezoid_distance(distance, t, max_speed=GANTRY_MAX_SPEED, accel=GANTRY_ACCELERATION):
+    """Distance covered t seconds into a rest-to-rest move (same sign as distance)."""
+    d = abs(distance)
+    total = trapezoid_time(d, max_speed, accel)
+    if t <= 0 or d == 0:
+        return 0.0
+    if t >= total:
+        return distance
+    v_peak = min(max_speed, math.sqrt(d * accel))
+    t_ramp = v_peak / accel
+    if t < t_ramp:
+        covered = 0.5 * accel * t * t
+    elif t < total - t_ramp:
+        covered = 0.5 * v_peak * t_ramp + v_peak * (t - t_ramp)
+    else:
+        remaining = total - t
+        covered = d - 0.5 * accel * remaining * remaining
+    return math.copysign(covered, distance)
+
+
+def gantry_axis_time(distance, feed=1.0):
+    """Time for one axis to travel `distance` GUI steps; feed scales the top speed as FEED does."""
+    return trapezoid_time(distance * FIRMWARE_STEPS_PER_HOST_STEP, GANTRY_MAX_SPEED * feed)
+
+
+def gantry_move_time(start, end, feed=1.0):
+    """Time for an X/Y move between GUI step positions; each axis is its own trapezoid."""
+    return max(gantry_axis_time(end[0] - start[0], feed), gantry_axis_time(end[1] - start[1], feed))
+
+
+class _SimAxis:
+    def __init__(self):
+        self.start = 0
+        self.target = 0
+        self.t0 = 0.0
+        self.min = 0
+        self.max = GANTRY_MAX_POSITION
+        self.feed = 1.0  # FEED scale of the top speed
+
+    def position(self, now):
+        distance = (self.target - self.start) * FIRMWARE_STEPS_PER_HOST_STEP
+        travelled = trapezoid_distance(distance, now - self.t0, GANTRY_MAX_SPEED * self.feed)
+        return self.start + travelled / FIRMWARE_STEPS_PER_HOST_STEP
+
+    def done_at(self):
+        return self.t0 + gantry_axis_time(self.target - self.start, self.feed)
+
+    def set_feed(self, feed, now):
+        # A move in progress is replanned from where it is, starting from rest;
+        # the firmware changes its speed without stopping, so this runs long
+        if now < self.done_at():
+            self.start = self.position(now)
+            self.t0 = now
+        self.feed = feed
+
+    def move_to(self, target, now):
+        self.start = self.position(now)
+        self.target = min(max(target, self.min), self.max)
+        self.t0 = now
+
+    def set_position(self, value, now):
+        self.start = self.target = value
+        self.t0 = now
+
+
+class _SimSerial:
+    """Minimal pyserial stand-in whose reads are paced by an injected clock."""
+
+    def __init__(self, clock, timeout=1):
+        self.clock = clock
+        self.timeout = timeout
+        self.is_open = True
+        self.log = []        # (time, command) for every line written by the host
+        self._outbox = []    # (ready_time, line) or (ready_time, callable)
+        self._rx = b""
+        self._partial = b""  # bytes already taken off the outbox but not yet read
+
+    def _reply(self, line, delay=LINE_LATENCY, at=None):
+        self._outbox.append(((self.clock.time() if at is None else at) + delay, line))
+        self._outbox.sort(key=lambda entry: entry[0])
+
+    def _render(self, entry):
+        ready, line = entry
+        text = line(ready) if callable(line) else line
+        return (text + "\n").encode()
+
+    def _advance(self, now):
+        """Bring device state up to `now`; subclasses with internal events override this."""
+
+    def _next_event(self):
+        """Time of the next internal event that may produce output, or None."""
+        return None
+
+    @property
+    def in_waiting(self):
+        now = self.clock.time()
+        self._advance(now)
+        return len(self._partial) + sum(len(self._render(e)) for e in self._outbox if e[0] <= now)
+
+    def read(self, size=1):
+        """Up to `size` bytes that have already arrived; never waits."""
+        now = self.clock.time()
+        self._advance(now)
+        while self._outbox and self._outbox[0][0] <= now and len(self._partial) < size:
+            self._partial += self._render(self._outbox.pop(0))
+        data, self._partial = self._partial[:size], self._partial[size:]
+        return data
+
+    def readline(self):
+        if self._partial:
+            line, _, self._partial = self._partial.partition(b"\n")
+            return line + b"\n"
+        deadline = self.clock.time() + self.timeout
+        while True:
+            now = self.clock.time()
+            self._advance(now)
+            if self._outbox and self._outbox[0][0] <= now:
+                return self._render(self._outbox.pop(0))
+            upcoming = [t for t in (self._outbox[0][0] if self._outbox else None, self._next_event()) if t is not None]
+            if not upcoming or min(upcoming) > deadline:
+                self.clock.sleep(deadline - now)
+                return b""
+            self.clock.sleep(min(upcoming) - now)
+
+    def write(self, data):
+        self._rx += data
+        while b"\n" in self._rx:
+            line, self._rx = self._rx.split(b"\n", 1)
+            command = line.decode().strip()
+            self.log.append((self.clock.time(), command))
+            self.handle(command)
+        return len(data)
+
+    def handle(self, command):
+        raise NotImplementedError
+
+    def reset_input_buffer(self):
+        now = self.clock.time()
+        self._outbox = [e for e in self._outbox if e[0] > now]
+        self._partial = b""
+
+    def close(self):
+        self.is_open = False
+
+
+class SimulatedGantry(_SimSerial):
+    """Simulates PS2_Gantry.ino as driven by the GUI.
+
+    Targets are queued like the firmware's motion queue: a single-axis target
+    merges into the newest target if that one leaves the axis untouched,
+    otherwise it waits its turn. While the queue is full a line that adds
+    to it is held back, and so is everything after it; other commands
+    (POS, STOP, ...) are answered straight away. In streaming mode each
+    processed line is answered with "ok". Axes follow AccelStepper
+    trapezoids and an "X:<x>,Y:<y>" line is emitted each time a target is
+    reached. A feed hold ('#') stops the axes where they are (the firmware
+    decelerates first) and '~' continues the interrupted target; '?' reports
+    the position at once.
+    "FEED,<percent>" scales the top speed of the axes.
+    """
+
+    def __init__(self, clock, timeout=1, x=0, y=0):
+        super().__init__(clock, timeout)
+        self.axes = {"X": _SimAxis(), "Y": _SimAxis()}
+        self.axes["X"].set_position(x, clock.time())
+        self.axes["Y"].set_position(y, clock.time())
+        self.current = None  # {axis: target} or {"dwell": end_time} being executed
+        self.queue = []      # pending {axis: target} or {"dwell": seconds}
+        self.streaming = False
+        self._held = []      # lines waiting for room in the queue
+        self.hold_since = None  # time of the feed hold, while held
+
+    def position(self, now=None):
+        now = self.clock.time() if now is None else now
+        return (int(round(self.axes["X"].position(now))), int(round(self.axes["Y"].position(now))))
+
+    def _position_line(self, now):
+        x, y = self.position(now)
+        return f"X:{x},Y:{y}"
+
+    def _done_at(self):
+        if "dwell" in self.current:
+            return self.current["dwell"]
+        return max(self.axes[a].done_at() for a in self.current)
+
+    def _start(self, targets, now):
+        if "dwell" in targets:
+            self.current = {"dwell": now + targets["dwell"]}
+            return
+        self.current = dict(targets)
+        for name, target in targets.items():
+            self.axes[name].move_to(target, now)
+
+    def _advance(self, now):
+        if self.hold_since is not None:
+            return
+        while self.current is not None and self._done_at() <= now:
+            done = self._done_at()
+            if "dwell" not in self.current:
+                self._reply(self._position_line, 0, at=done)
+            self.current = None
+            if self.queue:
+                self._start(self.queue.pop(0), done)
+            while self._held and not self._blocked(self._held[0]):
+                self._process(self._held.pop(0), done)
+
+    def _next_event(self):
+        return self._done_at() if self.current is not None and self.hold_since is None else None
+
+    def _enqueue(self, targets, now):
+        if self.current is None and not self.queue:
+            self._start(targets, now)
+        else:
+            self.queue.append(targets)
+
+    def _queue_axis(self, name, target, now):
+        if self.queue:
+            if name not in self.queue[-1] and "dwell" not in self.queue[-1]:
+                self.queue[-1][name] = target
+            else:
+                self.queue.append({name: target})
+        elif self.current is not None:
+            if name not in self.current and "dwell" not in self.current and self.hold_since is None:
+                self.current[name] = target
+                self.axes[name].move_to(target, now)
+            else:
+                self.queue.append({name: target})
+        else:
+            self._start({name: target}, now)
+
+    def _halt(self, now):
+        for axis in self.axes.values():
+            axis.set_position(int(round(axis.position(now))), now)
+        self.current = None
+        self.queue = []
+        self._held = []
+        self.hold_since = None
+
+    def _hold(self, now):
+        self._advance(now)
+        if self.hold_since is not None:
+            return
+        self.hold_since = now
+        for axis in self.axes.values():
+            axis.set_position(axis.position(now), now)
+        self._reply("Held", at=now)
+
+    def _resume(self, now):
+        if self.hold_since is None:
+            return
+        if self.current is not None:
+            if "dwell" in self.current:
+                self.current["dwell"] += now - self.hold_since
+            else:
+                for name, target in self.current.items():
+                    self.axes[name].move_to(target, now)
+        self.hold_since = None
+        self._reply("Resumed", at=now)
+
+    def write(self, data):
+        if b"!" in data:
+            # Realtime halt, acted on as soon as the byte arrives
+            now = self.clock.time()
+            self._advance(now)
+            self._halt(now)
+            self._rx = b""
+            self._reply("Stopped")
+            data = data.split(b"!")[-1]
+        if b"#" in data or b"~" in data or b"?" in data:
+            # Realtime feed hold, resume and position report
+            for byte in data:
+                if byte == ord("#"):
+                    self._hold(self.clock.time())
+                elif byte == ord("~"):
+                    self._resume(self.clock.time())
+                elif byte == ord("?"):
+                    self._advance(self.clock.time())
+                    self._reply(self._position_line)
+            data = data.replace(b"#", b"").replace(b"~", b"").replace(b"?", b"")
+        return super().write(data)
+
+    def handle(self, command):
+        now = self.clock.time()
+        self._advance(now)
+        if self._held or self._blocked(command):
+            self._held.append(command)
+            return
+        self._process(command, now)
+
+    def _blocked(self, command):
+        """True if a line must wait for room in the queue (nextLineFits() in the firmware)."""
+        return len(self.queue) >= GANTRY_QUEUE_SIZE and command[:1] in ("X", "Y", "D")
+
+    def _process(self, command, now):
+        try:
+            if command == "POS":
+                self._reply(self._position_line, at=now)
+            elif command == "STATE":
+                busy = self.current is not None or self.queue or self.hold_since is not None
+                self._reply("Busy" if busy else "Idle", at=now)
+            elif command == "STOP":
+                self._halt(now)
+                self._reply("Stopped", at=now)
+            elif command.startswith("STREAM,"):
+                self.streaming = command[7:] == "1"
+            elif command.startswith("FEED,"):
+                feed = min(max(float(command[5:]), 10), 200) / 100.0
+                for axis in self.axes.values():
+                    axis.set_feed(feed, now)
+            elif command == "HOME":
+                self.queue = []
+                self.hold_since = None
+                self._start({"X": 0, "Y": 0}, now)
+            elif command.startswith("DWELL,"):
+                self._enqueue({"dwell": int(command[6:]) / 1000.0}, now)
+            elif command[:4] in ("SETX", "SETY"):
+                self.axes[command[3]].set_position(int(command[5:]), now)
+            elif command[:4] in ("CONX", "CONY"):
+                low, high = command[5:].split(",")
+                self.axes[command[3]].min, self.axes[command[3]].max = int(low), int(high)
+            elif command[:2] in ("X:", "Y:"):
+                self._queue_axis(command[0], int(command[2:].split(",")[0]), now)
+            elif command.startswith("X,"):
+                _, x_mm, _, y_mm = command.split(",")
+                self._enqueue({"X": float(x_mm) * HOST_STEPS_PER_MM, "Y": float(y_mm) * HOST_STEPS_PER_MM}, now)
+        except (ValueError, IndexError):
+            pass
+        if self.streaming:
+            self._reply("ok", at=now)
+
+
+class SimulatedArm(_SimSerial):
+    """Simulates PS2_Arm_Ardiuno.ino: six comma-separated angles, READ_POS, SAVE_POS or CAL lines."""
+
+    def __init__(self, clock, timeout=1, angles=None):
+        super().__init__(clock, timeout)
+        self.angles = list(angles) if angles else [0] * 6
+        self.frames = []     # (time, angles) for every accepted frame
+        self.cal_table = {}  # (joint, index) -> pulse as uploaded
+        self.calibrated = False
+        self.saved_angles = None  # pose kept by the last SAVE_POS
+
+    def handle(self, command):
+        if command == "READ_POS":
+            self._reply(",".join(map(str, self.angles)))
+            return
+        if command == "SAVE_POS":
+            self.saved_angles = list(self.angles)
+            return
+        if command == "RATE":
+            self._reply(f"RATE:{ARM_PWM_FREQ},{len(self.frames)},0")
+            return
+        if command.startswith("CAL,"):
+            args = command[4:]
+            if args in ("END", "CLEAR"):
+                self.calibrated = args == "END"
+            else:
+                self.calibrated = False
+                try:
+                    joint, start, *pulses = [int(v) for v in args.split(",")]
+                except ValueError:
+                    self._reply("CAL ERR")
+                    return
+                for i, pulse in enumerate(pulses):
+                    self.cal_table[(joint, start + i)] = pulse
+            self._reply("CAL OK")
+            return
+        parts = command.split(",")
+        if len(parts) != 6:
+            return
+        try:
+            self.angles = [int(float(p)) for p in parts]
+        except ValueError:
+            return
+        self.frames.append((self.clock.time(), list(self.angles)))
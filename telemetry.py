@@ -0,0 +1,107 @@
+import threading
+
+import numpy as np
+
+TELEMETRY_CAPACITY = 8192  # samples kept per channel (~160 s of a 50 Hz arm stream)
+TELEMETRY_CHANNELS = ["X", "Y", "J1", "J2", "J3", "J4", "J5", "J6"]
+
+
+class TelemetryBuffer:
+    """Fixed-size ring buffer of timestamped samples across all channels.
+
+    Devices report at different rates, so update() writes only the channels it
+    is given and carries the others forward from the previous sample. Memory
+    is allocated once; the oldest samples are overwritten when full. Safe to
+    feed from the gantry polling thread while the GUI thread reads.
+    """
+
+    def __init__(self, channels=TELEMETRY_CHANNELS, capacity=TELEMETRY_CAPACITY):
+        self.channels = list(channels)
+        self.capacity = capacity
+        self.times = np.zeros(capacity)
+        self.values = np.full((capacity, len(self.channels)), np.nan)
+        self.latest = np.full(len(self.channels), np.nan)
+        self.count = 0  # total samples ever written
+        self._lock = threading.Lock()
+
+    def update(self, t, **channel_values):
+        """Record a sample at time t, e.g. update(t, X=120, Y=300)."""
+        with self._lock:
+            for name, value in channel_values.items():
+                self.latest[self.channels.index(name)] = value
+            self._append(t)
+
+    def update_range(self, t, first, values):
+        """Record consecutive channels starting at `first`, e.g. all six joints."""
+        with self._lock:
+            start = self.channels.index(first)
+            self.latest[start:start + len(values)] = values
+            self._append(t)
+
+    def _append(self, t):
+        i = self.count % self.capacity
+        self.times[i] = t
+        self.values[i] = self.latest
+        self.count += 1
+
+    def latest_values(self):
+        """Copy of the newest value of every channel."""
+        with self._lock:
+            return self.latest.copy()
+
+    def snapshot(self, since=None):
+        """Return (times, values) in time order, optionally only samples at or after `since`."""
+        with self._lock:
+            n = min(self.count, self.capacity)
+            start = self.count % self.capacity if self.count > self.capacity else 0
+            order = (np.arange(n) + start) % self.capacity
+            times, values = self.times[order], self.values[order]
+        if since is not None:
+            first = np.searchsorted(times, since)
+            times, values = times[first:], values[first:]
+        return times, values
+
+    def clear(self):
+        with self._lock:
+            self.latest[:] = np.nan
+            self.count = 0
+
+
+def decimate_minmax(times, values, t0, t1, width):
+    """Reduce samples to one (min, max) pair per pixel column.
+
+    times must be sorted; values is (n,) or (n, channels). Returns
+    (columns, mins, maxs) for the columns that hold at least one sample, so
+    the output never exceeds `width` rows however long the history is. Drawing
+    a vertical segment per column keeps every spike visible, unlike striding.
+    """
+    values = np.asarray(values, dtype=float)
+    inside = (times >= t0) & (times <= t1)
+    times, values = times[inside], values[inside]
+    if len(times) == 0 or t1 <= t0:
+        return np.zeros(0, dtype=int), values[:0], values[:0]
+    columns = np.minimum(((times - t0) / (t1 - t0) * width).astype(int), width - 1)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(columns)) + 1))
+    mins = np.fmin.reduceat(values, starts, axis=0)
+    maxs = np.fmax.reduceat(values, starts, axis=0)
+    return columns[starts], mins, maxs
+
+
+def minmax_polyline(columns, mins, maxs, y_low, y_high, height):
+    """Canvas coordinates tracing each column's min/max as a zig-zag line.
+
+    Columns alternate between bottom-to-top and top-to-bottom so neighbouring
+    columns join at their nearer ends. Returns a flat [x0, y0, x1, y1, ...]
+    list for Canvas.coords; columns with no data (NaN) are dropped.
+    """
+    keep = ~(np.isnan(mins) | np.isnan(maxs))
+    columns, mins, maxs = columns[keep], mins[keep], maxs[keep]
+    scale = (height - 1) / float(y_high - y_low)
+    top = (height - 1) - (maxs - y_low) * scale
+    bottom = (height - 1) - (mins - y_low) * scale
+    xs = np.repeat(columns, 2).astype(float)
+    ys = np.empty(2 * len(columns))
+    odd = np.arange(len(columns)) % 2 == 1
+    ys[0::2] = np.where(odd, top, bottom)
+    ys[1::2] = np.where(odd, bottom, top)
+    return np.column_stack((xs, ys)).ravel().tolist()
@@ -0,0 +1,138 @@
+import pytest
+
+from automation import GANTRY_REPORT_INTERVAL, GantryTimeoutError, ScriptRunner, parse_gantry_position
+from clock import VirtualClock
+from feed_override import FeedOverride
+from simulator import SimulatedArm, SimulatedGantry, gantry_move_time
+
+
+class _ScriptedPort:
+    """A gantry port that replays fixed reply lines, one per readline()."""
+
+    def __init__(self, lines):
+        self.lines = [line.encode() + b"\n" for line in lines]
+        self.written = []
+
+    @property
+    def in_waiting(self):
+        return len(self.lines[0]) if self.lines else 0
+
+    def readline(self):
+        return self.lines.pop(0) if self.lines else b""
+
+    def write(self, data):
+        self.written.append(data)
+        return len(data)
+
+
+def _runner(gantry, clock):
+    return ScriptRunner(gantry, SimulatedArm(clock), {}, {}, clock=clock)
+
+
+def test_parse_gantry_position():
+    assert parse_gantry_position("X:4100,Y:2050") == [4100, 2050]
+    assert parse_gantry_position("Stopped") is None
+    assert parse_gantry_position("X:4100,Y:") is None
+
+
+def test_mid_move_pos_reply_does_not_confirm():
+    clock = VirtualClock()
+    # Heading for (50, 100): Y:1000 starts with "Y:100", and X:50 is already reached
+    port = _ScriptedPort(["X:50,Y:1000", "X:20,Y:100", "X:50,Y:100"])
+    runner = _runner(port, clock)
+    assert runner.wait_gantry(50, 100, travel_time=1.0)
+    assert port.lines == []  # only the last line completed the wait
+
+    port = _ScriptedPort(["X:50,Y:1000", "X:20,Y:100"])
+    assert not _runner(port, clock).wait_gantry(50, 100, travel_time=0.0)
+
+
+def test_wait_outlasts_pos_polls_during_a_move():
+    clock = VirtualClock()
+    gantry = SimulatedGantry(clock)
+    runner = _runner(gantry, clock)
+    travel_time = runner.send_gantry(4000, 2000, 500)
+    clock.sleep(travel_time / 2)
+    gantry.write(b"POS\n")  # answered mid-move, before the confirmation
+    start = clock.time()
+    assert runner.wait_gantry(4000, 2000, travel_time)
+    assert clock.time() - start >= travel_time / 2 - 0.1
+    assert gantry.position() == (4000, 2000)
+
+
+def test_wait_reports_positions_while_the_gantry_travels():
+    clock = VirtualClock()
+    gantry = SimulatedGantry(clock)
+    reports = []
+    runner = ScriptRunner(gantry, SimulatedArm(clock), {}, {}, clock=clock,
+                          on_position=lambda x, y: reports.append((x, y)))
+    travel_time = runner.send_gantry(4000, 2000, 500)
+    start = clock.time()
+    assert runner.wait_gantry(4000, 2000, travel_time)
+    assert len(reports) >= 0.8 * (clock.time() - start) / GANTRY_REPORT_INTERVAL  # about 10 Hz
+    assert len(set(reports)) > 2  # positions along the way, not just the target
+    assert reports[-1] == (4000, 2000)
+    assert travel_time == gantry_move_time((0, 0), (4000, 2000))
+
+
+def test_target_clamped_by_soft_limits_is_confirmed():
+    clock = VirtualClock()
+    gantry = SimulatedGantry(clock)
+    gantry.write(b"CONX:0,5000\n")
+    runner = ScriptRunner(gantry, SimulatedArm(clock), {"far": [8000, 100]}, {}, clock=clock,
+                          gantry_limits=((0, 5000), (0, 8200)))
+    runner.run([{"type": "gantry_pos", "name": "far"}])
+    assert gantry.position() == (5000, 100)
+    assert runner.gantry_pos == [5000, 100]
+
+
+def test_unconfirmed_move_fails_the_run_before_the_next_action():
+    clock = VirtualClock()
+    port = _ScriptedPort([])  # a gantry that never answers
+    arm = SimulatedArm(clock)
+    runner = ScriptRunner(port, arm, {"A": [100, 100]}, {"s": [[10] * 6]}, clock=clock)
+    with pytest.raises(GantryTimeoutError):
+        runner.run([{"type": "gantry_pos", "name": "A"}, {"type": "arm_seq", "name": "s"}])
+    assert arm.frames == []
+    assert port.written[-1] == b"!"  # halted, dropping anything queued behind the target
+
+
+def _timed_move(feed):
+    clock = VirtualClock()
+    gantry = SimulatedGantry(clock)
+    runner = ScriptRunner(gantry, SimulatedArm(clock), {}, {}, clock=clock,
+                          feed_override=FeedOverride(feed, clock=clock))
+    travel_time = runner.send_gantry(4000, 2000, 500)
+    start = clock.time()
+    assert runner.wait_gantry(4000, 2000, travel_time)
+    return travel_time, clock.time() - start
+
+
+def test_feed_override_200_percent_shortens_gantry_travel():
+    normal_estimate, normal = _timed_move(1.0)
+    fast_estimate, fast = _timed_move(2.0)
+    assert fast < normal * 0.75
+    assert fast_estimate < normal_estimate
+    assert abs(fast - fast_estimate) < 0.1  # the estimate follows the firmware's FEED scaling
+
+
+def test_feed_cut_mid_run_reaches_the_gantry_before_the_next_target():
+    clock = VirtualClock()
+    gantry = SimulatedGantry(clock)
+    arm = SimulatedArm(clock)
+    feed = FeedOverride(1.0, clock=clock)
+
+    def cut_feed():
+        if clock.time() > 20:
+            feed.set(0.25)
+
+    runner = ScriptRunner(gantry, arm, {"A": [8000, 0], "B": [0, 0], "C": [8000, 8000]}, {"s": [[10] * 6]},
+                          clock=clock, feed_override=feed, on_wait=cut_feed)
+    arm_started = []
+    runner.on_status = lambda text: arm_started.append(gantry.position()) if text.startswith("Playing arm") else None
+    script = [{"type": "gantry_pos", "name": name} for name in "ABC"] + [{"type": "arm_seq", "name": "s"}]
+    report = runner.run(script)
+    assert not [entry for entry in report["timeline"] if entry["event"] == "timeout"]
+    first_slow = next(t for t, command in gantry.log if command.startswith("FEED,") and command != "FEED,100")
+    assert first_slow < 21  # during A, not when C is queued
+    assert arm_started[0] == (8000, 8000)
@@ -0,0 +1,68 @@
+import pytest
+
+from clock import VirtualClock
+from gcode_stream import GcodeStreamer, parse_gcode
+from simulator import HOST_STEPS_PER_MM, SimulatedGantry
+
+
+class _SilentPort:
+    """A gantry that takes every byte and never answers."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.written = []
+
+    def readline(self):
+        self.clock.sleep(1.0)
+        return b""
+
+    def write(self, data):
+        self.written.append(data)
+        return len(data)
+
+    def reset_input_buffer(self):
+        pass
+
+
+def test_parse_moves_dwells_and_units():
+    commands = list(parse_gcode(["G21 G90", "G1 X10 Y20", "G91", "G0 X5", "G4 P250", "G4 S1.5",
+                                 "G20", "G90 G1 X1 Y0 ; one inch", "(comment only)"]))
+    assert commands == ["X,10.000,Y,20.000", "X,15.000,Y,20.000", "DWELL,250", "DWELL,1500",
+                        "X,25.400,Y,0.000"]
+
+
+def test_parse_rejects_unsupported_codes():
+    with pytest.raises(ValueError, match="Line 2"):
+        list(parse_gcode(["G1 X1", "G2 X5 Y5 I1 J1"]))
+
+
+def test_g28_mid_file_keeps_the_moves_queued_before_it():
+    clock = VirtualClock()
+    gantry = SimulatedGantry(clock)
+    lines = ["G1 X100 Y100", "G1 X200 Y0", "G28", "G1 X10 Y10"]
+    assert "HOME" not in list(parse_gcode(lines))
+    GcodeStreamer(gantry, clock=clock).stream(parse_gcode(lines))
+    moves = [command for _, command in gantry.log if command.startswith("X,")]
+    assert moves == ["X,100.000,Y,100.000", "X,200.000,Y,0.000", "X,0.000,Y,0.000", "X,10.000,Y,10.000"]
+    # stream() returns once the motion is done, not at the last "ok"
+    assert gantry.current is None and not gantry.queue
+    assert gantry.position() == (round(10 * HOST_STEPS_PER_MM), round(10 * HOST_STEPS_PER_MM))
+
+
+def test_silent_gantry_fails_the_stream_instead_of_hanging():
+    clock = VirtualClock()
+    port = _SilentPort(clock)
+    with pytest.raises(ValueError, match="stopped answering"):
+        GcodeStreamer(port, clock=clock).stream(["X,1.000,Y,1.000"])
+    assert b"?" in port.written  # probed before giving up
+    assert clock.time() < 10
+
+
+def test_stream_reports_positions_while_it_waits():
+    clock = VirtualClock()
+    gantry = SimulatedGantry(clock)
+    reports = []
+    GcodeStreamer(gantry, clock=clock, on_position=lambda x, y: reports.append((x, y))).stream(
+        ["X,100.000,Y,50.000", "X,0.000,Y,0.000"])
+    assert len(set(reports)) > 4
+    assert reports[-1] == (0, 0)
@@ -0,0 +1,59 @@
+import pytest
+
+from automation import ScriptRunner
+from clock import VirtualClock
+from job_queue import JobQueue, JobScheduler
+from simulator import SimulatedArm, SimulatedGantry
+
+_SCRIPT = [{"type": "gantry_pos", "name": "A"}, {"type": "gantry_pos", "name": "B"}]
+
+
+def test_higher_priority_first_then_first_come_first_served():
+    jobs = JobQueue()
+    low = jobs.put("low", _SCRIPT)
+    first = jobs.put("first", _SCRIPT, priority=2)
+    second = jobs.put("second", _SCRIPT, priority=2)
+    assert jobs.pending() == [first, second, low]
+    assert jobs.peek() is first
+    assert jobs.get() is first
+    jobs.requeue(first)  # back in front of its priority, ahead of a job queued before it was taken
+    assert [jobs.get(), jobs.get(), jobs.get(), jobs.get()] == [first, second, low, None]
+
+
+def test_put_rejects_empty_scripts_and_repeat_below_one():
+    jobs = JobQueue()
+    with pytest.raises(ValueError, match="empty"):
+        jobs.put("empty", [])
+    for repeat in (0, -1):
+        with pytest.raises(ValueError, match="at least 1"):
+            jobs.put("none", _SCRIPT, repeat=repeat)
+    assert len(jobs) == 0 and not jobs.jobs
+
+
+def test_cancel_drops_queued_jobs():
+    jobs = JobQueue()
+    kept = jobs.put("kept", _SCRIPT)
+    dropped = jobs.put("dropped", _SCRIPT)
+    assert jobs.cancel(dropped.id) == [dropped]
+    assert dropped.state == "cancelled" and jobs.pending() == [kept]
+
+
+def test_scheduler_runs_every_repetition_in_priority_order():
+    clock = VirtualClock()
+    runner = ScriptRunner(SimulatedGantry(clock), SimulatedArm(clock), {"A": [1000, 0], "B": [0, 1000]}, {},
+                          clock=clock)
+    jobs = JobQueue()
+    later = jobs.put("later", _SCRIPT, repeat=2)
+    urgent = jobs.put("urgent", _SCRIPT, repeat=3, priority=1)
+    started = []
+
+    def on_job(job):
+        if job.state == "running" and not job.runs:
+            started.append(job.name)
+
+    finished = JobScheduler(runner, jobs, on_job=on_job).run_pending()
+    assert finished == [urgent, later]
+    assert started == ["urgent", "later"]
+    assert len(urgent.runs) == 3 and len(later.runs) == 2
+    assert urgent.state == later.state == "done"
+    assert len(jobs) == 0
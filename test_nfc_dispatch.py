@@ -0,0 +1,50 @@
+import pytest
+
+from clock import VirtualClock
+from job_queue import JobQueue
+from nfc_dispatch import NFC_DEBOUNCE_S, REPEAT_LINE, TagDispatcher, TagReader, normalize_uid, parse_uid
+
+
+def test_parse_uid():
+    assert parse_uid("In hex:  DE AD BE EF") == "DEADBEEF"
+    assert parse_uid("  In hex: 04 a1 2b 3c 4d 5e 80\r\n") == "04A12B3C4D5E80"
+    assert parse_uid("In dec:  222 173 190 239") is None
+    assert parse_uid("In hex:  ZZ 01") is None
+    assert parse_uid("A new card has been detected.") is None
+    assert normalize_uid("de:ad:be:ef") == normalize_uid("DE AD BE EF") == "DEADBEEF"
+
+
+def test_reads_within_the_debounce_are_one_tap():
+    clock = VirtualClock()
+    reader = TagReader(clock=clock)
+    assert reader.feed("In hex:  DE AD BE EF") == "DEADBEEF"
+    clock.sleep(NFC_DEBOUNCE_S / 2)
+    assert reader.feed(REPEAT_LINE) is None
+    # A tag held on the reader keeps restarting the debounce
+    clock.sleep(NFC_DEBOUNCE_S / 2 + 0.1)
+    assert reader.feed(REPEAT_LINE) is None
+    clock.sleep(NFC_DEBOUNCE_S + 0.1)
+    assert reader.feed(REPEAT_LINE) == "DEADBEEF"
+
+
+def test_each_card_has_its_own_debounce():
+    clock = VirtualClock()
+    reader = TagReader(clock=clock)
+    assert reader.feed(REPEAT_LINE) is None  # no card seen yet
+    assert reader.feed("In hex:  01 02 03 04") == "01020304"
+    assert reader.feed("In hex:  0A 0B 0C 0D") == "0A0B0C0D"
+    assert reader.feed("In hex:  01 02 03 04") is None
+    assert reader.feed("In dec:  1 2 3 4") is None
+
+
+def test_dispatcher_queues_mapped_scripts():
+    scripts = {"pick_place": [{"type": "gantry_pos", "name": "A"}]}
+    unknown = []
+    jobs = JobQueue()
+    dispatcher = TagDispatcher({"de:ad:be:ef": "pick_place"}, scripts, jobs, on_unknown=unknown.append)
+    lines = [b"The NUID tag is:\n", b"In hex:  DE AD BE EF\n", b"In hex:  01 02 03 04\n"]
+    dispatcher.listen(lines, TagReader(clock=VirtualClock()))
+    assert [job.name for job in jobs.pending()] == ["pick_place"]
+    assert unknown == ["01020304"]
+    with pytest.raises(ValueError, match="not found"):
+        TagDispatcher({"01020304": "missing"}, scripts, jobs)
@@ -0,0 +1,58 @@
+from itertools import permutations
+
+import pytest
+
+from route_optimizer import optimize_order, optimize_script, route_time
+
+_POINTS = [(7600, 300), (200, 7900), (4100, 4100), (8000, 8000), (300, 250), (6100, 2500), (1500, 5200)]
+
+
+def test_exact_search_finds_the_shortest_route():
+    order, travel_time = optimize_order(_POINTS, (0, 0))
+    best = min(route_time(perm, _POINTS, (0, 0)) for perm in permutations(range(len(_POINTS))))
+    assert sorted(order) == list(range(len(_POINTS)))
+    assert travel_time == pytest.approx(best)
+    assert route_time(order, _POINTS, (0, 0)) == pytest.approx(best)
+
+
+def test_exact_search_ends_at_the_fixed_end():
+    end = (8000, 0)
+    order, travel_time = optimize_order(_POINTS, (0, 0), end)
+    best = min(route_time(perm, _POINTS, (0, 0), end) for perm in permutations(range(len(_POINTS))))
+    assert travel_time == pytest.approx(best)
+
+
+def test_precedence_is_kept_by_exact_and_heuristic_search():
+    precedence = [(3, 4), (0, 1)]  # far corner before the origin, and so on
+    for exact_limit in (8, 0):
+        order, _ = optimize_order(_POINTS, (0, 0), precedence=precedence, exact_limit=exact_limit)
+        assert sorted(order) == list(range(len(_POINTS)))
+        assert order.index(3) < order.index(4) and order.index(0) < order.index(1)
+
+
+def test_conflicting_precedence_is_rejected():
+    with pytest.raises(ValueError, match="cannot be satisfied"):
+        optimize_order(_POINTS[:3], (0, 0), precedence=[(0, 1), (1, 0)])
+
+
+def test_optimizer_respects_pinned_actions():
+    positions = {"far": (8000, 8000), "near": (100, 100), "mid": (4000, 4000),
+                 "edge": (7000, 7000), "inner": (1000, 1000), "home": (0, 0)}
+    script = [{"type": "arm_seq", "name": "ready"},
+              {"type": "gantry_pos", "name": "far"},
+              {"type": "arm_seq", "name": "pick"},
+              {"type": "gantry_pos", "name": "near"},
+              {"type": "gantry_pos", "name": "mid", "fixed": True},
+              {"type": "arm_seq", "name": "place"},
+              {"type": "gantry_pos", "name": "inner"},
+              {"type": "gantry_pos", "name": "edge"},
+              {"type": "gantry_pos", "name": "home", "fixed": True}]
+    new_script, before, after = optimize_script(script, positions)
+    names = [action["name"] for action in new_script]
+    moves = [name for action, name in zip(new_script, names) if action["type"] == "gantry_pos"]
+    # The free visits on either side of "mid" are reordered, the pinned ones keep their slots
+    assert moves == ["near", "far", "mid", "edge", "inner", "home"]
+    assert names[0] == "ready"  # actions before the first move stay first
+    assert names[names.index("far") + 1] == "pick"  # and the rest travel with their move
+    assert names[names.index("mid") + 1] == "place"
+    assert after < before
@@ -0,0 +1,34 @@
+import numpy as np
+
+from simplify import rdp_mask, segment_distances, simplify_sequence
+
+
+def test_straight_line_keeps_only_its_ends():
+    points = [[i, 2 * i] for i in range(20)]
+    assert rdp_mask(points, 0.5).tolist() == [True] + [False] * 18 + [True]
+
+
+def test_corner_is_kept():
+    points = [[0, 0], [5, 0], [10, 0], [10, 5], [10, 10]]
+    assert simplify_sequence(points, 0.5) == [[0, 0], [10, 0], [10, 10]]
+
+
+def test_every_dropped_point_is_within_tolerance():
+    rng = np.random.default_rng(3)
+    points = np.cumsum(rng.normal(size=(300, 6)), axis=0)
+    tolerance = 2.0
+    keep = rdp_mask(points, tolerance)
+    kept = np.flatnonzero(keep)
+    assert keep[0] and keep[-1] and keep.sum() < len(points)
+    for first, last in zip(kept, kept[1:]):
+        if last - first > 1:
+            assert segment_distances(points[first + 1:last], points[first], points[last]).max() <= tolerance
+    # With no tolerance, no point of a random walk lies on the line through its neighbours
+    assert rdp_mask(points, 0.0).all()
+
+
+def test_short_and_degenerate_sequences():
+    assert rdp_mask([], 1.0).tolist() == []
+    assert simplify_sequence([[1, 2]], 1.0) == [[1, 2]]
+    # A loop back to its start: distances are measured from the point, not a zero-length line
+    assert simplify_sequence([[0, 0], [3, 4], [0, 0]], 1.0) == [[0, 0], [3, 4], [0, 0]]
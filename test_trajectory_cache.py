@@ -0,0 +1,41 @@
+import numpy as np
+
+from trajectory_cache import TrajectoryCache, compile_trajectory, table_key, trajectory_key
+
+_STEPS = [[0, 0, 0, 0, 0, 0], [10, -5, 0, 0, 0, 0], [10, -5, 20, 0, 0, 0]]
+
+
+def test_key_covers_steps_and_playback_settings():
+    key = trajectory_key(_STEPS, 700)
+    assert key == trajectory_key([tuple(step) for step in _STEPS], 700)
+    edited = [list(step) for step in _STEPS]
+    edited[1][0] = 11
+    others = [trajectory_key(edited, 700), trajectory_key(_STEPS, 600), trajectory_key(_STEPS, 700, sequential=True),
+              trajectory_key(_STEPS, 700, calibration=table_key(np.ones((6, 61))))]
+    assert key not in others and len(set(others)) == len(others)
+    assert table_key(None) == ""
+
+
+def test_lru_evicts_the_least_recently_used_plan():
+    sequences = [[[0] * 6, [a, 0, 0, 0, 0, 0]] for a in (10, 20, 30)]
+    size = compile_trajectory(sequences[0], 700).nbytes
+    cache = TrajectoryCache(max_bytes=2 * size)
+    first = cache.get(sequences[0], 700)
+    cache.get(sequences[1], 700)
+    assert cache.get(sequences[0], 700) is first  # hit, and now the most recent
+    cache.get(sequences[2], 700)                  # evicts sequences[1]
+    assert cache.stats() == {"entries": 2, "bytes": 2 * size, "hits": 1, "disk_hits": 0, "misses": 3}
+    assert cache.get(sequences[0], 700) is first
+    cache.get(sequences[1], 700)
+    assert cache.stats()["misses"] == 4
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    compiled = TrajectoryCache(cache_dir=str(tmp_path)).get(_STEPS, 700)
+    cache = TrajectoryCache(cache_dir=str(tmp_path))
+    loaded = cache.get(_STEPS, 700)
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["misses"] == 0
+    assert np.array_equal(loaded.angles, compiled.angles) and np.array_equal(loaded.motor, compiled.motor)
+    assert np.array_equal(loaded.step_ends, compiled.step_ends) and loaded.step_delay == compiled.step_delay
+    cache.clear()
+    assert not list(tmp_path.glob("*.npz"))
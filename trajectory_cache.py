@@ -0,0 +1,168 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from arm_motion import ARM_INTERPOLATION_STEPS, clamp_arm_angle, interpolate_arm_frames
+
+TRAJECTORY_CACHE_DIR = "trajectory_cache"    # kept next to arm_sequences.json
+TRAJECTORY_CACHE_BYTES = 16 * 1024 * 1024    # in-memory tier
+TRAJECTORY_DISK_BYTES = 64 * 1024 * 1024     # on-disk tier; least recently used files go first
+NO_MOTOR = -1                                # motor entry of a frame that moves every joint
+
+
+def trajectory_key(steps, speed_ms, sequential=False, calibration=""):
+    """Content hash of a sequence and the settings it is played with.
+
+    Editing any step, or changing the speed, movement mode or calibration
+    profile, gives a different key, so a stale plan is never looked up.
+    """
+    payload = json.dumps([[list(step) for step in steps], int(speed_ms), bool(sequential), calibration],
+                         separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def table_key(table):
+    """Calibration part of a key for a compiled pulse table; "" when the arm is uncalibrated."""
+    if table is None:
+        return ""
+    return hashlib.sha1(np.ascontiguousarray(table).tobytes()).hexdigest()[:16]
+
+
+class Trajectory:
+    """Frames that play a sequence from its first step to its last.
+
+    angles is (N, 6) int16 and motor is (N,) int8, NO_MOTOR for frames that
+    move every joint. Frame step_ends[i] reaches step i + 1 of the sequence,
+    and frames are step_delay ms apart.
+    """
+
+    def __init__(self, angles, motor, step_ends, step_delay):
+        self.angles = angles
+        self.motor = motor
+        self.step_ends = step_ends
+        self.step_delay = int(step_delay)
+
+    @property
+    def nbytes(self):
+        return self.angles.nbytes + self.motor.nbytes + self.step_ends.nbytes
+
+
+def compile_trajectory(steps, speed_ms, sequential=False):
+    """Interpolate every move of a sequence after its first step, as ScriptRunner.move_arm would."""
+    angles, motor, step_ends = [], [], []
+    current = [clamp_arm_angle(int(round(a))) for a in steps[0]] if steps else []
+    for step in steps[1:]:
+        for frame, motor_idx in interpolate_arm_frames(current, step, sequential=sequential):
+            angles.append(frame)
+            motor.append(NO_MOTOR if motor_idx is None else motor_idx)
+        step_ends.append(len(angles) - 1)
+        current = [clamp_arm_angle(int(round(a))) for a in angles[-1]]
+    return Trajectory(np.rint(np.array(angles, dtype=float).reshape(-1, 6)).astype(np.int16),
+                      np.array(motor, dtype=np.int8), np.array(step_ends, dtype=np.int32),
+                      speed_ms // ARM_INTERPOLATION_STEPS)
+
+
+class TrajectoryCache:
+    """LRU cache of compiled trajectories, bounded by memory, with an optional disk tier.
+
+    A miss in memory falls back to cache_dir before compiling, so plans
+    survive restarts. Both tiers evict the least recently used plans once
+    they outgrow their byte budgets. Safe to share between threads.
+    """
+
+    def __init__(self, max_bytes=TRAJECTORY_CACHE_BYTES, cache_dir=None, max_disk_bytes=TRAJECTORY_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, steps, speed_ms, sequential=False, calibration=""):
+        """Return the Trajectory for a sequence, compiling it only if neither tier has it."""
+        key = trajectory_key(steps, speed_ms, sequential, calibration)
+        with self._lock:
+            trajectory = self._entries.get(key)
+            if trajectory is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return trajectory
+        trajectory = self._load(key)
+        if trajectory is None:
+            trajectory = compile_trajectory(steps, speed_ms, sequential)
+            self._save(key, trajectory)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.disk_hits += 1
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = trajectory
+                self.nbytes += trajectory.nbytes
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return trajectory
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.nbytes,
+                    "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+    def clear(self):
+        """Drop every plan from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+        for path in self._disk_files():
+            os.remove(path)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def _disk_files(self):
+        if not self.cache_dir:
+            return []
+        return [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".npz")]
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                trajectory = Trajectory(data["angles"], data["motor"], data["step_ends"], data["step_delay"])
+            os.utime(path)  # mark as recently used for disk eviction
+        except (OSError, ValueError, KeyError):
+            return None  # missing or unreadable; compile it again
+        return trajectory
+
+    def _save(self, key, trajectory):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            # Write then rename, so a crash never leaves a half-written plan behind
+            with open(path + ".tmp", "wb") as f:
+                np.savez(f, angles=trajectory.angles, motor=trajectory.motor,
+                         step_ends=trajectory.step_ends, step_delay=trajectory.step_delay)
+            os.replace(path + ".tmp", path)
+            files = sorted(self._disk_files(), key=os.path.getmtime)
+            total = sum(os.path.getsize(f) for f in files)
+            for old in files[:-1]:
+                if total <= self.max_disk_bytes:
+                    break
+                total -= os.path.getsize(old)
+                os.remove(old)
+        except OSError:
+            pass  # the disk tier is best effort; the plan is still cached in memory